@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains a wrapper around the deliveries of an agent mech."""
+from typing import Any
+
+from aea.common import JSONLike
+from aea.configurations.base import PublicId
+from aea.contracts.base import Contract
+from aea.crypto.base import LedgerApi
+
+
+PUBLIC_ID = PublicId.from_str("celo/agent_mech:0.1.0")
+# Deliver(address,uint256,bytes)
+DELIVER_TOPIC = "0x0cd979445339c62199996f208428d987b1cea24d18e62b79ec24d94b636e8b70"
+
+
+class AgentMechContract(Contract):
+    """A wrapper for the deliveries of an agent mech."""
+
+    contract_id = PUBLIC_ID
+
+    @classmethod
+    def get_raw_transaction(
+        cls, ledger_api: LedgerApi, contract_address: str, **kwargs: Any
+    ) -> JSONLike:
+        """
+        Handler method for the 'GET_RAW_TRANSACTION' requests.
+
+        Implement this method in the sub class if you want
+        to handle the contract requests manually.
+
+        :param ledger_api: the ledger apis.
+        :param contract_address: the contract address.
+        :param kwargs: the keyword arguments.
+        :return: the tx  # noqa: DAR202
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    @classmethod
+    def get_raw_message(
+        cls, ledger_api: LedgerApi, contract_address: str, **kwargs: Any
+    ) -> bytes:
+        """
+        Handler method for the 'GET_RAW_MESSAGE' requests.
+
+        Implement this method in the sub class if you want
+        to handle the contract requests manually.
+
+        :param ledger_api: the ledger apis.
+        :param contract_address: the contract address.
+        :param kwargs: the keyword arguments.
+        :return: the tx  # noqa: DAR202
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    @classmethod
+    def get_state(
+        cls, ledger_api: LedgerApi, contract_address: str, **kwargs: Any
+    ) -> JSONLike:
+        """
+        Handler method for the 'GET_STATE' requests.
+
+        Implement this method in the sub class if you want
+        to handle the contract requests manually.
+
+        :param ledger_api: the ledger apis.
+        :param contract_address: the contract address.
+        :param kwargs: the keyword arguments.
+        :return: the tx  # noqa: DAR202
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    @classmethod
+    def get_deliver_logs(
+        cls,
+        ledger_api: LedgerApi,
+        contract_address: str,
+        from_block: int,
+        to_block: int,
+    ) -> JSONLike:
+        """
+        Get the `Deliver` logs of a mech in a block range.
+
+        :param ledger_api: the ledger api.
+        :param contract_address: the mech address.
+        :param from_block: the first block of the logs.
+        :param to_block: the last block of the logs.
+        :return: the logs in a JSON-serializable form.
+        """
+        logs = ledger_api.api.eth.get_logs(
+            dict(
+                address=ledger_api.api.to_checksum_address(contract_address),
+                topics=[DELIVER_TOPIC],
+                fromBlock=from_block,
+                toBlock=to_block,
+            )
+        )
+        return dict(
+            logs=[
+                dict(
+                    address=log["address"],
+                    topics=[ledger_api.api.to_hex(topic) for topic in log["topics"]],
+                    data=ledger_api.api.to_hex(log["data"]),
+                    blockNumber=int(log["blockNumber"]),
+                    logIndex=int(log["logIndex"]),
+                )
+                for log in logs
+            ],
+        )
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Tests for the agent mech contract."""
+
+from unittest.mock import MagicMock
+
+from hexbytes import HexBytes
+from web3 import Web3
+
+from packages.celo.contracts.agent_mech.contract import (
+    AgentMechContract,
+    DELIVER_TOPIC,
+)
+
+
+MECH = "0x77af31de935740567cf4ff1986d04b2c964a786a"
+
+
+def test_deliver_topic() -> None:
+    """Test that the topic is the one of the `Deliver` event."""
+    signature = Web3.keccak(text="Deliver(address,uint256,bytes)")
+    assert DELIVER_TOPIC == Web3.to_hex(signature)
+
+
+def test_get_deliver_logs() -> None:
+    """Test that the logs of a block range are fetched in a JSON-serializable form."""
+    api = MagicMock(to_hex=Web3.to_hex, to_checksum_address=Web3.to_checksum_address)
+    api.eth.get_logs.return_value = [
+        dict(
+            address=Web3.to_checksum_address(MECH),
+            topics=[HexBytes(DELIVER_TOPIC), HexBytes("0x" + "01" * 32)],
+            data=HexBytes("0x" + "00" * 31 + "07"),
+            blockNumber=8,
+            logIndex=1,
+        )
+    ]
+
+    state = AgentMechContract.get_deliver_logs(MagicMock(api=api), MECH, 5, 9)
+
+    api.eth.get_logs.assert_called_once_with(
+        dict(
+            address=Web3.to_checksum_address(MECH),
+            topics=[DELIVER_TOPIC],
+            fromBlock=5,
+            toBlock=9,
+        )
+    )
+    assert state == dict(
+        logs=[
+            dict(
+                address=Web3.to_checksum_address(MECH),
+                topics=[DELIVER_TOPIC, "0x" + "01" * 32],
+                data="0x" + "00" * 31 + "07",
+                blockNumber=8,
+                logIndex=1,
+            )
+        ]
+    )
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains a wrapper around Multicall3."""
+import logging
+from typing import Any, Dict, List, Tuple, Union
+
+from aea.common import JSONLike
+from aea.configurations.base import PublicId
+from aea.contracts.base import Contract
+from aea.crypto.base import LedgerApi
+
+
+PUBLIC_ID = PublicId.from_str("celo/multicall3:0.1.0")
+
+_logger = logging.getLogger(
+    f"aea.packages.{PUBLIC_ID.author}.contracts.{PUBLIC_ID.name}.contract"
+)
+
+# method name -> (signature, input types, output types)
+VIEW_FUNCTIONS: Dict[str, Tuple[str, List[str], List[str]]] = {
+    "getReserves": ("getReserves()", [], ["uint112", "uint112", "uint32"]),
+    "slot0": (
+        "slot0()",
+        [],
+        ["uint160", "int24", "uint16", "uint16", "uint16", "uint8", "bool"],
+    ),
+    "liquidity": ("liquidity()", [], ["uint128"]),
+    "medianRate": ("medianRate(address)", ["address"], ["uint256", "uint256"]),
+}
+
+
+class Multicall3Contract(Contract):
+    """A wrapper for the Multicall3 contract."""
+
+    contract_id = PUBLIC_ID
+
+    @classmethod
+    def get_raw_transaction(
+        cls, ledger_api: LedgerApi, contract_address: str, **kwargs: Any
+    ) -> JSONLike:
+        """
+        Handler method for the 'GET_RAW_TRANSACTION' requests.
+
+        Implement this method in the sub class if you want
+        to handle the contract requests manually.
+
+        :param ledger_api: the ledger apis.
+        :param contract_address: the contract address.
+        :param kwargs: the keyword arguments.
+        :return: the tx  # noqa: DAR202
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    @classmethod
+    def get_raw_message(
+        cls, ledger_api: LedgerApi, contract_address: str, **kwargs: Any
+    ) -> bytes:
+        """
+        Handler method for the 'GET_RAW_MESSAGE' requests.
+
+        Implement this method in the sub class if you want
+        to handle the contract requests manually.
+
+        :param ledger_api: the ledger apis.
+        :param contract_address: the contract address.
+        :param kwargs: the keyword arguments.
+        :return: the tx  # noqa: DAR202
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    @classmethod
+    def get_state(
+        cls, ledger_api: LedgerApi, contract_address: str, **kwargs: Any
+    ) -> JSONLike:
+        """
+        Handler method for the 'GET_STATE' requests.
+
+        Implement this method in the sub class if you want
+        to handle the contract requests manually.
+
+        :param ledger_api: the ledger apis.
+        :param contract_address: the contract address.
+        :param kwargs: the keyword arguments.
+        :return: the tx  # noqa: DAR202
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    @classmethod
+    def encode_read(
+        cls, ledger_api: LedgerApi, read: Dict[str, Any]
+    ) -> Tuple[str, bytes]:
+        """
+        Encode a view call so that it can be batched with `tryBlockAndAggregate`.
+
+        :param ledger_api: the ledger api.
+        :param read: a mapping with the `target` address, a `method` from `VIEW_FUNCTIONS` and its `args`.
+        :return: the checksummed target address and the call data.
+        """
+        signature, input_types, _ = VIEW_FUNCTIONS[read["method"]]
+        selector = bytes(ledger_api.api.keccak(text=signature)[:4])
+        encoded_args = ledger_api.api.codec.encode(input_types, read.get("args", []))
+        target = ledger_api.api.to_checksum_address(read["target"])
+        return target, selector + encoded_args
+
+    @classmethod
+    def decode_read(
+        cls, ledger_api: LedgerApi, read: Dict[str, Any], success: bool, data: bytes
+    ) -> Dict[str, Any]:
+        """
+        Decode the return data of a batched view call.
+
+        :param ledger_api: the ledger api.
+        :param read: the read that produced the return data.
+        :param success: whether the call succeeded.
+        :param data: the raw return data.
+        :return: a mapping with the success flag and the decoded output values, as integers.
+        """
+        _, _, output_types = VIEW_FUNCTIONS[read["method"]]
+        if not success or len(data) == 0:
+            return dict(success=False, values=[])
+        values = ledger_api.api.codec.decode(output_types, data)
+        return dict(success=True, values=[int(value) for value in values])
+
+    @classmethod
+    def aggregate_reads(
+        cls,
+        ledger_api: LedgerApi,
+        contract_address: str,
+        reads: List[Dict[str, Any]],
+        block_identifier: Union[int, str] = "latest",
+    ) -> JSONLike:
+        """
+        Execute a batch of view calls as a single `eth_call`.
+
+        Reads that revert do not fail the batch, they are returned with `success` set to `False`.
+
+        :param ledger_api: the ledger api.
+        :param contract_address: the multicall3 address.
+        :param reads: the reads to batch, see `encode_read`.
+        :param block_identifier: the block to read the state at.
+        :return: the block number and timestamp the reads were executed at, and the decoded results in order.
+        """
+        instance = cls.get_instance(ledger_api, contract_address)
+        # the block timestamp is read within the same batch, so that it matches the block
+        timestamp_call = (
+            instance.address,
+            ledger_api.api.to_bytes(
+                hexstr=instance.encodeABI(fn_name="getCurrentBlockTimestamp")
+            ),
+        )
+        calls = [timestamp_call]
+        calls.extend(cls.encode_read(ledger_api, read) for read in reads)
+        # the block hash returned along is `blockhash(block.number)`, which is always 0
+        block_number, _, results = instance.functions.tryBlockAndAggregate(
+            False, calls
+        ).call(block_identifier=block_identifier)
+        (_, timestamp_data), results = results[0], results[1:]
+        (block_timestamp,) = ledger_api.api.codec.decode(["uint256"], timestamp_data)
+        decoded = [
+            cls.decode_read(ledger_api, read, success, data)
+            for read, (success, data) in zip(reads, results)
+        ]
+        failed = sum(not result["success"] for result in decoded)
+        if failed:
+            _logger.warning(f"{failed} out of {len(reads)} batched reads failed.")
+        return dict(
+            block_number=block_number,
+            block_timestamp=block_timestamp,
+            results=decoded,
+        )
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Tests for the multicall3 contract."""
+
+from unittest.mock import MagicMock, patch
+
+from web3 import Web3
+
+from packages.celo.contracts.multicall3.contract import Multicall3Contract
+
+
+POOL = "0x1e593f1fe7b61c53874b54ec0c59fd0d5eb8621e"
+FEED = "0x765de816845861e75a25fca122bb6898b8b1282a"
+
+
+def test_encode_read() -> None:
+    """Test that reads are encoded as selector plus arguments."""
+    ledger_api = MagicMock(api=Web3())
+
+    target, data = Multicall3Contract.encode_read(
+        ledger_api, dict(target=POOL, method="getReserves", args=[])
+    )
+    assert target == Web3.to_checksum_address(POOL)
+    assert data.hex() == "0902f1ac"
+
+    _, data = Multicall3Contract.encode_read(
+        ledger_api, dict(target=POOL, method="medianRate", args=[FEED])
+    )
+    assert data[:4].hex() == "ef90e1b0"
+    assert data[4:].hex().endswith(FEED[2:])
+
+
+def test_decode_read() -> None:
+    """Test that return data is decoded into integers and failures are flagged."""
+    ledger_api = MagicMock(api=Web3())
+    read = dict(target=POOL, method="getReserves", args=[])
+    data = Web3().codec.encode(["uint112", "uint112", "uint32"], [10, 20, 30])
+
+    assert Multicall3Contract.decode_read(ledger_api, read, True, data) == dict(
+        success=True, values=[10, 20, 30]
+    )
+    assert Multicall3Contract.decode_read(ledger_api, read, False, data) == dict(
+        success=False, values=[]
+    )
+    assert Multicall3Contract.decode_read(ledger_api, read, True, b"") == dict(
+        success=False, values=[]
+    )
+
+
+def test_aggregate_reads() -> None:
+    """Test that the batch is read along with the block timestamp."""
+    ledger_api = MagicMock(api=Web3())
+    instance = MagicMock(address=POOL)
+    instance.encodeABI.return_value = "0x0f28c97d"
+    codec = Web3().codec
+    instance.functions.tryBlockAndAggregate.return_value.call.return_value = (
+        7,
+        b"\x01" * 32,
+        [
+            (True, codec.encode(["uint256"], [1700000000])),
+            (True, codec.encode(["uint128"], [5])),
+            (False, b""),
+        ],
+    )
+    reads = [
+        dict(target=POOL, method="liquidity", args=[]),
+        dict(target=POOL, method="getReserves", args=[]),
+    ]
+
+    with patch.object(Multicall3Contract, "get_instance", return_value=instance):
+        state = Multicall3Contract.aggregate_reads(ledger_api, POOL, reads)
+
+    _, calls = instance.functions.tryBlockAndAggregate.call_args[0]
+    assert calls[0] == (POOL, bytes.fromhex("0f28c97d"))
+    assert len(calls) == 3
+    assert state == dict(
+        block_number=7,
+        block_timestamp=1700000000,
+        results=[dict(success=True, values=[5]), dict(success=False, values=[])],
+    )
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains a wrapper around the events of the v2 and v3 pools."""
+from typing import Any, List, Optional, Union
+
+from aea.common import JSONLike
+from aea.configurations.base import PublicId
+from aea.contracts.base import Contract
+from aea.crypto.base import LedgerApi
+
+
+PUBLIC_ID = PublicId.from_str("celo/pool:0.1.0")
+
+
+class PoolContract(Contract):
+    """A wrapper for the events of the v2 and v3 pools."""
+
+    contract_id = PUBLIC_ID
+
+    @classmethod
+    def get_raw_transaction(
+        cls, ledger_api: LedgerApi, contract_address: str, **kwargs: Any
+    ) -> JSONLike:
+        """
+        Handler method for the 'GET_RAW_TRANSACTION' requests.
+
+        Implement this method in the sub class if you want
+        to handle the contract requests manually.
+
+        :param ledger_api: the ledger apis.
+        :param contract_address: the contract address.
+        :param kwargs: the keyword arguments.
+        :return: the tx  # noqa: DAR202
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    @classmethod
+    def get_raw_message(
+        cls, ledger_api: LedgerApi, contract_address: str, **kwargs: Any
+    ) -> bytes:
+        """
+        Handler method for the 'GET_RAW_MESSAGE' requests.
+
+        Implement this method in the sub class if you want
+        to handle the contract requests manually.
+
+        :param ledger_api: the ledger apis.
+        :param contract_address: the contract address.
+        :param kwargs: the keyword arguments.
+        :return: the tx  # noqa: DAR202
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    @classmethod
+    def get_state(
+        cls, ledger_api: LedgerApi, contract_address: str, **kwargs: Any
+    ) -> JSONLike:
+        """
+        Handler method for the 'GET_STATE' requests.
+
+        Implement this method in the sub class if you want
+        to handle the contract requests manually.
+
+        :param ledger_api: the ledger apis.
+        :param contract_address: the contract address.
+        :param kwargs: the keyword arguments.
+        :return: the tx  # noqa: DAR202
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    @classmethod
+    def get_logs(  # pylint: disable=too-many-arguments
+        cls,
+        ledger_api: LedgerApi,
+        contract_address: str,
+        topics: List[str],
+        from_block: int,
+        block_identifier: Union[int, str] = "latest",
+        other_pools: Optional[List[str]] = None,
+    ) -> JSONLike:
+        """
+        Get the logs of a pool, and of some other pools, with a single `eth_getLogs`.
+
+        :param ledger_api: the ledger api.
+        :param contract_address: the pool address.
+        :param topics: the topics of the logs, any of which may match.
+        :param from_block: the first block of the logs.
+        :param block_identifier: the last block of the logs.
+        :param other_pools: the addresses of the other pools to get the logs of.
+        :return: the block number and timestamp of the last block, and the logs in a JSON-serializable form.
+        """
+        block = ledger_api.api.eth.get_block(block_identifier)
+        to_block = int(block["number"])
+        logs = []
+        if from_block <= to_block:
+            addresses = [contract_address, *(other_pools or [])]
+            logs = ledger_api.api.eth.get_logs(
+                dict(
+                    address=[
+                        ledger_api.api.to_checksum_address(address)
+                        for address in addresses
+                    ],
+                    topics=[topics],
+                    fromBlock=from_block,
+                    toBlock=to_block,
+                )
+            )
+        return dict(
+            block_number=to_block,
+            block_timestamp=int(block["timestamp"]),
+            logs=[
+                dict(
+                    address=log["address"],
+                    topics=[ledger_api.api.to_hex(topic) for topic in log["topics"]],
+                    data=ledger_api.api.to_hex(log["data"]),
+                    blockNumber=int(log["blockNumber"]),
+                    logIndex=int(log["logIndex"]),
+                )
+                for log in logs
+            ],
+        )
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Tests for the pool contract."""
+
+from unittest.mock import MagicMock
+
+from hexbytes import HexBytes
+from web3 import Web3
+
+from packages.celo.contracts.pool.contract import PoolContract
+
+
+POOL = "0x1e593f1fe7b61c53874b54ec0c59fd0d5eb8621e"
+OTHER_POOL = "0x765de816845861e75a25fca122bb6898b8b1282a"
+
+
+def test_get_logs() -> None:
+    """Test that the logs up to a block are fetched in a JSON-serializable form."""
+    api = MagicMock(to_hex=Web3.to_hex, to_checksum_address=Web3.to_checksum_address)
+    api.eth.get_block.return_value = dict(
+        number=9, hash=HexBytes("0x" + "02" * 32), timestamp=1700000000
+    )
+    api.eth.get_logs.return_value = [
+        dict(
+            address=Web3.to_checksum_address(POOL),
+            topics=[HexBytes("0x" + "03" * 32)],
+            data=HexBytes("0x" + "00" * 31 + "04"),
+            blockNumber=8,
+            logIndex=1,
+        )
+    ]
+    ledger_api = MagicMock(api=api)
+
+    state = PoolContract.get_logs(
+        ledger_api, POOL, ["0x03"], 5, other_pools=[OTHER_POOL]
+    )
+
+    api.eth.get_block.assert_called_once_with("latest")
+    (log_filter,) = api.eth.get_logs.call_args[0]
+    assert log_filter["address"] == [
+        Web3.to_checksum_address(POOL),
+        Web3.to_checksum_address(OTHER_POOL),
+    ]
+    assert (log_filter["fromBlock"], log_filter["toBlock"]) == (5, 9)
+    assert state == dict(
+        block_number=9,
+        block_timestamp=1700000000,
+        logs=[
+            dict(
+                address=Web3.to_checksum_address(POOL),
+                topics=["0x" + "03" * 32],
+                data="0x" + "00" * 31 + "04",
+                blockNumber=8,
+                logIndex=1,
+            )
+        ],
+    )
+
+    api.eth.get_logs.reset_mock()
+    state = PoolContract.get_logs(ledger_api, POOL, ["0x03"], 10)
+    api.eth.get_logs.assert_not_called()
+    assert state["logs"] == []
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the aggregation of numeric vectors across agents."""
+
+import warnings
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+
+# scales the median absolute deviation to the standard deviation of a normal distribution
+MAD_SCALE = 1.4826
+
+
+def stack_vectors(
+    vectors: List[Mapping[str, Optional[float]]]
+) -> Tuple[List[str], np.ndarray]:
+    """
+    Stack the vectors of the agents into a matrix, one row per agent.
+
+    :param vectors: the vectors, as mappings of keys to values.
+    :return: the sorted keys, and the matrix with NaN where an agent has no value.
+    """
+    keys = sorted({key for vector in vectors for key in vector})
+    matrix = np.full((len(vectors), len(keys)), np.nan)
+    for row, vector in enumerate(vectors):
+        for column, key in enumerate(keys):
+            value = vector.get(key)
+            if value is not None:
+                matrix[row, column] = value
+    return keys, matrix
+
+
+def outlier_mask(
+    matrix: np.ndarray, mad_threshold: float, tolerance: float
+) -> np.ndarray:
+    """
+    Flag the values that deviate too much from the median of their column.
+
+    A value is an outlier if it is further from the median than `mad_threshold` scaled
+    median absolute deviations and than `tolerance` times the median. The latter keeps
+    tiny differences from being flagged when the agents mostly agree.
+
+    :param matrix: the values, one row per agent and NaN where a value is missing.
+    :param mad_threshold: the number of scaled median absolute deviations allowed.
+    :param tolerance: the deviation allowed, relative to the median.
+    :return: the boolean mask of the outliers, with the shape of the matrix.
+    """
+    with warnings.catch_warnings():
+        # columns without any value are expected, their median is NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        median = np.nanmedian(matrix, axis=0)
+        deviation = np.abs(matrix - median)
+        mad = np.nanmedian(deviation, axis=0)
+        allowed = np.maximum(
+            mad_threshold * MAD_SCALE * mad, tolerance * np.abs(median)
+        )
+        return deviation > allowed
+
+
+def median_aggregate(
+    vectors: List[Mapping[str, Optional[float]]],
+    mad_threshold: float,
+    tolerance: float,
+) -> Tuple[Dict[str, float], np.ndarray]:
+    """
+    Aggregate the vectors of the agents with an element-wise median of the inliers.
+
+    :param vectors: the vectors, as mappings of keys to values.
+    :param mad_threshold: the number of scaled median absolute deviations allowed.
+    :param tolerance: the deviation allowed, relative to the median.
+    :return: the aggregated vector without the keys no agent has a value for, and the
+        outlier mask, one row per vector and one column per sorted key.
+    """
+    keys, matrix = stack_vectors(vectors)
+    mask = outlier_mask(matrix, mad_threshold, tolerance)
+    inliers = np.where(mask, np.nan, matrix)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        median = np.nanmedian(inliers, axis=0)
+    aggregated = {
+        key: float(value) for key, value in zip(keys, median) if not np.isnan(value)
+    }
+    return aggregated, mask
@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""
+A command line tool that backfills the local OHLCV history of a pair.
+
+It splits a block range into chunks, fetches the `Swap`/`Sync` logs of the pool with a
+pool of workers, and folds them into the store the agent reads its history from. A
+checkpoint is written after every chunk, so an interrupted backfill resumes where it
+stopped:
+
+    python -m packages.celo.skills.celo_swapper.backfill \\
+        --pair CELO-cUSD --pool 0x... --from-block 20000000 --rpc https://forno.celo.org
+"""
+
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Deque, Iterator, List, Optional, Tuple
+
+import click
+import requests
+
+from packages.celo.skills.celo_swapper.events import (
+    POOL_EVENT_TOPICS,
+    PoolEvent,
+    block_candles,
+    decode_pool_log,
+)
+from packages.celo.skills.celo_swapper.history import OHLCVStore, history_path
+from packages.celo.skills.celo_swapper.market_data import V2_POOL, V3_POOL
+from packages.celo.skills.celo_swapper.rpc import (
+    Chunk,
+    FixtureSource,
+    RpcError,
+    RpcSource,
+    Source,
+    split_range,
+)
+
+
+_logger = logging.getLogger("celo_swapper.backfill")
+
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_WORKERS = 8
+DEFAULT_RETRIES = 3
+RETRY_BACKOFF = 1.0
+
+
+class BackfillError(Exception):
+    """An error raised while backfilling."""
+
+
+def fetch_chunk(
+    source: Source, pool: str, pool_type: str, chunk: Chunk, retries: int
+) -> Tuple[List[PoolEvent], Tuple[int, int], Tuple[int, int]]:
+    """
+    Fetch the events of a pool in a chunk, retrying with a backoff on failures.
+
+    :param source: the source to fetch from.
+    :param pool: the address of the pool.
+    :param pool_type: the type of the pool.
+    :param chunk: the inclusive block range.
+    :param retries: the number of retries.
+    :return: the events, and the timestamps of the first and the last block of the chunk.
+    """
+    start, end = chunk
+    for attempt in range(retries + 1):
+        try:
+            logs = source.get_logs(pool, POOL_EVENT_TOPICS[pool_type], start, end)
+            first = (start, source.get_block_timestamp(start))
+            last = (end, source.get_block_timestamp(end))
+            events = [event for event in map(decode_pool_log, logs) if event]
+            return events, first, last
+        except (requests.RequestException, RpcError, KeyError) as e:
+            if attempt == retries:
+                raise BackfillError(f"Could not fetch blocks {start}-{end}: {e}") from e
+            _logger.warning(f"Retrying blocks {start}-{end} after: {e}")
+            time.sleep(RETRY_BACKOFF * 2**attempt)
+    raise BackfillError("unreachable")  # pragma: nocover
+
+
+def interpolate_timestamp(
+    block_number: int, first: Tuple[int, int], last: Tuple[int, int]
+) -> int:
+    """Estimate the timestamp of a block from the ones of the bounds of its chunk."""
+    (first_block, first_timestamp), (last_block, last_timestamp) = first, last
+    if last_block == first_block:
+        return first_timestamp
+    ratio = (block_number - first_block) / (last_block - first_block)
+    return int(first_timestamp + ratio * (last_timestamp - first_timestamp))
+
+
+def read_checkpoint(path: Path) -> Optional[int]:
+    """Read the next block to backfill from a checkpoint, if there is one."""
+    if not path.exists():
+        return None
+    return int(json.loads(path.read_text())["next_block"])
+
+
+def write_checkpoint(path: Path, next_block: int) -> None:
+    """Atomically write the next block to backfill to a checkpoint."""
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(dict(next_block=next_block)))
+    os.replace(tmp_path, path)
+
+
+def _in_order(
+    executor: ThreadPoolExecutor,
+    fetch: Callable[[Chunk], Any],
+    chunks: List[Chunk],
+    window: int,
+) -> Iterator[Tuple[Chunk, Any]]:
+    """Fetch the chunks in parallel, yielding the results in order with a bounded window."""
+    pending: Deque[Tuple[Chunk, Future]] = deque()
+    remaining = iter(chunks)
+    for chunk in remaining:
+        pending.append((chunk, executor.submit(fetch, chunk)))
+        if len(pending) >= window:
+            break
+    while pending:
+        chunk, future = pending.popleft()
+        result = future.result()
+        next_chunk = next(remaining, None)
+        if next_chunk is not None:
+            pending.append((next_chunk, executor.submit(fetch, next_chunk)))
+        yield chunk, result
+
+
+def run_backfill(  # pylint: disable=too-many-arguments,too-many-locals
+    source: Source,
+    store: OHLCVStore,
+    checkpoint_path: Path,
+    pool: str,
+    pool_type: str,
+    from_block: int,
+    to_block: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = DEFAULT_WORKERS,
+    retries: int = DEFAULT_RETRIES,
+) -> int:
+    """
+    Backfill the store with the events of a pool in a block range.
+
+    The chunks are fetched in parallel but folded into the store in block order, since
+    the store is append-only. The checkpoint is moved after every folded chunk.
+
+    :param source: the source to fetch from.
+    :param store: the store of the pair.
+    :param checkpoint_path: the path of the checkpoint.
+    :param pool: the address of the pool.
+    :param pool_type: the type of the pool.
+    :param from_block: the first block to backfill.
+    :param to_block: the last block to backfill.
+    :param chunk_size: the number of blocks fetched at once.
+    :param workers: the number of parallel workers.
+    :param retries: the number of retries per chunk.
+    :return: the number of blocks folded into the store.
+    """
+    start = max(from_block, read_checkpoint(checkpoint_path) or from_block)
+    if store.last_block >= start:
+        _logger.info(f"The store already has blocks up to {store.last_block}.")
+        start = store.last_block + 1
+    chunks = split_range(start, to_block, chunk_size)
+    if not chunks:
+        _logger.info("Nothing to backfill.")
+        return 0
+
+    folded = 0
+    last_price: Optional[float] = None
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        fetch = partial(fetch_chunk, source, pool, pool_type, retries=retries)
+        results = _in_order(executor, fetch, chunks, 2 * workers)
+        for (chunk_start, chunk_end), (events, first, last) in results:
+            candles, last_price = block_candles(events, last_price)
+            for candle in candles:
+                timestamp = interpolate_timestamp(candle.block_number, first, last)
+                folded += store.merge(
+                    timestamp,
+                    candle.block_number,
+                    candle.open,
+                    candle.high,
+                    candle.low,
+                    candle.close,
+                    candle.volume,
+                )
+            store.flush()
+            write_checkpoint(checkpoint_path, chunk_end + 1)
+            _logger.info(
+                f"Backfilled blocks {chunk_start}-{chunk_end}: {len(events)} events."
+            )
+    return folded
+
+
+@click.command()
+@click.option("--pair", required=True, help="The name of the pair, as in `pairs`.")
+@click.option("--pool", required=True, help="The address of the pool.")
+@click.option(
+    "--pool-type",
+    type=click.Choice([V2_POOL, V3_POOL]),
+    default=V2_POOL,
+    show_default=True,
+)
+@click.option("--from-block", type=int, required=True, help="The first block.")
+@click.option("--to-block", type=int, default=None, help="The last block [latest].")
+@click.option("--rpc", "rpc_url", default=None, help="The JSON-RPC endpoint.")
+@click.option(
+    "--fixture",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="A recorded fixture to backfill from instead of an endpoint.",
+)
+@click.option(
+    "--history-dir",
+    type=click.Path(file_okay=False),
+    default="history",
+    show_default=True,
+    help="The `history_dir` of the agent.",
+)
+@click.option("--interval", type=int, default=60, show_default=True)
+@click.option("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, show_default=True)
+@click.option("--workers", type=int, default=DEFAULT_WORKERS, show_default=True)
+@click.option("--retries", type=int, default=DEFAULT_RETRIES, show_default=True)
+def backfill(  # pylint: disable=too-many-arguments
+    pair: str,
+    pool: str,
+    pool_type: str,
+    from_block: int,
+    to_block: Optional[int],
+    rpc_url: Optional[str],
+    fixture: Optional[str],
+    history_dir: str,
+    interval: int,
+    chunk_size: int,
+    workers: int,
+    retries: int,
+) -> None:
+    """Backfill the local OHLCV history of a pair from the logs of its pool."""
+    if (rpc_url is None) == (fixture is None):
+        raise click.UsageError("Exactly one of --rpc and --fixture is required.")
+    source: Source = RpcSource(rpc_url) if rpc_url else FixtureSource(str(fixture))
+    if to_block is None:
+        to_block = source.get_block_number()
+
+    path = history_path(history_dir, pair)
+    store = OHLCVStore(path, interval)
+    try:
+        folded = run_backfill(
+            source,
+            store,
+            path.with_suffix(".checkpoint"),
+            pool,
+            pool_type,
+            from_block,
+            to_block,
+            chunk_size,
+            workers,
+            retries,
+        )
+    except BackfillError as e:
+        raise click.ClickException(f"{e} Run the same command again to resume.")
+    click.echo(f"Folded {folded} blocks into {path}, up to block {to_block}.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    backfill()  # pylint: disable=no-value-for-parameter
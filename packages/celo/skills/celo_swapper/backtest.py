@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""
+A command line tool that backtests the strategies on the local OHLCV history of a pair.
+
+The history is replayed candle by candle through the same indicator engine and the same
+strategy entry points as `StrategyEvaluationBehaviour`, and the swaps are filled at the
+open of the next candle with a fee and a price impact that grows with the share of the
+candle's volume the swap takes. Parameter sweeps run across a pool of processes:
+
+    python -m packages.celo.skills.celo_swapper.backtest \\
+        --pair CELO-cUSD --lookback 10,20,40 --sensitivity 5,10 --swap-threshold 0.3,0.5
+"""
+
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar
+
+import click
+import numpy as np
+
+from packages.celo.skills.celo_swapper.history import OHLCVStore, history_path
+from packages.celo.skills.celo_swapper.indicators import IndicatorEngine
+from packages.celo.skills.celo_swapper.strategies import (
+    FeatureMatrix,
+    available_strategies,
+    load_strategy,
+)
+
+
+DEFAULT_FEE = 0.003
+DEFAULT_IMPACT = 0.1
+DEFAULT_MAX_SLIPPAGE = 0.05
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class BacktestConfig:
+    """A configuration of the strategy to backtest."""
+
+    strategy: str
+    lookback: int
+    sensitivity: float
+    swap_threshold: float
+
+    def params(self) -> SimpleNamespace:
+        """Get the params the strategy is called with, as the skill params would be."""
+        return SimpleNamespace(
+            strategies=[self.strategy],
+            strategy_lookback=self.lookback,
+            strategy_sensitivity=self.sensitivity,
+            swap_signal_threshold=self.swap_threshold,
+        )
+
+
+@dataclass(frozen=True)
+class FillModel:
+    """
+    Fill swaps at a price worse than the quoted one by the fee and the price impact.
+
+    The impact is `impact` times the share of the candle's volume the swap takes, capped
+    with the fee at `max_slippage`. Candles without a recorded volume only cost the fee.
+    """
+
+    fee: float = DEFAULT_FEE
+    impact: float = DEFAULT_IMPACT
+    max_slippage: float = DEFAULT_MAX_SLIPPAGE
+
+    def slippage(self, amount: float, volume: float) -> float:
+        """Get the relative slippage of swapping `amount` of token0 in a candle."""
+        participation = amount / volume if volume > 0 else 0.0
+        return min(self.fee + self.impact * participation, self.max_slippage)
+
+    def fill_price(
+        self, price: float, amount: float, volume: float, buy: bool
+    ) -> float:
+        """Get the price a swap of `amount` of token0 is filled at."""
+        slippage = self.slippage(amount, volume)
+        return price * (1 + slippage) if buy else price * (1 - slippage)
+
+
+@dataclass(frozen=True)
+class BacktestResult:
+    """The performance of a configuration."""
+
+    config: BacktestConfig
+    pnl: float
+    max_drawdown: float
+    trades: int
+
+    def to_dict(self, capital: float) -> Dict[str, Any]:
+        """Get the result as a flat mapping."""
+        return dict(
+            **asdict(self.config),
+            pnl=self.pnl,
+            return_pct=100 * self.pnl / capital,
+            max_drawdown_pct=100 * self.max_drawdown,
+            trades=self.trades,
+        )
+
+
+def max_drawdown(equity: np.ndarray) -> float:
+    """Get the largest relative drop of an equity curve from its running peak."""
+    if len(equity) == 0:
+        return 0.0
+    peaks = np.maximum.accumulate(equity)
+    return float(np.max((peaks - equity) / peaks))
+
+
+def run_backtest(  # pylint: disable=too-many-locals
+    pair: str,
+    candles: np.ndarray,
+    config: BacktestConfig,
+    fill_model: FillModel,
+    capital: float,
+    trade_size: float,
+) -> BacktestResult:
+    """
+    Replay the candles of a pair through a strategy, trading long or flat.
+
+    At every candle the strategy sees the indicators of the candles closed before it and
+    the close of the candle as the current price, like the agent sees the open candle. A
+    score of at least `swap_threshold` buys and one of at most `-swap_threshold` sells
+    everything, and the swap is filled at the open of the next candle.
+
+    :param pair: the pair.
+    :param candles: the candles of the pair, oldest first.
+    :param config: the configuration to backtest.
+    :param fill_model: the fill model.
+    :param capital: the starting capital, in token1.
+    :param trade_size: the size of every buy, in token1.
+    :return: the result.
+    """
+    strategy = load_strategy(config.strategy)
+    params = config.params()
+    engine = IndicatorEngine(config.lookback)
+    cash, position, trades = capital, 0.0, 0
+    equity = np.empty(max(len(candles) - 1, 0))
+    for i in range(len(candles) - 1):
+        candle, next_candle = candles[i], candles[i + 1]
+        price = float(candle["close"])
+        matrix = FeatureMatrix.build({pair: price}, {pair: engine.values()})
+        scores = strategy(matrix, params)
+        score = scores.get(pair, 0.0)
+        next_open, next_volume = float(next_candle["open"]), float(
+            next_candle["volume"]
+        )
+        if score >= config.swap_threshold and cash > 0:
+            spend = min(trade_size, cash)
+            amount = spend / next_open
+            position += spend / fill_model.fill_price(
+                next_open, amount, next_volume, True
+            )
+            cash -= spend
+            trades += 1
+        elif score <= -config.swap_threshold and position > 0:
+            fill = fill_model.fill_price(next_open, position, next_volume, False)
+            cash += position * fill
+            position = 0.0
+            trades += 1
+        engine.update(candle)
+        equity[i] = cash + position * float(next_candle["close"])
+    final = equity[-1] if len(equity) else capital
+    return BacktestResult(config, float(final - capital), max_drawdown(equity), trades)
+
+
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(state: Dict[str, Any]) -> None:
+    """Keep the candles and the settings shared by every run of a worker."""
+    _worker_state.update(state)
+
+
+def _run_config(config: BacktestConfig) -> BacktestResult:
+    """Run a configuration with the state of the worker."""
+    return run_backtest(config=config, **_worker_state)
+
+
+def _split(parse: Callable[[str], T]) -> Callable[[Any, Any, str], List[T]]:
+    """Get a click callback that parses a comma-separated list of values."""
+
+    def callback(_ctx: Any, _param: Any, value: str) -> List[T]:
+        """Parse the values."""
+        try:
+            return [parse(item) for item in value.split(",") if item]
+        except ValueError as e:
+            raise click.BadParameter(str(e)) from e
+
+    return callback
+
+
+def sweep(  # pylint: disable=too-many-arguments
+    pair: str,
+    candles: np.ndarray,
+    configs: Sequence[BacktestConfig],
+    fill_model: FillModel,
+    capital: float,
+    trade_size: float,
+    workers: Optional[int] = None,
+) -> List[BacktestResult]:
+    """
+    Backtest every configuration across a pool of processes.
+
+    The candles are sent to every worker once, when it starts.
+
+    :param pair: the pair.
+    :param candles: the candles of the pair, oldest first.
+    :param configs: the configurations to backtest.
+    :param fill_model: the fill model.
+    :param capital: the starting capital, in token1.
+    :param trade_size: the size of every buy, in token1.
+    :param workers: the number of processes, the number of CPUs by default.
+    :return: the results, in the order of the configurations.
+    """
+    state = dict(
+        pair=pair,
+        candles=candles,
+        fill_model=fill_model,
+        capital=capital,
+        trade_size=trade_size,
+    )
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(state,)
+    ) as executor:
+        chunksize = max(len(configs) // (4 * (workers or os.cpu_count() or 1)), 1)
+        return list(executor.map(_run_config, configs, chunksize=chunksize))
+
+
+@click.command()
+@click.option("--pair", required=True, help="The name of the pair, as in `pairs`.")
+@click.option(
+    "--history-dir",
+    type=click.Path(exists=True, file_okay=False),
+    default="history",
+    show_default=True,
+    help="The `history_dir` of the agent.",
+)
+@click.option("--interval", type=int, default=60, show_default=True)
+@click.option(
+    "--strategy",
+    "strategies",
+    default="momentum",
+    show_default=True,
+    callback=_split(str),
+    help="Comma-separated strategies.",
+)
+@click.option(
+    "--lookback",
+    default="20",
+    show_default=True,
+    callback=_split(int),
+    help="Comma-separated lookbacks, in candles.",
+)
+@click.option(
+    "--sensitivity",
+    default="10.0",
+    show_default=True,
+    callback=_split(float),
+    help="Comma-separated sensitivities.",
+)
+@click.option(
+    "--swap-threshold",
+    default="0.5",
+    show_default=True,
+    callback=_split(float),
+    help="Comma-separated swap thresholds.",
+)
+@click.option("--fee", type=float, default=DEFAULT_FEE, show_default=True)
+@click.option("--impact", type=float, default=DEFAULT_IMPACT, show_default=True)
+@click.option(
+    "--max-slippage", type=float, default=DEFAULT_MAX_SLIPPAGE, show_default=True
+)
+@click.option("--capital", type=float, default=1000.0, show_default=True)
+@click.option("--trade-size", type=float, default=100.0, show_default=True)
+@click.option("--workers", type=int, default=None, help="[number of CPUs]")
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="A file to write the results to, as JSON.",
+)
+def backtest(  # pylint: disable=too-many-arguments,too-many-locals
+    pair: str,
+    history_dir: str,
+    interval: int,
+    strategies: List[str],
+    lookback: List[int],
+    sensitivity: List[float],
+    swap_threshold: List[float],
+    fee: float,
+    impact: float,
+    max_slippage: float,
+    capital: float,
+    trade_size: float,
+    workers: Optional[int],
+    output: Optional[str],
+) -> None:
+    """Backtest every combination of the given parameters on the history of a pair."""
+    unknown = set(strategies) - set(available_strategies())
+    if unknown:
+        raise click.BadParameter(
+            f"Unknown strategies {sorted(unknown)}, expected {available_strategies()}.",
+            param_hint="--strategy",
+        )
+    path = history_path(history_dir, pair)
+    if not path.exists():
+        raise click.ClickException(f"No history at {path}.")
+    candles = OHLCVStore(path, interval).candles.copy()
+
+    configs = [
+        BacktestConfig(*values)
+        for values in itertools.product(
+            strategies, lookback, sensitivity, swap_threshold
+        )
+    ]
+    results = sweep(
+        pair,
+        candles,
+        configs,
+        FillModel(fee, impact, max_slippage),
+        capital,
+        trade_size,
+        workers,
+    )
+    rows = sorted(
+        (result.to_dict(capital) for result in results),
+        key=lambda row: row["pnl"],
+        reverse=True,
+    )
+    click.echo(f"Backtested {len(configs)} configurations on {len(candles)} candles.")
+    click.echo(
+        f"{'strategy':<12}{'lookback':>9}{'sensitivity':>12}{'threshold':>10}"
+        f"{'pnl':>12}{'return %':>10}{'drawdown %':>12}{'trades':>8}"
+    )
+    for row in rows:
+        click.echo(
+            f"{row['strategy']:<12}{row['lookback']:>9}{row['sensitivity']:>12g}"
+            f"{row['swap_threshold']:>10g}{row['pnl']:>12.4f}{row['return_pct']:>10.2f}"
+            f"{row['max_drawdown_pct']:>12.2f}{row['trades']:>8}"
+        )
+    if output is not None:
+        with open(output, "w", encoding="utf-8") as file:
+            json.dump(rows, file, indent=2)
+
+
+if __name__ == "__main__":
+    backtest()  # pylint: disable=no-value-for-parameter
@@ -19,21 +19,87 @@
 
 """This package contains round behaviours of CeloSwapperAbciApp."""
 
+import hashlib
+import json
+import math
+import time
 from abc import ABC
-from typing import Generator, Set, Type, cast
+from collections import deque
+from dataclasses import asdict
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Generator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
+
+from aea.protocols.base import Message
 
+from packages.valory.protocols.contract_api import ContractApiMessage
+from packages.valory.protocols.http import HttpMessage
+from packages.valory.protocols.ipfs import IpfsMessage
+from packages.valory.protocols.ledger_api import LedgerApiMessage
 from packages.valory.skills.abstract_round_abci.base import AbstractRound
+from packages.valory.skills.abstract_round_abci.behaviour_utils import (
+    TimeoutException,
+)
 from packages.valory.skills.abstract_round_abci.behaviours import (
     AbstractRoundBehaviour,
     BaseBehaviour,
 )
+from packages.valory.skills.abstract_round_abci.io_.store import (
+    SupportedFiletype,
+    SupportedObjectType,
+)
+from packages.valory.skills.abstract_round_abci.models import Requests
 
-from packages.celo.skills.celo_swapper.models import Params
+from packages.celo.contracts.agent_mech.contract import AgentMechContract
+from packages.celo.contracts.multicall3.contract import Multicall3Contract
+from packages.celo.contracts.pool.contract import PoolContract
+from packages.celo.skills.celo_swapper.delivery import (
+    delivery_cid,
+    delivery_result,
+    pending_requests,
+)
+from packages.celo.skills.celo_swapper.fixed_point import BPS
+from packages.celo.skills.celo_swapper.market_data import (
+    ORACLE_READ,
+    SPOT_AMOUNT,
+    build_pair_reads,
+    pair_price,
+    parse_pair_reads,
+    parse_source_price,
+    serialize_snapshot,
+    snapshot_digest,
+)
+from packages.celo.skills.celo_swapper.mech import (
+    MechMetadata,
+    build_mech_requests,
+    serialize_requests,
+)
+from packages.celo.skills.celo_swapper.models import (
+    IpfsPins,
+    LatencyBudget,
+    MarketHistory,
+    MechCache,
+    MechDeliveries,
+    Params,
+    QuoteCache,
+    SharedState,
+    SourceHealth,
+)
 from packages.celo.skills.celo_swapper.rounds import (
     SynchronizedData,
     CeloSwapperAbciApp,
     DecisionMakingRound,
-    FinishedDecisionMakingRound,
     MarketDataCollectionRound,
     MechRequestPreparationRound,
     StrategyEvaluationRound,
@@ -41,12 +107,20 @@ from packages.celo.skills.celo_swapper.rounds import (
 )
 from packages.celo.skills.celo_swapper.rounds import (
     DecisionMakingPayload,
-    FinishedDecisionMakingPayload,
     MarketDataCollectionPayload,
     MechRequestPreparationPayload,
     StrategyEvaluationPayload,
     SwapPreparationPayload,
 )
+from packages.celo.skills.celo_swapper.router import pair_tokens
+from packages.celo.skills.celo_swapper.strategies import (
+    FeatureMatrix,
+    rank_candidates,
+    run_strategies,
+)
+
+
+MARKET_DATA_FILENAME = "market_data.json"
 
 
 class CeloSwapperBaseBehaviour(BaseBehaviour, ABC):
@@ -62,39 +136,477 @@ class CeloSwapperBaseBehaviour(BaseBehaviour, ABC):
         """Return the params."""
         return cast(Params, super().params)
 
+    @property
+    def shared_state(self) -> SharedState:
+        """Return the shared state."""
+        return cast(SharedState, super().shared_state)
+
+    @property
+    def market_history(self) -> MarketHistory:
+        """Return the local market history."""
+        return cast(MarketHistory, self.context.market_history)
+
+    @property
+    def latency_budget(self) -> LatencyBudget:
+        """Return the latency budget of the strategy evaluation."""
+        return cast(LatencyBudget, self.context.latency_budget)
+
+    @property
+    def mech_cache(self) -> MechCache:
+        """Return the cache of the mech results."""
+        return cast(MechCache, self.context.mech_cache)
+
+    @property
+    def mech_deliveries(self) -> MechDeliveries:
+        """Return the watcher of the mech deliveries."""
+        return cast(MechDeliveries, self.context.mech_deliveries)
+
+    @property
+    def ipfs_pins(self) -> IpfsPins:
+        """Return the hashes of the files pinned on IPFS."""
+        return cast(IpfsPins, self.context.ipfs_pins)
+
+    @property
+    def source_health(self) -> SourceHealth:
+        """Return the health registry of the sources."""
+        return cast(SourceHealth, self.context.source_health)
+
+    @property
+    def quote_cache(self) -> QuoteCache:
+        """Return the block-pinned quote cache."""
+        return cast(QuoteCache, self.context.quote_cache)
+
+    def run_in_task_pool(
+        self, func: Callable[..., Any], *args: Any, timeout: Optional[float] = None
+    ) -> Generator[None, None, Any]:
+        """
+        Run a function on the task manager of the agent and wait for its result.
+
+        The behaviour yields while the function runs, so handlers and other behaviours
+        keep running. With `task_manager_mode: multiprocess` in the agent config, the
+        function runs in a worker process, and it and its arguments must be picklable.
+
+        :param func: the function, defined at module level.
+        :param args: the positional arguments of the function.
+        :param timeout: the maximum time to wait for the result.
+        :yield: None
+        :return: the result of the function.
+        :raises TimeoutException: if the result did not arrive in time.
+        """
+        task_manager = self.context.task_manager
+        result = task_manager.get_task_result(task_manager.enqueue_task(func, args))
+        yield from self.wait_for_condition(result.ready, timeout)
+        return result.get()
+
+    def get_http_responses(
+        self,
+        urls: Dict[str, str],
+        quorum: int,
+        timeout: Optional[float] = None,
+    ) -> Generator[None, None, Dict[str, HttpMessage]]:
+        """
+        Send GET requests to all the urls at once and wait until a quorum has answered.
+
+        Unlike `get_http_response`, the requests do not wait on each other. The
+        behaviour resumes as soon as `quorum` requests succeeded, all of them answered,
+        or the timeout expired, whichever comes first. Responses arriving later are
+        ignored. The latency and the outcome of every request are recorded in the
+        health registry of the sources. The requests still pending at quorum are
+        recorded as stragglers, with the timeout as a penalty, or the time waited for
+        them without one.
+
+        :param urls: the urls to request, by name.
+        :param quorum: the number of successful responses to wait for.
+        :param timeout: the maximum time to wait for the quorum.
+        :yield: None
+        :return: the successful responses received in time, by name.
+        """
+        responses: Dict[str, HttpMessage] = {}
+        pending: Set[str] = set()
+        requests = cast(Requests, self.context.requests)
+        started = time.monotonic()
+
+        def collect(name: str) -> Callable[[Message, BaseBehaviour], None]:
+            """Get the callback that collects the response of a request."""
+
+            def callback(message: Message, _current_behaviour: BaseBehaviour) -> None:
+                """Collect the response, unless the request is no longer pending."""
+                if name not in pending:
+                    return
+                pending.discard(name)
+                message = cast(HttpMessage, message)
+                success = 200 <= message.status_code < 300
+                self.source_health.record(name, time.monotonic() - started, success)
+                if success:
+                    responses[name] = message
+                else:
+                    self.context.logger.warning(
+                        f"{name} responded with {message.status_code}."
+                    )
+
+            return callback
+
+        for name, url in urls.items():
+            message, dialogue = self._build_http_request_message("GET", url)
+            self.context.outbox.put_message(message=message)
+            nonce = self._get_request_nonce_from_dialogue(dialogue)
+            requests.request_id_to_callback[nonce] = collect(name)
+            pending.add(name)
+
+        timed_out = False
+        try:
+            yield from self.wait_for_condition(
+                lambda: len(responses) >= quorum or not pending, timeout
+            )
+        except TimeoutException:
+            timed_out = True
+            self.context.logger.warning(
+                f"Only {len(responses)} out of {quorum} responses arrived in time."
+            )
+        if pending:
+            self.context.logger.info(f"Ignoring the stragglers: {sorted(pending)}.")
+            elapsed = time.monotonic() - started
+            for name in pending:
+                if timed_out:
+                    self.source_health.record(name, elapsed, False)
+                else:
+                    self.source_health.record_straggler(
+                        name, elapsed if timeout is None else timeout
+                    )
+            pending.clear()
+        return dict(responses)
+
+    def send_files_to_ipfs(
+        self,
+        objs: Dict[str, SupportedObjectType],
+        filetype: Optional[SupportedFiletype] = None,
+        timeout: Optional[float] = None,
+    ) -> Generator[None, None, Dict[str, str]]:
+        """
+        Store objects on IPFS, each as a single file, several at a time.
+
+        Unlike `send_to_ipfs`, the uploads do not wait on each other: up to
+        `ipfs_max_in_flight` of them are pending at once, over the client the IPFS
+        connection keeps to the node. The hash of every file is computed locally first,
+        and the files that were already pinned are not uploaded again.
+
+        :param objs: the objects to store, by file name.
+        :param filetype: the file type of the objects.
+        :param timeout: the maximum time to wait for all the uploads.
+        :yield: None
+        :return: the hashes of the files that are pinned, by file name.
+        """
+        hashes: Dict[str, str] = {}
+        queue: Deque[Tuple[str, Dict[str, str], str]] = deque()
+        for filename, obj in objs.items():
+            files = self._ipfs_interact.store(filename, obj, False, filetype, None)
+            ((path, data),) = files.items()
+            ipfs_hash = self.ipfs_pins.content_hash(path, data)
+            if ipfs_hash in self.ipfs_pins:
+                hashes[filename] = ipfs_hash
+            else:
+                queue.append((filename, files, ipfs_hash))
+        pinned = len(hashes)
+        in_flight: Set[str] = set()
+        requests = cast(Requests, self.context.requests)
+
+        def collect(
+            filename: str, expected: str
+        ) -> Callable[[Message, BaseBehaviour], None]:
+            """Get the callback that collects the hash of an upload."""
+
+            def callback(message: Message, _current_behaviour: BaseBehaviour) -> None:
+                """Collect the hash, unless the upload is no longer pending."""
+                if filename not in in_flight:
+                    return
+                in_flight.discard(filename)
+                message = cast(IpfsMessage, message)
+                if message.performative != IpfsMessage.Performative.IPFS_HASH:
+                    self.context.logger.error(
+                        f"Could not store {filename} on IPFS: {message.performative}"
+                    )
+                    return
+                if message.ipfs_hash != expected:
+                    self.context.logger.warning(
+                        f"{filename} was stored as {message.ipfs_hash}, "
+                        f"expected {expected}."
+                    )
+                self.ipfs_pins.add(message.ipfs_hash)
+                hashes[filename] = message.ipfs_hash
+
+            return callback
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            while queue or in_flight:
+                while queue and len(in_flight) < self.params.ipfs_max_in_flight:
+                    filename, files, expected = queue.popleft()
+                    message, dialogue = self._build_ipfs_message(
+                        performative=IpfsMessage.Performative.STORE_FILES,  # type: ignore
+                        files=files,
+                        timeout=timeout,
+                    )
+                    self.context.outbox.put_message(message=message)
+                    nonce = self._get_request_nonce_from_dialogue(dialogue)
+                    requests.request_id_to_callback[nonce] = collect(filename, expected)
+                    in_flight.add(filename)
+                pending = len(in_flight)
+                yield from self.wait_for_condition(
+                    lambda: len(in_flight) < pending,
+                    None if deadline is None else max(deadline - time.monotonic(), 0),
+                )
+        except TimeoutException:
+            self.context.logger.warning(
+                f"{len(in_flight) + len(queue)} uploads did not complete in time."
+            )
+            in_flight.clear()
+        self.context.logger.info(
+            f"Stored {len(hashes) - pinned} files on IPFS, "
+            f"{pinned} were already pinned."
+        )
+        return hashes
+
+    def get_block_number(self) -> Generator[None, None, Optional[int]]:
+        """Get the number of the latest block."""
+        response = yield from self.get_ledger_api_response(
+            performative=LedgerApiMessage.Performative.GET_STATE,  # type: ignore
+            ledger_callable="get_block_number",
+        )
+        if response.performative != LedgerApiMessage.Performative.STATE:
+            self.context.logger.error(
+                f"Could not get the latest block: {response.performative}"
+            )
+            return None
+        return int(response.state.body["get_block_number_result"])
+
+    def get_reference_prices(
+        self,
+    ) -> Generator[None, None, Dict[str, Dict[str, float]]]:
+        """
+        Get the off-chain reference prices from the configured price sources.
+
+        :yield: None
+        :return: the prices of the sources that answered, by pair and source.
+        """
+        sources = {source["name"]: source for source in self.params.price_sources}
+        ranked = self.source_health.rank(sources)
+        unavailable = sorted(set(sources) - set(ranked))
+        if unavailable:
+            self.context.logger.info(f"Skipping the failing sources: {unavailable}.")
+        quorum = min(self.params.price_source_quorum, len(ranked))
+        responses = yield from self.get_http_responses(
+            {name: sources[name]["url"] for name in ranked},
+            quorum,
+            self.source_health.timeout(
+                ranked, quorum, self.params.price_source_timeout
+            ),
+        )
+        prices: Dict[str, Dict[str, float]] = {}
+        for name, response in responses.items():
+            source = sources[name]
+            price = parse_source_price(response.body, source["path"])
+            if price is None:
+                self.context.logger.warning(f"Could not parse the price from {name}.")
+                continue
+            prices.setdefault(source["pair"], {})[name] = price
+        return prices
+
+    def read_pair_states(
+        self,
+        pairs: List[Dict[str, str]],
+        block_identifier: Union[int, str] = "latest",
+        pools: bool = True,
+    ) -> Generator[None, None, Optional[Dict[str, Any]]]:
+        """
+        Read the state of the given pairs with a single batched `eth_call`.
+
+        The states read are cached as spot quotes, pinned to the block they were read at.
+
+        :param pairs: the pairs to read.
+        :param block_identifier: the block to read the state at.
+        :param pools: whether to read the pools, or only the oracles.
+        :yield: None
+        :return: the market snapshot, or None if the state could not be read.
+        """
+        reads = build_pair_reads(pairs, self.params.sorted_oracles_address, pools)
+        response = yield from self.get_contract_api_response(
+            performative=ContractApiMessage.Performative.GET_STATE,  # type: ignore
+            contract_address=self.params.multicall3_address,
+            contract_id=str(Multicall3Contract.contract_id),
+            contract_callable="aggregate_reads",
+            reads=reads,
+            block_identifier=block_identifier,
+        )
+        if response.performative != ContractApiMessage.Performative.STATE:
+            self.context.logger.error(
+                f"Could not read the market state: {response.performative}"
+            )
+            return None
+        snapshot = parse_pair_reads(reads, response.state.body)
+        self.cache_pair_states(snapshot)
+        self.context.logger.info(
+            f"Read {len(reads)} values for {len(snapshot['pairs'])} pairs "
+            f"at block {snapshot['block_number']}."
+        )
+        return snapshot
+
+    def cache_pair_states(self, snapshot: Dict[str, Any]) -> None:
+        """Cache the states of a snapshot as spot quotes, pinned to its block."""
+        for pair, state in snapshot["pairs"].items():
+            self.quote_cache.put(pair, SPOT_AMOUNT, snapshot["block_number"], state)
+
+    def get_market_data(self) -> Generator[None, None, Optional[Dict[str, Any]]]:
+        """
+        Get the agreed market data snapshot.
+
+        The snapshot is fetched from IPFS if the agents agreed on its hash only, and is
+        checked against the agreed digest in either case.
+
+        :yield: None
+        :return: the snapshot, or None if it could not be fetched or does not match.
+        """
+        content = self.synchronized_data.market_data
+        ipfs_hash = self.synchronized_data.market_data_ipfs_hash
+        if content is None and ipfs_hash is not None:
+            snapshot = yield from self.get_from_ipfs(
+                ipfs_hash, filetype=SupportedFiletype.JSON
+            )
+            if snapshot is None:
+                return None
+            content = serialize_snapshot(cast(Dict[str, Any], snapshot))
+        if (
+            content is None
+            or snapshot_digest(content) != self.synchronized_data.market_data_digest
+        ):
+            self.context.logger.error(
+                "The market data does not match the agreed digest."
+            )
+            return None
+        return json.loads(content)
+
+    def get_pair_states(
+        self, block_number: int
+    ) -> Generator[None, None, Optional[Dict[str, Any]]]:
+        """
+        Get the state of every configured pair at the given block.
+
+        States that were already read at that block are served from the quote cache;
+        only the missing ones are read from the chain.
+
+        :param block_number: the block to get the states at.
+        :yield: None
+        :return: the state of every pair, or None if the missing ones could not be read.
+        """
+        states: Dict[str, Any] = {}
+        missing = []
+        for pair in self.params.pairs:
+            state = self.quote_cache.get(pair["name"], SPOT_AMOUNT, block_number)
+            if state is None:
+                missing.append(pair)
+            else:
+                states[pair["name"]] = state
+        if missing:
+            snapshot = yield from self.read_pair_states(missing, block_number)
+            if snapshot is None:
+                return None
+            states.update(snapshot["pairs"])
+        return states
+
 
 class DecisionMakingBehaviour(CeloSwapperBaseBehaviour):
     """DecisionMakingBehaviour"""
 
     matching_round: Type[AbstractRound] = DecisionMakingRound
 
-    # TODO: implement logic required to set payload content for synchronization
-    def async_act(self) -> Generator:
-        """Do the act, supporting asynchronous execution."""
-
-        with self.context.benchmark_tool.measure(self.behaviour_id).local():
-            sender = self.context.agent_address
-            payload = DecisionMakingPayload(sender=sender, content=...)
-
-        with self.context.benchmark_tool.measure(self.behaviour_id).consensus():
-            yield from self.send_a2a_transaction(payload)
-            yield from self.wait_until_round_end()
+    def poll_mech_deliveries(self, to_block: int) -> Generator[None, None, int]:
+        """
+        Poll the `Deliver` logs up to a block once, and fetch what was delivered.
 
-        self.set_done()
+        :param to_block: the last block to poll.
+        :yield: None
+        :return: the number of outstanding requests that got their result.
+        """
+        tracker = self.mech_deliveries.tracker
+        delivered = 0
+        for from_block, chunk_end in tracker.ranges(to_block):
+            response = yield from self.get_contract_api_response(
+                performative=ContractApiMessage.Performative.GET_STATE,  # type: ignore
+                contract_address=self.mech_deliveries.mech_address,
+                contract_id=str(AgentMechContract.contract_id),
+                contract_callable="get_deliver_logs",
+                from_block=from_block,
+                to_block=chunk_end,
+            )
+            if response.performative != ContractApiMessage.Performative.STATE:
+                self.context.logger.warning(
+                    f"Could not get the mech deliveries: {response.performative}"
+                )
+                return delivered
+            for delivery in tracker.deliveries(response.state.body["logs"]):
+                files = yield from self.get_from_ipfs(
+                    delivery_cid(delivery.data), filetype=SupportedFiletype.JSON
+                )
+                result = delivery_result(files, delivery.request_id)
+                if result is None:
+                    self.context.logger.warning(
+                        f"Could not fetch the result of request {delivery.request_id}."
+                    )
+                    return delivered
+                tracker.deliver(delivery.request_id, result)
+                delivered += 1
+            tracker.advance(chunk_end)
+        return delivered
 
+    def collect_mech_deliveries(self) -> Generator[None, None, Dict[str, Any]]:
+        """
+        Get the results delivered so far for the outstanding mech requests.
 
-class FinishedDecisionMakingBehaviour(CeloSwapperBaseBehaviour):
-    """FinishedDecisionMakingBehaviour"""
+        The outstanding requests are the ones carried over from earlier periods, and the
+        ones of the batch of the period still waiting for their result. The logs are
+        polled once, without waiting, up to the block of the agreed market data, so that
+        every agent polls the same blocks. What lands later is used in a later period.
 
-    matching_round: Type[AbstractRound] = FinishedDecisionMakingRound
+        :yield: None
+        :return: the delivered results, by request id.
+        """
+        synchronized_data = self.synchronized_data
+        to_block = synchronized_data.market_data_block
+        outstanding = {
+            **pending_requests(
+                synchronized_data.mech_responses,
+                synchronized_data.mech_requests,
+                synchronized_data.mech_request_pairs,
+                synchronized_data.strategy_scores,
+                to_block,
+                synchronized_data.period_count,
+            ),
+            **synchronized_data.mech_outstanding,
+        }
+        tracker = self.mech_deliveries.tracker
+        tracker.track(
+            {
+                int(request_id): request["block"]
+                for request_id, request in outstanding.items()
+            }
+        )
+        if to_block is not None:
+            yield from self.poll_mech_deliveries(to_block)
+        results = tracker.results(int(request_id) for request_id in outstanding)
+        self.context.logger.info(
+            f"{len(results)} of {len(outstanding)} outstanding mech requests "
+            f"were delivered up to block {to_block}."
+        )
+        return {str(request_id): result for request_id, result in results.items()}
 
-    # TODO: implement logic required to set payload content for synchronization
     def async_act(self) -> Generator:
         """Do the act, supporting asynchronous execution."""
 
         with self.context.benchmark_tool.measure(self.behaviour_id).local():
             sender = self.context.agent_address
-            payload = FinishedDecisionMakingPayload(sender=sender, content=...)
+            deliveries = yield from self.collect_mech_deliveries()
+            payload = DecisionMakingPayload(
+                sender=sender, deliveries=json.dumps(deliveries, sort_keys=True)
+            )
 
         with self.context.benchmark_tool.measure(self.behaviour_id).consensus():
             yield from self.send_a2a_transaction(payload)
@@ -108,13 +620,51 @@ class MarketDataCollectionBehaviour(CeloSwapperBaseBehaviour):
 
     matching_round: Type[AbstractRound] = MarketDataCollectionRound
 
-    # TODO: implement logic required to set payload content for synchronization
     def async_act(self) -> Generator:
         """Do the act, supporting asynchronous execution."""
 
         with self.context.benchmark_tool.measure(self.behaviour_id).local():
             sender = self.context.agent_address
-            payload = MarketDataCollectionPayload(sender=sender, content=...)
+            block_identifier: Union[int, str] = "latest"
+            if self.params.block_driven_collection:
+                block_number = yield from self.wait_for_new_block()
+                if block_number is not None:
+                    block_identifier = block_number
+            if self.params.index_pool_events:
+                snapshot = yield from self.index_pair_states(block_identifier)
+            else:
+                snapshot = yield from self.read_pair_states(
+                    self.params.pairs, block_identifier
+                )
+            if snapshot is not None:
+                self.shared_state.last_collected_block = snapshot["block_number"]
+                self.update_history(snapshot)
+            if snapshot is not None and self.params.price_sources:
+                reference_prices = yield from self.get_reference_prices()
+                self.log_reference_prices(snapshot, reference_prices)
+            content = digest = ipfs_hash = prices = None
+            if snapshot is not None:
+                content = serialize_snapshot(snapshot)
+                digest = snapshot_digest(content)
+                prices = json.dumps(self.get_prices(snapshot), sort_keys=True)
+            if snapshot is not None and self.params.market_data_on_ipfs:
+                ipfs_hash = yield from self.send_to_ipfs(
+                    MARKET_DATA_FILENAME, snapshot, filetype=SupportedFiletype.JSON
+                )
+                if ipfs_hash is None:
+                    self.context.logger.warning(
+                        "Could not store the market data on IPFS, sending it inline."
+                    )
+                else:
+                    content = None
+            payload = MarketDataCollectionPayload(
+                sender=sender,
+                content=content,
+                digest=digest,
+                ipfs_hash=ipfs_hash,
+                prices=prices,
+                block_number=None if snapshot is None else snapshot["block_number"],
+            )
 
         with self.context.benchmark_tool.measure(self.behaviour_id).consensus():
             yield from self.send_a2a_transaction(payload)
@@ -122,19 +672,221 @@ class MarketDataCollectionBehaviour(CeloSwapperBaseBehaviour):
 
         self.set_done()
 
+    def seed_pool_index(
+        self, block_identifier: Union[int, str]
+    ) -> Generator[None, None, Optional[Dict[str, Any]]]:
+        """
+        Seed the pool event index with the states of the pairs.
+
+        The states are read at the agreed cursor, so that every agent derives its states
+        from the same ones, or at the target block if there is no cursor or the state at
+        the cursor can no longer be read.
+
+        :param block_identifier: the block the states are collected at.
+        :yield: None
+        :return: the snapshot the index was seeded with, or None if it could not be read.
+        """
+        pairs = self.params.pairs
+        index = self.shared_state.pool_index
+        index.clear()
+        cursor = self.synchronized_data.indexed_block
+        snapshot = None
+        if cursor is not None:
+            snapshot = yield from self.read_pair_states(pairs, cursor)
+        if snapshot is None:
+            snapshot = yield from self.read_pair_states(pairs, block_identifier)
+        if snapshot is not None:
+            index.reset(snapshot["block_number"], snapshot["pairs"])
+        return snapshot
+
+    def index_pair_states(
+        self, block_identifier: Union[int, str]
+    ) -> Generator[None, None, Optional[Dict[str, Any]]]:
+        """
+        Get the state of the pairs by applying the pool events emitted since the cursor.
+
+        The pools are only read when the index is seeded; afterwards, a single
+        `eth_getLogs` through the pool contract, for the events emitted since the
+        indexed block, moves the states forward. The oracle rates, which are not
+        derived from events, are read at the same block. The snapshot is built from the
+        indexed states of the configured pairs only, so that agents that seeded their
+        index at different blocks send the same snapshot.
+
+        :param block_identifier: the block to collect the states at.
+        :yield: None
+        :return: the market snapshot, or None if the state could not be read.
+        """
+        pairs = self.params.pairs
+        if not pairs:
+            return (yield from self.read_pair_states(pairs, block_identifier))
+        index = self.shared_state.pool_index
+        cursor = self.synchronized_data.indexed_block
+        if index.block_number != cursor or not index.covers(pairs):
+            seed = yield from self.seed_pool_index(block_identifier)
+            if seed is None:
+                return None
+            # only an index seeded at the cursor is behind the target block
+            if seed["block_number"] != cursor:
+                return self.indexed_snapshot(seed, seed["pairs"])
+
+        response = yield from self.get_contract_api_response(
+            performative=ContractApiMessage.Performative.GET_STATE,  # type: ignore
+            contract_address=pairs[0]["pool"],
+            contract_id=str(PoolContract.contract_id),
+            contract_callable="get_logs",
+            topics=index.topics(pairs),
+            from_block=cast(int, index.block_number) + 1,
+            block_identifier=block_identifier,
+            other_pools=[pair["pool"] for pair in pairs[1:]],
+        )
+        if response.performative != ContractApiMessage.Performative.STATE:
+            self.context.logger.warning(
+                f"Could not get the pool events, reading the pools: {response.performative}"
+            )
+            index.clear()
+            return (yield from self.read_pair_states(pairs, block_identifier))
+
+        body = response.state.body
+        applied = index.apply(pairs, body["logs"], body["block_number"])
+        self.context.logger.info(
+            f"Applied {applied} pool events after block {cursor} "
+            f"up to block {body['block_number']}."
+        )
+        oracles = None
+        oracle_pairs = [pair for pair in pairs if pair.get("rate_feed")]
+        if oracle_pairs:
+            oracles = yield from self.read_pair_states(
+                oracle_pairs, body["block_number"], pools=False
+            )
+        return self.indexed_snapshot(body, (oracles or {}).get("pairs", {}))
+
+    def indexed_snapshot(
+        self, block: Dict[str, Any], read_states: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Build the snapshot of the configured pairs from the pool event index.
+
+        :param block: the number and timestamp of the block of the snapshot.
+        :param read_states: the states read at the block, of which only the oracle
+            rates are kept.
+        :return: the snapshot.
+        """
+        states = self.shared_state.pool_index.pair_states(self.params.pairs)
+        oracle_field, _ = ORACLE_READ
+        for pair, state in read_states.items():
+            if pair in states and oracle_field in state:
+                states[pair][oracle_field] = state[oracle_field]
+        snapshot = dict(
+            block_number=block["block_number"],
+            block_timestamp=block["block_timestamp"],
+            pairs=states,
+        )
+        self.cache_pair_states(snapshot)
+        return snapshot
+
+    def wait_for_new_block(self) -> Generator[None, None, Optional[int]]:
+        """
+        Wait until the chain moves past the last block that was collected.
+
+        The block number is polled every `block_poll_interval` seconds, as a stand-in for
+        a subscription to new block headers, so the collection starts as soon as a new
+        block is seen instead of after a fixed pause.
+
+        :yield: None
+        :return: the new block, or None if none was seen within `new_block_timeout`.
+        """
+        last_block = self.shared_state.last_collected_block
+        polls = max(
+            math.ceil(self.params.new_block_timeout / self.params.block_poll_interval),
+            1,
+        )
+        for _ in range(polls):
+            block_number = yield from self.get_block_number()
+            if block_number is not None and (
+                last_block is None or block_number > last_block
+            ):
+                return block_number
+            yield from self.sleep(self.params.block_poll_interval)
+        self.context.logger.warning(
+            f"No block after {last_block} was seen in {self.params.new_block_timeout}s."
+        )
+        return None
+
+    def get_prices(self, snapshot: Dict[str, Any]) -> Dict[str, float]:
+        """Get the price of every pair that could be read in a snapshot."""
+        prices = {}
+        for pair, state in snapshot["pairs"].items():
+            price = pair_price(state)
+            if price is not None:
+                prices[pair] = price
+        return prices
+
+    def update_history(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Fold a snapshot into the local history of every pair.
+
+        Only the state at the snapshot's block is appended; the lookback used by the
+        strategy is served from the history instead of being read again every period.
+
+        :param snapshot: the market snapshot.
+        """
+        block_number = snapshot["block_number"]
+        timestamp = snapshot["block_timestamp"]
+        for pair, state in snapshot["pairs"].items():
+            price = pair_price(state)
+            if price is None:
+                self.context.logger.warning(f"No price could be read for {pair}.")
+                continue
+            self.market_history.store(pair).update(timestamp, block_number, price)
+
+    def log_reference_prices(
+        self, snapshot: Dict[str, Any], reference_prices: Dict[str, Dict[str, float]]
+    ) -> None:
+        """Log the off-chain reference prices next to the on-chain ones."""
+        for pair, state in snapshot["pairs"].items():
+            prices = reference_prices.get(pair, {})
+            self.context.logger.info(
+                f"{pair}: on-chain price {pair_price(state)}, reference prices {prices}."
+            )
+
 
 class MechRequestPreparationBehaviour(CeloSwapperBaseBehaviour):
     """MechRequestPreparationBehaviour"""
 
     matching_round: Type[AbstractRound] = MechRequestPreparationRound
 
-    # TODO: implement logic required to set payload content for synchronization
     def async_act(self) -> Generator:
         """Do the act, supporting asynchronous execution."""
 
         with self.context.benchmark_tool.measure(self.behaviour_id).local():
             sender = self.context.agent_address
-            payload = MechRequestPreparationPayload(sender=sender, content=...)
+            requests, request_pairs = self.build_requests()
+            requests, cached_results = self.split_cached(requests, request_pairs)
+            request_pairs = {
+                request.nonce: request_pairs[request.nonce] for request in requests
+            }
+            self.context.logger.info(
+                f"Batching {len(requests)} mech requests: {request_pairs}; "
+                f"answered from cache: {sorted(cached_results)}"
+            )
+            request_hashes = yield from self.pin_request_metadata(requests)
+            payload = MechRequestPreparationPayload(
+                sender=sender,
+                requests=serialize_requests(requests) if requests else None,
+                request_pairs=(
+                    json.dumps(request_pairs, sort_keys=True) if requests else None
+                ),
+                cached_results=(
+                    json.dumps(cached_results, sort_keys=True)
+                    if cached_results
+                    else None
+                ),
+                request_hashes=(
+                    json.dumps(request_hashes, sort_keys=True)
+                    if request_hashes
+                    else None
+                ),
+            )
 
         with self.context.benchmark_tool.measure(self.behaviour_id).consensus():
             yield from self.send_a2a_transaction(payload)
@@ -142,19 +894,113 @@ class MechRequestPreparationBehaviour(CeloSwapperBaseBehaviour):
 
         self.set_done()
 
+    def pin_request_metadata(
+        self, requests: List[MechMetadata]
+    ) -> Generator[None, None, Optional[Dict[str, str]]]:
+        """
+        Pin the metadata of the requests on IPFS, all at once.
+
+        :param requests: the batch of requests.
+        :yield: None
+        :return: the IPFS hash of the metadata of every request by nonce, or None
+            unless all of them were pinned, so that all agents agree on the hashes.
+        """
+        if not requests:
+            return None
+        filenames = {
+            request.nonce: f"metadata_{request.nonce}.json" for request in requests
+        }
+        hashes = yield from self.send_files_to_ipfs(
+            {filenames[request.nonce]: asdict(request) for request in requests},
+            filetype=SupportedFiletype.JSON,
+            timeout=self.params.round_timeout_seconds / 2,
+        )
+        if len(hashes) < len(requests):
+            return None
+        return {nonce: hashes[filename] for nonce, filename in filenames.items()}
+
+    def split_cached(
+        self, requests: List[MechMetadata], request_pairs: Dict[str, str]
+    ) -> Tuple[List[MechMetadata], Dict[str, Any]]:
+        """
+        Answer the requests that the mechs answered recently from the agreed mech cache.
+
+        :param requests: the batch of requests.
+        :param request_pairs: the pair of every request, by nonce.
+        :return: the requests still to send, and the cached results by pair.
+        """
+        scores = self.synchronized_data.strategy_scores
+        cache = self.synchronized_data.mech_cache
+        period = self.synchronized_data.period_count
+        misses, cached_results = [], {}
+        for request in requests:
+            pair = request_pairs[request.nonce]
+            key = self.mech_cache.key(pair, scores[pair], request.tool)
+            result = self.mech_cache.get(cache, key, period)
+            if result is None:
+                misses.append(request)
+            else:
+                cached_results[pair] = result
+        return misses, cached_results
+
+    def build_requests(self) -> Tuple[List[MechMetadata], Dict[str, str]]:
+        """
+        Build one request per pair with a signal too weak to swap on, strongest first.
+
+        The pairs that are still waiting for the result of an earlier request are not
+        asked again.
+
+        :return: the batch of requests, and the pair of every request by nonce.
+        """
+        scores = self.synchronized_data.strategy_scores
+        asked = {
+            request["pair"]
+            for request in self.synchronized_data.mech_outstanding.values()
+        }
+        pairs = rank_candidates(
+            {pair: score for pair, score in scores.items() if pair not in asked},
+            self.params.mech_signal_threshold,
+            self.params.mech_batch_size,
+        )
+        return build_mech_requests(
+            pairs,
+            self.synchronized_data.market_prices,
+            scores,
+            self.params.mech_prompt_template,
+            self.params.mech_tool,
+            self.synchronized_data.market_data_digest,
+        )
+
 
 class StrategyEvaluationBehaviour(CeloSwapperBaseBehaviour):
     """StrategyEvaluationBehaviour"""
 
     matching_round: Type[AbstractRound] = StrategyEvaluationRound
 
-    # TODO: implement logic required to set payload content for synchronization
     def async_act(self) -> Generator:
         """Do the act, supporting asynchronous execution."""
 
         with self.context.benchmark_tool.measure(self.behaviour_id).local():
             sender = self.context.agent_address
-            payload = StrategyEvaluationPayload(sender=sender, content=...)
+            degraded = self.latency_budget.is_exceeded(
+                self.synchronized_data.strategy_latency,
+                self.params.round_timeout_seconds,
+            )
+            key = self.evaluation_key(degraded)
+            cached = self.shared_state.strategy_evaluation
+            if cached is not None and cached[0] == key:
+                self.context.logger.info("Re-sending the scores of this market data.")
+                _, scores, duration = cached
+            else:
+                evaluated = yield from self.evaluate_strategy(degraded)
+                scores = json.dumps(evaluated, sort_keys=True)
+                local = self.context.benchmark_tool.measure(self.behaviour_id).local()
+                # only full evaluations count towards the latency
+                duration = None if degraded else time.time() - local.start
+                self.shared_state.strategy_evaluation = (key, scores, duration)
+            payload = StrategyEvaluationPayload(
+                sender=sender, scores=scores, duration=duration
+            )
 
         with self.context.benchmark_tool.measure(self.behaviour_id).consensus():
             yield from self.send_a2a_transaction(payload)
@@ -162,19 +1008,199 @@ class StrategyEvaluationBehaviour(CeloSwapperBaseBehaviour):
 
         self.set_done()
 
+    def evaluation_key(self, degraded: bool) -> str:
+        """
+        Get the key of the evaluation of the agreed market data by the strategies.
+
+        Retries of the round after `NO_MAJORITY` or `ROUND_TIMEOUT` have the same key, so
+        the scores computed the first time are re-sent instead of being computed again.
+
+        :param degraded: whether the evaluation is degraded.
+        :return: the key.
+        """
+        inputs = dict(
+            degraded=degraded,
+            market_data_digest=self.synchronized_data.market_data_digest,
+            market_prices=self.synchronized_data.market_prices,
+            strategies=self.params.strategies,
+            strategy_lookback=self.params.strategy_lookback,
+            strategy_sensitivity=self.params.strategy_sensitivity,
+        )
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+    def evaluate_strategy(
+        self, degraded: bool = False
+    ) -> Generator[None, None, Dict[str, float]]:
+        """
+        Score every pair with the configured strategies.
+
+        The indicators are only updated with the candles closed since the previous
+        period, so the evaluation does not grow with the length of the history. The
+        strategies then run on the task manager, so a slow strategy does not stall the
+        agent. The scores of the first strategy are sent; the others run side by side
+        and are only logged, so that they can be compared before they are switched to.
+
+        A degraded evaluation, for when the full one takes too long to fit in the round,
+        halves the lookback, only scores the strongest pairs of the previous evaluation
+        and skips the side-by-side strategies. Every agent degrades in the same periods,
+        as the decision is taken on the agreed latency, so they all score alike.
+
+        The strategies are given the deadline of the latency budget. A full evaluation
+        that misses it falls back to a degraded one, and a degraded one that misses it
+        scores nothing, so that the round is never waited out.
+
+        :param degraded: whether to run the cheaper evaluation.
+        :yield: None
+        :return: the scores of the first strategy, by pair.
+        """
+        prices = self.synchronized_data.market_prices
+        lookback = self.params.strategy_lookback
+        names = self.params.strategies
+        if degraded:
+            self.context.logger.warning(
+                "The strategy evaluation exceeds its latency budget, degrading it."
+            )
+            lookback = max(2, lookback // 2)
+            names = names[:1]
+            prices = {pair: prices[pair] for pair in self.previous_strongest(list(prices))}
+
+        indicators = {}
+        for pair in prices:
+            engine = self.market_history.indicators(pair, lookback)
+            engine.sync(self.market_history.store(pair))
+            indicators[pair] = engine.values()
+            self.context.logger.debug(f"{pair} indicators: {indicators[pair]}")
+        matrix = FeatureMatrix.build(prices, indicators)
+
+        deadline = self.latency_budget.deadline(self.params.round_timeout_seconds)
+        try:
+            all_scores = yield from self.run_in_task_pool(
+                run_strategies,
+                names,
+                matrix,
+                self.params.strategy_params(),
+                timeout=deadline,
+            )
+        except TimeoutException:
+            if degraded:
+                self.context.logger.warning(
+                    f"The degraded strategy evaluation missed its {deadline}s deadline."
+                )
+                return {}
+            self.context.logger.warning(
+                f"The strategy evaluation missed its {deadline}s deadline."
+            )
+            return (yield from self.evaluate_strategy(degraded=True))
+        for name, scores in zip(names, all_scores):
+            self.context.logger.info(f"Strategy scores of {name}: {scores}")
+        return all_scores[0]
+
+    def previous_strongest(self, pairs: List[str]) -> List[str]:
+        """Get the pairs with the strongest agreed scores, or all if none was scored."""
+        strongest = self.synchronized_data.strongest_pairs
+        return [pair for pair in strongest if pair in pairs] or pairs
+
 
 class SwapPreparationBehaviour(CeloSwapperBaseBehaviour):
     """SwapPreparationBehaviour"""
 
     matching_round: Type[AbstractRound] = SwapPreparationRound
 
-    # TODO: implement logic required to set payload content for synchronization
+    def build_swap_order(
+        self, pair: Dict[str, str], states: Dict[str, Any], score: float
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Build the order for a pair, routed through the configured pools.
+
+        A positive score buys token0 with token1 and a negative one sells it, through
+        routes of up to `max_route_hops` pools. The amount is split across up to
+        `max_split_routes` routes when that swaps more out than the best route alone,
+        and every route is a leg of the order. Amounts are computed in integer
+        arithmetic only, so that every agent builds the same order.
+
+        :param pair: the configuration of the pair.
+        :param states: the state of every pair at the agreed block.
+        :param score: the agreed score of the pair.
+        :return: the order, or None if no route between the tokens could be quoted.
+        """
+        zero_for_one = score < 0
+        token0, token1 = pair_tokens(pair)
+        token_in, token_out = (token0, token1) if zero_for_one else (token1, token0)
+        routes = self.shared_state.route_index.split_order(
+            token_in,
+            token_out,
+            self.params.swap_amount,
+            states,
+            self.params.max_route_hops,
+            self.params.swap_fee_bps,
+            self.params.max_split_routes,
+            self.params.split_steps,
+        )
+        if not routes:
+            return None
+        slippage = BPS - self.params.swap_slippage_bps
+        legs = [
+            dict(
+                amount_in=route.amount_in,
+                amount_out=route.amount_out,
+                min_amount_out=route.amount_out * slippage // BPS,
+                route=route.to_json(),
+            )
+            for route in routes
+        ]
+        return dict(
+            pair=pair["name"],
+            zero_for_one=zero_for_one,
+            amount_in=sum(leg["amount_in"] for leg in legs),
+            amount_out=sum(leg["amount_out"] for leg in legs),
+            min_amount_out=sum(leg["min_amount_out"] for leg in legs),
+            legs=legs,
+        )
+
+    def build_swap_orders(
+        self, states: Dict[str, Any], block_number: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Build the orders for the agreed candidates, in their order.
+
+        :param states: the state of every pair at the agreed block.
+        :param block_number: the agreed block.
+        :return: the orders of the candidates that could be routed.
+        """
+        scores = self.synchronized_data.strategy_scores
+        pairs = {pair["name"]: pair for pair in self.params.pairs}
+        changed = self.shared_state.route_index.update(self.params.pairs)
+        if changed:
+            self.context.logger.info(f"Updated the routes of {changed} pairs.")
+        orders = []
+        for name in self.synchronized_data.swap_candidates:
+            if name not in pairs:
+                continue
+            order = self.build_swap_order(pairs[name], states, scores[name])
+            if order is not None:
+                orders.append(dict(order, block_number=block_number))
+        return orders
+
     def async_act(self) -> Generator:
         """Do the act, supporting asynchronous execution."""
 
         with self.context.benchmark_tool.measure(self.behaviour_id).local():
             sender = self.context.agent_address
-            payload = SwapPreparationPayload(sender=sender, content=...)
+            # the swap is built against the same block the market data was agreed on
+            market_data = yield from self.get_market_data()
+            quotes, orders = None, []
+            if market_data is not None:
+                block_number = market_data["block_number"]
+                quotes = yield from self.get_pair_states(block_number)
+            if quotes is None:
+                self.context.logger.error("Could not get the quotes to swap against.")
+            else:
+                orders = self.build_swap_orders(quotes, block_number)
+                self.context.logger.info(f"Swap orders: {orders}")
+            payload = SwapPreparationPayload(
+                sender=sender,
+                orders=json.dumps(orders, sort_keys=True) if orders else None,
+            )
 
         with self.context.benchmark_tool.measure(self.behaviour_id).consensus():
             yield from self.send_a2a_transaction(payload)
@@ -190,7 +1216,6 @@ class CeloSwapperRoundBehaviour(AbstractRoundBehaviour):
     abci_app_cls = CeloSwapperAbciApp  # type: ignore
     behaviours: Set[Type[BaseBehaviour]] = [
         DecisionMakingBehaviour,
-        FinishedDecisionMakingBehaviour,
         MarketDataCollectionBehaviour,
         MechRequestPreparationBehaviour,
         StrategyEvaluationBehaviour,
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""
+This module contains the watcher of the mech deliveries of the CeloSwapperAbciApp.
+
+Instead of waiting for the mechs to deliver in a round of their own, the requests that
+were sent but not answered yet are kept in the synchronized data, across periods, with
+the first block they could be delivered at. Every decision polls the `Deliver` logs of
+the mech for them once, in batched block ranges up to the block of the agreed market
+data, and fetches the results of the deliveries from IPFS. Every agent polls the same
+blocks, so they agree on what was delivered; what lands later is used in a later period.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set
+
+from packages.celo.contracts.agent_mech.contract import DELIVER_TOPIC
+from packages.celo.skills.celo_swapper.rpc import Chunk, split_range
+
+
+# the prefix of the CIDv1 of a sha256 digest of raw data, in base16
+CID_PREFIX = "f01701220"
+WORD_SIZE = 32
+
+
+@dataclass(frozen=True)
+class Delivery:
+    """A response delivered by a mech."""
+
+    request_id: int
+    block_number: int
+    data: str
+
+
+def _to_int(value: Any) -> int:
+    """Convert a quantity that may be hex-encoded, as returned by the RPC, to an int."""
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+def decode_deliver_log(log: Dict[str, Any]) -> Optional[Delivery]:
+    """
+    Decode a `Deliver` log of a mech.
+
+    :param log: the log, as returned by `eth_getLogs`.
+    :return: the delivery, with the data in hex, or None if the log is not a delivery.
+    """
+    topics = log.get("topics") or []
+    if not topics or topics[0].lower() != DELIVER_TOPIC:
+        return None
+    raw = bytes.fromhex(log["data"][2:])
+    request_id = int.from_bytes(raw[:WORD_SIZE], "big")
+    offset = int.from_bytes(raw[WORD_SIZE : 2 * WORD_SIZE], "big")
+    length = int.from_bytes(raw[offset : offset + WORD_SIZE], "big")
+    data = raw[offset + WORD_SIZE : offset + WORD_SIZE + length]
+    return Delivery(
+        request_id=request_id,
+        block_number=_to_int(log["blockNumber"]),
+        data=data.hex(),
+    )
+
+
+def pending_requests(  # pylint: disable=too-many-arguments
+    responses: Iterable[Mapping[str, Any]],
+    requests: Iterable[Mapping[str, str]],
+    request_pairs: Mapping[str, str],
+    scores: Mapping[str, float],
+    block: Optional[int],
+    period: int,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Get the requests of a batch that were sent, but not answered yet.
+
+    :param responses: the responses to the batch, each with the `nonce` of its request,
+        and with the `requestId` given by the mech once it was sent.
+    :param requests: the batch of requests.
+    :param request_pairs: the pair of every request, by nonce.
+    :param scores: the agreed score of every pair.
+    :param block: the block of the market data the batch was built from. The requests
+        were sent after it, so they cannot be delivered before the next block.
+    :param period: the period the batch was sent in.
+    :return: the pair, score and tool of every pending request, with the first block it
+        could be delivered at and its period, by request id.
+    """
+    tools = {request["nonce"]: request["tool"] for request in requests}
+    pending = {}
+    for response in responses:
+        nonce = response.get("nonce", "")
+        pair = request_pairs.get(nonce)
+        request_id = response.get("requestId")
+        if (
+            pair is None
+            or pair not in scores
+            or request_id is None
+            or response.get("result") is not None
+        ):
+            continue
+        pending[str(request_id)] = dict(
+            pair=pair,
+            score=scores[pair],
+            tool=tools.get(nonce),
+            block=None if block is None else block + 1,
+            period=period,
+        )
+    return pending
+
+
+def delivery_cid(data: str) -> str:
+    """Get the IPFS CID of the response of a delivery from its data."""
+    return CID_PREFIX + data
+
+
+def delivery_result(files: Any, request_id: int) -> Optional[Any]:
+    """
+    Get the result of a delivery from the files of its IPFS directory.
+
+    :param files: the response file, or the files of the directory by name.
+    :param request_id: the id of the request the response is for.
+    :return: the result, or None if the files hold none for the request.
+    """
+    if isinstance(files, dict) and str(request_id) in files:
+        files = files[str(request_id)]
+    if not isinstance(files, dict):
+        return None
+    return files.get("result")
+
+
+class DeliveryTracker:
+    """
+    Track the outstanding mech requests until their responses are delivered.
+
+    The tracker keeps the next block to poll the logs of the mech from, so that every
+    block is only polled once, and the results delivered so far. Polling itself is left
+    to the caller, which fetches the logs of the block `ranges` and reports them back.
+    The requests themselves are kept in the synchronized data, so a tracker that starts
+    afresh polls again from the first block they could be delivered at.
+    """
+
+    def __init__(self, chunk_size: int) -> None:
+        """Initialize the tracker."""
+        self.chunk_size = chunk_size
+        self._outstanding: Set[int] = set()
+        self._results: Dict[int, Any] = {}
+        self.next_block: Optional[int] = None
+
+    @property
+    def outstanding(self) -> List[int]:
+        """Get the ids of the requests that are still waiting for a response."""
+        return sorted(self._outstanding)
+
+    def track(self, from_blocks: Mapping[int, Optional[int]]) -> None:
+        """
+        Track requests until their responses are delivered, and forget all others.
+
+        :param from_blocks: the first block every request could be delivered at, or None
+            to start from the last block of the next poll, by request id.
+        """
+        request_ids = set(from_blocks)
+        self._results = {
+            request_id: result
+            for request_id, result in self._results.items()
+            if request_id in request_ids
+        }
+        fresh = request_ids - self._outstanding - set(self._results)
+        self._outstanding = request_ids - set(self._results)
+        if not self._outstanding:
+            self.next_block = None
+        else:
+            blocks = [
+                from_blocks[request_id]
+                for request_id in fresh
+                if from_blocks[request_id] is not None
+            ]
+            if self.next_block is not None:
+                blocks.append(self.next_block)
+            self.next_block = min(blocks, default=None)
+
+    def ranges(self, to_block: int) -> List[Chunk]:
+        """Get the block ranges to poll, up to a block, in chunks."""
+        if not self._outstanding:
+            return []
+        if self.next_block is None:
+            self.next_block = to_block
+        if self.next_block > to_block:
+            return []
+        return split_range(self.next_block, to_block, self.chunk_size)
+
+    def deliveries(self, logs: Iterable[Dict[str, Any]]) -> List[Delivery]:
+        """Get the deliveries of the outstanding requests among some logs."""
+        return [
+            delivery
+            for delivery in map(decode_deliver_log, logs)
+            if delivery is not None and delivery.request_id in self._outstanding
+        ]
+
+    def deliver(self, request_id: int, result: Any) -> None:
+        """Keep the result delivered for a request."""
+        if request_id in self._outstanding:
+            self._outstanding.remove(request_id)
+            self._results[request_id] = result
+
+    def advance(self, to_block: int) -> None:
+        """Move past a polled block range."""
+        if self.next_block is not None and self.next_block <= to_block:
+            self.next_block = to_block + 1
+
+    def results(self, request_ids: Iterable[int]) -> Dict[int, Any]:
+        """Get the results delivered so far for some requests, by request id."""
+        return {
+            request_id: self._results[request_id]
+            for request_id in request_ids
+            if request_id in self._results
+        }
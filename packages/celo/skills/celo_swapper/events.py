@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the decoding of the pool events of the CeloSwapperAbciApp."""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from packages.celo.skills.celo_swapper.fixed_point import (
+    from_wad,
+    sqrt_price_x96_to_wad,
+    wad_ratio,
+)
+from packages.celo.skills.celo_swapper.market_data import V2_POOL, V3_POOL
+
+
+# Sync(uint112,uint112)
+V2_SYNC_TOPIC = "0x1c411e9a96e071241c2f21f7726b17ae89e3cab4c78be50e062b03a9fffbbad1"
+# Swap(address,uint256,uint256,uint256,uint256,address)
+V2_SWAP_TOPIC = "0xd78ad95fa46c994b6551d0da85fc275fe613ce37657fb8d5e3d130840159d822"
+# Swap(address,address,int256,int256,uint160,uint128,int24)
+V3_SWAP_TOPIC = "0xc42079f94a6350d7e6235f29174924f928cc2ac818eb64fed8004e115fbcca67"
+POOL_EVENT_TOPICS = {
+    V2_POOL: [V2_SYNC_TOPIC, V2_SWAP_TOPIC],
+    V3_POOL: [V3_SWAP_TOPIC],
+}
+WORD_SIZE = 32
+INT256_OFFSET = 2**256
+
+
+@dataclass(frozen=True)
+class PoolEvent:
+    """A price and/or volume observation decoded from a pool log."""
+
+    block_number: int
+    log_index: int
+    price: Optional[float]
+    volume: float
+
+
+@dataclass(frozen=True)
+class BlockCandle:
+    """The prices and the volume of a pool within a single block."""
+
+    block_number: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+
+def _words(data: str) -> List[int]:
+    """Split the data of a log into its 32-byte words, as unsigned integers."""
+    raw = bytes.fromhex(data[2:] if data.startswith("0x") else data)
+    return [
+        int.from_bytes(raw[i : i + WORD_SIZE], "big")
+        for i in range(0, len(raw), WORD_SIZE)
+    ]
+
+
+def _signed(word: int) -> int:
+    """Interpret a word as a two's complement signed integer."""
+    return word - INT256_OFFSET if word >= INT256_OFFSET // 2 else word
+
+
+def _to_int(value: Any) -> int:
+    """Convert a quantity that may be hex-encoded, as returned by the RPC, to an int."""
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+def decode_pool_log(log: Dict[str, Any]) -> Optional[PoolEvent]:
+    """
+    Decode a `Sync` or `Swap` log of a pool.
+
+    Prices are in raw token1 units per raw token0 unit, like the ones read from the pool
+    state, and volumes are in raw token0 units.
+
+    :param log: the log, as returned by `eth_getLogs`.
+    :return: the decoded event, or None if the log is not a known pool event.
+    """
+    topics = log.get("topics") or []
+    if not topics:
+        return None
+    topic = topics[0].lower()
+    words = _words(log["data"])
+    price: Optional[float] = None
+    volume = 0.0
+    if topic == V2_SYNC_TOPIC:
+        reserve0, reserve1 = words[0], words[1]
+        if reserve0 == 0:
+            return None
+        price = from_wad(wad_ratio(reserve1, reserve0))
+    elif topic == V2_SWAP_TOPIC:
+        amount0_in, _, amount0_out, _ = words[:4]
+        volume = float(amount0_in + amount0_out)
+    elif topic == V3_SWAP_TOPIC:
+        amount0, sqrt_price_x96 = _signed(words[0]), words[2]
+        price = from_wad(sqrt_price_x96_to_wad(sqrt_price_x96))
+        volume = float(abs(amount0))
+    else:
+        return None
+    return PoolEvent(
+        block_number=_to_int(log["blockNumber"]),
+        log_index=_to_int(log["logIndex"]),
+        price=price,
+        volume=volume,
+    )
+
+
+def block_candles(
+    events: Iterable[PoolEvent], last_price: Optional[float] = None
+) -> Tuple[List[BlockCandle], Optional[float]]:
+    """
+    Fold the events of a pool into one candle per block.
+
+    Volume-only events, e.g., the `Swap` logs of v2 pools, are priced at the last price
+    seen, which for v2 pools is the one of the `Sync` log emitted along with the swap.
+
+    :param events: the events, in any order.
+    :param last_price: the last price seen before the events.
+    :return: the candles in block order, and the last price seen.
+    """
+    candles: List[BlockCandle] = []
+    current: Optional[Dict[str, Any]] = None
+    for event in sorted(events, key=lambda e: (e.block_number, e.log_index)):
+        if event.price is not None:
+            last_price = event.price
+        if last_price is None:
+            continue
+        if current is None or current["block_number"] != event.block_number:
+            if current is not None:
+                candles.append(BlockCandle(**current))
+            current = dict(
+                block_number=event.block_number,
+                open=last_price,
+                high=last_price,
+                low=last_price,
+                close=last_price,
+                volume=0.0,
+            )
+        current["high"] = max(current["high"], last_price)
+        current["low"] = min(current["low"], last_price)
+        current["close"] = last_price
+        current["volume"] += event.volume
+    if current is not None:
+        candles.append(BlockCandle(**current))
+    return candles, last_price
+
+
+def apply_pool_log(state: Dict[str, Optional[List[int]]], log: Dict[str, Any]) -> bool:
+    """
+    Apply a `Sync` or `Swap` log of a pool to the raw state of its pair.
+
+    The state has the fields read by `POOL_READS`, so a state kept up to date with the
+    logs of a pool can stand in for the one read from it. `Swap` logs of v2 pools do not
+    carry the reserves, which are applied with the `Sync` log emitted along with them.
+
+    :param state: the state of the pair, updated in place.
+    :param log: the log, as returned by `eth_getLogs`.
+    :return: whether the state changed.
+    """
+    topics = log.get("topics") or []
+    if not topics:
+        return False
+    topic = topics[0].lower()
+    if topic == V2_SYNC_TOPIC:
+        reserve0, reserve1 = _words(log["data"])[:2]
+        block_timestamp_last = (state.get("reserves") or [0, 0, 0])[2:]
+        state["reserves"] = [reserve0, reserve1, *block_timestamp_last]
+        return True
+    if topic == V3_SWAP_TOPIC:
+        words = _words(log["data"])
+        sqrt_price_x96, liquidity, tick = words[2], words[3], _signed(words[4])
+        observation_fields = (state.get("slot0") or [0] * 7)[2:]
+        state["slot0"] = [sqrt_price_x96, tick, *observation_fields]
+        state["liquidity"] = [liquidity]
+        return True
+    return False
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""
+This module contains the fixed-point arithmetic of the CeloSwapperAbciApp.
+
+Values are integers scaled by `WAD` (18 decimals) or `RAY` (27 decimals), like the
+on-chain amounts they are computed from, so that every agent computes bit-identical
+results regardless of its platform. Products and quotients are rounded half away from
+zero, and conversions from and to floats only happen at the boundaries.
+
+The arithmetic also applies element-wise to object arrays of wads, as built by
+`to_wads`, so that a column of values is computed with the same results as one value
+at a time. Wads overflow fixed-width integers, so object arrays are not faster than
+a loop; they only keep the column operations readable.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Union
+
+import numpy as np
+
+
+WAD = 10**18
+RAY = 10**27
+WAD_RAY_RATIO = RAY // WAD
+Q192 = 2**192
+BPS = 10_000
+
+
+def mul_div(a: int, b: int, denominator: int) -> int:
+    """Get `a * b / denominator`, rounded half away from zero."""
+    numerator = a * b
+    if not isinstance(numerator, np.ndarray) and not isinstance(
+        denominator, np.ndarray
+    ):
+        if denominator == 0:
+            raise ZeroDivisionError("Fixed-point division by zero.")
+        quotient = (2 * abs(numerator) + abs(denominator)) // (2 * abs(denominator))
+        return -quotient if (numerator < 0) != (denominator < 0) else quotient
+    if np.any(np.equal(denominator, 0)):
+        raise ZeroDivisionError("Fixed-point division by zero.")
+    negative = (numerator < 0) != (denominator < 0)
+    quotient = (2 * abs(numerator) + abs(denominator)) // (2 * abs(denominator))
+    return np.where(negative, -quotient, quotient)
+
+
+def wad_mul(a: int, b: int) -> int:
+    """Multiply two wads."""
+    return mul_div(a, b, WAD)
+
+
+def wad_div(a: int, b: int) -> int:
+    """Divide two wads."""
+    return mul_div(a, WAD, b)
+
+
+def ray_mul(a: int, b: int) -> int:
+    """Multiply two rays."""
+    return mul_div(a, b, RAY)
+
+
+def ray_div(a: int, b: int) -> int:
+    """Divide two rays."""
+    return mul_div(a, RAY, b)
+
+
+def wad_to_ray(a: int) -> int:
+    """Convert a wad to a ray."""
+    return a * WAD_RAY_RATIO
+
+
+def ray_to_wad(a: int) -> int:
+    """Convert a ray to a wad, rounding half away from zero."""
+    return mul_div(a, 1, WAD_RAY_RATIO)
+
+
+def wad_ratio(numerator: int, denominator: int) -> int:
+    """Get the ratio of two integers, as a wad."""
+    return mul_div(numerator, WAD, denominator)
+
+
+def wad_clip(a: int, lower: int, upper: int) -> int:
+    """Clip a wad to `[lower, upper]`."""
+    if isinstance(a, np.ndarray):
+        return np.minimum(np.maximum(a, lower), upper)
+    return max(lower, min(a, upper))
+
+
+def to_wad(value: Union[int, float, str, Decimal]) -> int:
+    """
+    Convert a number of whole units to a wad.
+
+    Floats are converted through their shortest decimal representation, so that a
+    float converts to the same wad on every platform.
+
+    :param value: the value.
+    :return: the wad.
+    """
+    if isinstance(value, int):
+        return value * WAD
+    decimal = Decimal(repr(value)) if isinstance(value, float) else Decimal(value)
+    return int((decimal * WAD).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_wad(value: int) -> float:
+    """Convert a wad to the closest float."""
+    return value / WAD
+
+
+def to_wads(values: np.ndarray) -> np.ndarray:
+    """Convert an array of numbers to an object array of wads, with `to_wad`."""
+    if np.issubdtype(values.dtype, np.integer):
+        return values.astype(object) * WAD
+    return np.array([to_wad(value) for value in values.tolist()], dtype=object)
+
+
+def from_wads(values: np.ndarray) -> np.ndarray:
+    """Convert an object array of wads to an array of the closest floats."""
+    return np.array([from_wad(value) for value in values.tolist()], dtype=float)
+
+
+def sqrt_price_x96_to_wad(sqrt_price_x96: int) -> int:
+    """Convert the `sqrtPriceX96` of a v3 pool to its price, as a wad."""
+    return mul_div(sqrt_price_x96 * sqrt_price_x96, WAD, Q192)
+
+
+def get_amount_out(
+    amount_in: int, reserve_in: int, reserve_out: int, fee_bps: int
+) -> int:
+    """
+    Get the output of a swap against constant-product reserves, as the pool computes it.
+
+    :param amount_in: the amount swapped in.
+    :param reserve_in: the reserve of the token swapped in.
+    :param reserve_out: the reserve of the token swapped out.
+    :param fee_bps: the fee of the pool, in basis points.
+    :return: the amount swapped out, rounded down.
+    """
+    if amount_in <= 0 or reserve_in <= 0 or reserve_out <= 0:
+        return 0
+    amount_in_with_fee = amount_in * (BPS - fee_bps)
+    return amount_in_with_fee * reserve_out // (reserve_in * BPS + amount_in_with_fee)
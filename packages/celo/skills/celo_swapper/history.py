@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the local OHLCV history of the CeloSwapperAbciApp."""
+
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+
+MAGIC = b"OHLCV001"
+HEADER_DTYPE = np.dtype([("magic", "S8"), ("count", "<u8"), ("last_block", "<i8")])
+OHLCV_DTYPE = np.dtype(
+    [
+        ("timestamp", "<i8"),
+        ("block_number", "<i8"),
+        ("open", "<f8"),
+        ("high", "<f8"),
+        ("low", "<f8"),
+        ("close", "<f8"),
+        ("volume", "<f8"),
+    ]
+)
+DEFAULT_CAPACITY = 1024
+NO_BLOCK = -1
+
+
+def history_path(history_dir: Union[str, Path], pair: str) -> Path:
+    """Get the path of the store of a pair."""
+    return Path(history_dir) / f"{pair}.ohlcv"
+
+
+class OHLCVStore:
+    """
+    An append-only store of fixed-width OHLCV candles for a single pair.
+
+    The candles live in a memory-mapped file, right after a small header that keeps
+    the number of candles and the last block folded into them. Slices returned by
+    `window` and `tail` are views on the mapping, so reading them does not copy.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        interval: int,
+        initial_capacity: int = DEFAULT_CAPACITY,
+    ) -> None:
+        """Open the store at the given path, creating it if it does not exist."""
+        if interval <= 0:
+            raise ValueError(f"The candle interval must be positive, got {interval}.")
+        self.path = Path(path)
+        self.interval = interval
+        if not self.path.exists():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._allocate(max(initial_capacity, 1))
+            self._map()
+            self._header["magic"] = MAGIC
+            self._header["count"] = 0
+            self._header["last_block"] = NO_BLOCK
+        else:
+            self._map()
+            if self._header["magic"][0] != MAGIC:
+                raise ValueError(f"{self.path} is not an OHLCV store.")
+        self._index: Dict[int, int] = {
+            int(timestamp): row
+            for row, timestamp in enumerate(self.candles["timestamp"])
+        }
+
+    def _allocate(self, capacity: int) -> None:
+        """Grow the backing file so that it can hold `capacity` candles."""
+        size = HEADER_DTYPE.itemsize + capacity * OHLCV_DTYPE.itemsize
+        with open(self.path, "ab") as file:
+            file.truncate(size)
+
+    def _map(self) -> None:
+        """Map the header and the records of the backing file."""
+        capacity = (
+            self.path.stat().st_size - HEADER_DTYPE.itemsize
+        ) // OHLCV_DTYPE.itemsize
+        self._header = np.memmap(self.path, dtype=HEADER_DTYPE, mode="r+", shape=(1,))
+        self._records = np.memmap(
+            self.path,
+            dtype=OHLCV_DTYPE,
+            mode="r+",
+            offset=HEADER_DTYPE.itemsize,
+            shape=(capacity,),
+        )
+
+    def __len__(self) -> int:
+        """Get the number of stored candles."""
+        return int(self._header["count"][0])
+
+    @property
+    def capacity(self) -> int:
+        """Get the number of candles the store can hold before it grows."""
+        return len(self._records)
+
+    @property
+    def last_block(self) -> int:
+        """Get the last block folded into the store, or `NO_BLOCK` if it is empty."""
+        return int(self._header["last_block"][0])
+
+    @property
+    def candles(self) -> np.ndarray:
+        """Get a view on all the stored candles."""
+        return self._records[: len(self)]
+
+    def bucket(self, timestamp: int) -> int:
+        """Get the opening timestamp of the candle that contains `timestamp`."""
+        return timestamp - timestamp % self.interval
+
+    def index_of(self, timestamp: int) -> Optional[int]:
+        """Get the row of the candle that opened at `timestamp`, if it exists."""
+        return self._index.get(timestamp)
+
+    def append(  # pylint: disable=too-many-arguments
+        self,
+        timestamp: int,
+        block_number: int,
+        open_: float,
+        high: float,
+        low: float,
+        close: float,
+        volume: float = 0.0,
+    ) -> None:
+        """Append a candle. Candles must be appended in increasing timestamp order."""
+        count = len(self)
+        if count and timestamp <= self._records["timestamp"][count - 1]:
+            raise ValueError(
+                f"Candle at {timestamp} is not newer than the last stored candle."
+            )
+        if count == self.capacity:
+            self._records.flush()
+            self._allocate(2 * self.capacity)
+            self._map()
+        self._records[count] = (
+            timestamp,
+            block_number,
+            open_,
+            high,
+            low,
+            close,
+            volume,
+        )
+        self._index[timestamp] = count
+        self._header["count"] = count + 1
+        self._header["last_block"] = max(self.last_block, block_number)
+
+    def update(
+        self, timestamp: int, block_number: int, price: float, volume: float = 0.0
+    ) -> bool:
+        """
+        Fold a price observation into the candle of its interval.
+
+        :param timestamp: the time of the observation.
+        :param block_number: the block of the observation.
+        :param price: the observed price.
+        :param volume: the volume traded since the previous observation.
+        :return: whether the observation was stored, i.e., it is newer than the last stored block.
+        """
+        return self.merge(timestamp, block_number, price, price, price, price, volume)
+
+    def merge(  # pylint: disable=too-many-arguments
+        self,
+        timestamp: int,
+        block_number: int,
+        open_: float,
+        high: float,
+        low: float,
+        close: float,
+        volume: float = 0.0,
+    ) -> bool:
+        """
+        Fold the prices seen within a block into the candle of its interval.
+
+        :param timestamp: the time of the block.
+        :param block_number: the block.
+        :param open_: the first price seen within the block.
+        :param high: the highest price seen within the block.
+        :param low: the lowest price seen within the block.
+        :param close: the last price seen within the block.
+        :param volume: the volume traded within the block.
+        :return: whether the block was stored, i.e., it is newer than the last stored block.
+        """
+        if block_number <= self.last_block:
+            return False
+        opening = self.bucket(timestamp)
+        count = len(self)
+        if count and self._records["timestamp"][count - 1] == opening:
+            last = self._records[count - 1]
+            last["block_number"] = block_number
+            last["high"] = max(last["high"], high)
+            last["low"] = min(last["low"], low)
+            last["close"] = close
+            last["volume"] += volume
+            self._header["last_block"] = block_number
+            return True
+        self.append(opening, block_number, open_, high, low, close, volume)
+        return True
+
+    def window(
+        self, start: Optional[int] = None, end: Optional[int] = None
+    ) -> np.ndarray:
+        """Get a view on the candles that opened in `[start, end)`."""
+        timestamps = self.candles["timestamp"]
+        low = 0 if start is None else int(np.searchsorted(timestamps, start, "left"))
+        high = (
+            len(timestamps)
+            if end is None
+            else int(np.searchsorted(timestamps, end, "left"))
+        )
+        return self.candles[low:high]
+
+    def tail(self, n: int) -> np.ndarray:
+        """Get a view on the last `n` candles."""
+        return self.candles[max(len(self) - n, 0) :]
+
+    def flush(self) -> None:
+        """Write the pending changes to disk."""
+        self._header.flush()
+        self._records.flush()
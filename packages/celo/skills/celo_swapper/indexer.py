@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the pool event indexer of the CeloSwapperAbciApp."""
+
+from typing import Any, Dict, List, Optional
+
+from packages.celo.skills.celo_swapper.events import POOL_EVENT_TOPICS, apply_pool_log
+
+
+PairState = Dict[str, Optional[List[int]]]
+# the fields of the pool states that the pool events determine, and how many values of
+# each; the others, e.g. the last block timestamp of the v2 reserves, depend on when the
+# index was seeded
+INDEXED_FIELDS = {"reserves": 2, "slot0": 2, "liquidity": 1}
+
+
+def indexed_state(state: PairState) -> PairState:
+    """Keep the values of a pool state that the pool events determine, in a copy."""
+    return {
+        field: None if state[field] is None else list(state[field][:length])
+        for field, length in INDEXED_FIELDS.items()
+        if field in state
+    }
+
+
+class PoolIndex:
+    """
+    Keep the states of the pools up to date with their events.
+
+    The index is seeded with the states read at a block, and moved forward by applying
+    the `Sync`/`Swap` logs emitted after it, so that every period only costs the events
+    emitted since the previous one instead of a read of every pool.
+
+    Only the values that the events determine are indexed, so that the states do not
+    depend on the block the index was seeded at, nor on the pairs indexed before.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty index."""
+        self.block_number: Optional[int] = None
+        self.states: Dict[str, PairState] = {}
+
+    def covers(self, pairs: List[Dict[str, str]]) -> bool:
+        """Check whether the index holds a state for every one of the given pairs."""
+        return self.block_number is not None and all(
+            pair["name"] in self.states for pair in pairs
+        )
+
+    def reset(self, block_number: int, states: Dict[str, PairState]) -> None:
+        """Seed the index with the states read at a block, dropping the others."""
+        self.block_number = block_number
+        self.states = {name: indexed_state(state) for name, state in states.items()}
+
+    def clear(self) -> None:
+        """Drop the index, so that it is seeded again."""
+        self.block_number = None
+        self.states = {}
+
+    @staticmethod
+    def topics(pairs: List[Dict[str, str]]) -> List[str]:
+        """Get the topics of the events that move the states of the given pairs."""
+        return sorted(
+            {topic for pair in pairs for topic in POOL_EVENT_TOPICS[pair["pool_type"]]}
+        )
+
+    def apply(
+        self,
+        pairs: List[Dict[str, str]],
+        logs: List[Dict[str, Any]],
+        block_number: int,
+    ) -> int:
+        """
+        Apply the logs emitted up to a block, moving the index to that block.
+
+        :param pairs: the indexed pairs.
+        :param logs: the logs emitted after the indexed block, up to `block_number`.
+        :param block_number: the block the logs were fetched up to.
+        :return: the number of logs that changed a state.
+        """
+        pools = {pair["pool"].lower(): pair["name"] for pair in pairs}
+        applied = 0
+        for log in sorted(
+            logs, key=lambda log: (int(log["blockNumber"]), int(log["logIndex"]))
+        ):
+            name = pools.get(log["address"].lower())
+            if name is not None:
+                applied += apply_pool_log(self.states.setdefault(name, {}), log)
+        self.block_number = block_number
+        return applied
+
+    def pair_states(self, pairs: List[Dict[str, str]]) -> Dict[str, PairState]:
+        """Get a copy of the indexed states of the given pairs."""
+        return {
+            pair["name"]: indexed_state(self.states[pair["name"]]) for pair in pairs
+        }
@@ -0,0 +1,449 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""
+This module contains the technical indicators of the CeloSwapperAbciApp.
+
+Every indicator comes in two modes that share the same definitions: batch functions
+over NumPy arrays, used to warm an indicator up from the stored history, and
+incremental classes that update their rolling state in O(1) per new candle.
+"""
+
+import math
+from collections import deque
+from typing import Deque, Dict, Optional
+
+import numpy as np
+
+from packages.celo.skills.celo_swapper.history import OHLCVStore
+
+
+DEFAULT_BOLLINGER_WIDTH = 2.0
+# the number of periods of history an indicator is warmed up with
+WARMUP_PERIODS = 10
+
+
+def _rolling_sum(values: np.ndarray, period: int) -> np.ndarray:
+    """Get the sum over the last `period` values, NaN until there are enough."""
+    out = np.full(len(values), np.nan)
+    if len(values) >= period:
+        cumulative = np.cumsum(np.insert(values.astype(float), 0, 0.0))
+        out[period - 1 :] = cumulative[period:] - cumulative[:-period]
+    return out
+
+
+def _recursive_average(values: np.ndarray, period: int, alpha: float) -> np.ndarray:
+    """
+    Get an exponential average, seeded with the simple average of the first values.
+
+    :param values: the values.
+    :param period: the number of values the average is seeded with.
+    :param alpha: the weight of every new value.
+    :return: the averages, NaN until there are `period` values.
+    """
+    out = np.full(len(values), np.nan)
+    if len(values) < period:
+        return out
+    average = float(np.mean(values[:period]))
+    out[period - 1] = average
+    for i in range(period, len(values)):
+        average += alpha * (float(values[i]) - average)
+        out[i] = average
+    return out
+
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    """Get the simple moving average."""
+    return _rolling_sum(values, period) / period
+
+
+def ema(values: np.ndarray, period: int) -> np.ndarray:
+    """Get the exponential moving average, with a weight of `2 / (period + 1)`."""
+    return _recursive_average(values, period, 2 / (period + 1))
+
+
+def wilder(values: np.ndarray, period: int) -> np.ndarray:
+    """Get Wilder's smoothed average, with a weight of `1 / period`."""
+    return _recursive_average(values, period, 1 / period)
+
+
+def rsi(closes: np.ndarray, period: int) -> np.ndarray:
+    """Get the relative strength index, with Wilder's smoothing."""
+    deltas = np.diff(closes.astype(float))
+    average_gain = wilder(np.maximum(deltas, 0.0), period)
+    average_loss = wilder(np.maximum(-deltas, 0.0), period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = 100 - 100 / (1 + average_gain / average_loss)
+    out[average_loss == 0] = 100.0
+    out[np.isnan(average_gain)] = np.nan
+    return np.insert(out, 0, np.nan)
+
+
+def bollinger(
+    closes: np.ndarray, period: int, width: float = DEFAULT_BOLLINGER_WIDTH
+) -> np.ndarray:
+    """
+    Get the Bollinger bands.
+
+    :param closes: the closing prices.
+    :param period: the period of the moving average.
+    :param width: the width of the bands, in standard deviations.
+    :return: an array with the `lower`, `middle` and `upper` bands as rows.
+    """
+    middle = sma(closes, period)
+    mean_square = sma(closes.astype(float) ** 2, period)
+    deviation = np.sqrt(np.maximum(mean_square - middle**2, 0.0))
+    return np.vstack((middle - width * deviation, middle, middle + width * deviation))
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """Get the true range, which for the first candle is its high-low range."""
+    previous_close = np.insert(close[:-1].astype(float), 0, np.nan)
+    ranges = np.vstack(
+        (high - low, np.abs(high - previous_close), np.abs(low - previous_close))
+    )
+    return np.nanmax(ranges, axis=0)
+
+
+def atr(
+    high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int
+) -> np.ndarray:
+    """Get the average true range, with Wilder's smoothing."""
+    return wilder(true_range(high, low, close), period)
+
+
+def vwap(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    volume: np.ndarray,
+    period: int,
+) -> np.ndarray:
+    """Get the volume-weighted average of the typical price over the last `period` candles."""
+    typical = (high + low + close) / 3
+    traded = _rolling_sum(volume, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = _rolling_sum(typical * volume, period) / traded
+    out[traded == 0] = np.nan
+    return out
+
+
+def _last(values: np.ndarray) -> Optional[float]:
+    """Get the last value of an indicator, or None if it is not defined yet."""
+    if len(values) == 0 or np.isnan(values[-1]):
+        return None
+    return float(values[-1])
+
+
+class RollingWindow:
+    """The last `period` values, with their running sum and sum of squares."""
+
+    def __init__(self, period: int) -> None:
+        """Initialize an empty window."""
+        self.period = period
+        self.values: Deque[float] = deque(maxlen=period)
+        self.sum = 0.0
+        self.sum_of_squares = 0.0
+
+    @property
+    def full(self) -> bool:
+        """Check whether the window holds `period` values."""
+        return len(self.values) == self.period
+
+    def push(self, value: float) -> None:
+        """Push a value, dropping the oldest one if the window is full."""
+        if self.full:
+            oldest = self.values[0]
+            self.sum -= oldest
+            self.sum_of_squares -= oldest**2
+        self.values.append(value)
+        self.sum += value
+        self.sum_of_squares += value**2
+
+    def warm_up(self, values: np.ndarray) -> None:
+        """Fill the window with the last values of an array."""
+        self.values.clear()
+        self.sum = self.sum_of_squares = 0.0
+        for value in values[-self.period :]:
+            self.push(float(value))
+
+
+class RecursiveAverage:
+    """The incremental counterpart of `_recursive_average`."""
+
+    def __init__(self, period: int, alpha: float) -> None:
+        """Initialize the average."""
+        self.period = period
+        self.alpha = alpha
+        self.count = 0
+        self._seed = 0.0
+        self.value: Optional[float] = None
+
+    def update(self, value: float) -> Optional[float]:
+        """Update the average with a new value."""
+        self.count += 1
+        if self.value is not None:
+            self.value += self.alpha * (value - self.value)
+        elif self.count < self.period:
+            self._seed += value
+        else:
+            self.value = (self._seed + value) / self.period
+        return self.value
+
+    def warm_up(self, values: np.ndarray) -> None:
+        """Set the state to the one reached after the values of an array."""
+        self.count = len(values)
+        self.value = _last(_recursive_average(values, self.period, self.alpha))
+        self._seed = float(np.sum(values)) if self.value is None else 0.0
+
+
+class SMA:
+    """An incremental simple moving average."""
+
+    def __init__(self, period: int) -> None:
+        """Initialize the indicator."""
+        self.window = RollingWindow(period)
+
+    @property
+    def value(self) -> Optional[float]:
+        """Get the current value."""
+        return self.window.sum / self.window.period if self.window.full else None
+
+    def update(self, close: float) -> Optional[float]:
+        """Update the indicator with a new close."""
+        self.window.push(close)
+        return self.value
+
+    def warm_up(self, closes: np.ndarray) -> None:
+        """Warm the indicator up with past closes."""
+        self.window.warm_up(closes)
+
+
+class EMA(RecursiveAverage):
+    """An incremental exponential moving average."""
+
+    def __init__(self, period: int) -> None:
+        """Initialize the indicator."""
+        super().__init__(period, 2 / (period + 1))
+
+
+class RSI:
+    """An incremental relative strength index."""
+
+    def __init__(self, period: int) -> None:
+        """Initialize the indicator."""
+        self.gain = RecursiveAverage(period, 1 / period)
+        self.loss = RecursiveAverage(period, 1 / period)
+        self.previous_close: Optional[float] = None
+
+    @property
+    def value(self) -> Optional[float]:
+        """Get the current value."""
+        gain, loss = self.gain.value, self.loss.value
+        if gain is None or loss is None:
+            return None
+        if loss == 0:
+            return 100.0
+        return 100 - 100 / (1 + gain / loss)
+
+    def update(self, close: float) -> Optional[float]:
+        """Update the indicator with a new close."""
+        if self.previous_close is not None:
+            delta = close - self.previous_close
+            self.gain.update(max(delta, 0.0))
+            self.loss.update(max(-delta, 0.0))
+        self.previous_close = close
+        return self.value
+
+    def warm_up(self, closes: np.ndarray) -> None:
+        """Warm the indicator up with past closes."""
+        deltas = np.diff(closes.astype(float))
+        self.gain.warm_up(np.maximum(deltas, 0.0))
+        self.loss.warm_up(np.maximum(-deltas, 0.0))
+        self.previous_close = float(closes[-1]) if len(closes) else None
+
+
+class Bollinger:
+    """Incremental Bollinger bands."""
+
+    def __init__(self, period: int, width: float = DEFAULT_BOLLINGER_WIDTH) -> None:
+        """Initialize the indicator."""
+        self.window = RollingWindow(period)
+        self.width = width
+
+    @property
+    def value(self) -> Optional[Dict[str, float]]:
+        """Get the current `lower`, `middle` and `upper` bands."""
+        if not self.window.full:
+            return None
+        middle = self.window.sum / self.window.period
+        variance = self.window.sum_of_squares / self.window.period - middle**2
+        deviation = math.sqrt(max(variance, 0.0))
+        return dict(
+            lower=middle - self.width * deviation,
+            middle=middle,
+            upper=middle + self.width * deviation,
+        )
+
+    def update(self, close: float) -> Optional[Dict[str, float]]:
+        """Update the indicator with a new close."""
+        self.window.push(close)
+        return self.value
+
+    def warm_up(self, closes: np.ndarray) -> None:
+        """Warm the indicator up with past closes."""
+        self.window.warm_up(closes)
+
+
+class ATR:
+    """An incremental average true range."""
+
+    def __init__(self, period: int) -> None:
+        """Initialize the indicator."""
+        self.average = RecursiveAverage(period, 1 / period)
+        self.previous_close: Optional[float] = None
+
+    @property
+    def value(self) -> Optional[float]:
+        """Get the current value."""
+        return self.average.value
+
+    def update(self, high: float, low: float, close: float) -> Optional[float]:
+        """Update the indicator with a new candle."""
+        candle_range = high - low
+        if self.previous_close is not None:
+            candle_range = max(
+                candle_range,
+                abs(high - self.previous_close),
+                abs(low - self.previous_close),
+            )
+        self.previous_close = close
+        return self.average.update(candle_range)
+
+    def warm_up(self, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> None:
+        """Warm the indicator up with past candles."""
+        self.average.warm_up(true_range(high, low, close))
+        self.previous_close = float(close[-1]) if len(close) else None
+
+
+class VWAP:
+    """An incremental volume-weighted average price over the last `period` candles."""
+
+    def __init__(self, period: int) -> None:
+        """Initialize the indicator."""
+        self.traded_value = RollingWindow(period)
+        self.traded_volume = RollingWindow(period)
+
+    @property
+    def value(self) -> Optional[float]:
+        """Get the current value."""
+        if not self.traded_volume.full or self.traded_volume.sum <= 0:
+            return None
+        return self.traded_value.sum / self.traded_volume.sum
+
+    def update(
+        self, high: float, low: float, close: float, volume: float
+    ) -> Optional[float]:
+        """Update the indicator with a new candle."""
+        self.traded_value.push((high + low + close) / 3 * volume)
+        self.traded_volume.push(volume)
+        return self.value
+
+    def warm_up(
+        self, high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray
+    ) -> None:
+        """Warm the indicator up with past candles."""
+        self.traded_value.warm_up((high + low + close) / 3 * volume)
+        self.traded_volume.warm_up(volume)
+
+
+class IndicatorEngine:
+    """
+    Keep the indicators of a pair up to date with its closed candles.
+
+    The engine is warmed up in batch mode from the stored history the first time it is
+    synced, and afterwards only the candles closed since the previous sync are applied.
+    The last candle of the history is still open, so it is left out until it closes.
+    """
+
+    def __init__(self, period: int, width: float = DEFAULT_BOLLINGER_WIDTH) -> None:
+        """Initialize the engine."""
+        self.period = period
+        self.sma = SMA(period)
+        self.ema = EMA(period)
+        self.rsi = RSI(period)
+        self.bollinger = Bollinger(period, width)
+        self.atr = ATR(period)
+        self.vwap = VWAP(period)
+        self.last_timestamp: Optional[int] = None
+
+    def warm_up(self, candles: np.ndarray) -> None:
+        """Set the state of every indicator from past candles, in batch mode."""
+        high, low = candles["high"], candles["low"]
+        close, volume = candles["close"], candles["volume"]
+        self.sma.warm_up(close)
+        self.ema.warm_up(close)
+        self.rsi.warm_up(close)
+        self.bollinger.warm_up(close)
+        self.atr.warm_up(high, low, close)
+        self.vwap.warm_up(high, low, close, volume)
+        if len(candles):
+            self.last_timestamp = int(candles["timestamp"][-1])
+
+    def update(self, candle: np.void) -> None:
+        """Update every indicator with a new candle, in O(1)."""
+        high, low = float(candle["high"]), float(candle["low"])
+        close, volume = float(candle["close"]), float(candle["volume"])
+        self.sma.update(close)
+        self.ema.update(close)
+        self.rsi.update(close)
+        self.bollinger.update(close)
+        self.atr.update(high, low, close)
+        self.vwap.update(high, low, close, volume)
+        self.last_timestamp = int(candle["timestamp"])
+
+    def sync(self, store: OHLCVStore) -> int:
+        """
+        Apply the candles of a store that closed since the last sync.
+
+        :param store: the store of the pair.
+        :return: the number of candles applied.
+        """
+        if self.last_timestamp is None:
+            closed = store.tail(WARMUP_PERIODS * self.period + 1)[:-1]
+            self.warm_up(closed)
+            return len(closed)
+        closed = store.window(self.last_timestamp + 1)[:-1]
+        for candle in closed:
+            self.update(candle)
+        return len(closed)
+
+    def values(self) -> Dict[str, Optional[float]]:
+        """Get the current value of every indicator, flattening the bands."""
+        bands = self.bollinger.value or {}
+        return dict(
+            sma=self.sma.value,
+            ema=self.ema.value,
+            rsi=self.rsi.value,
+            bollinger_lower=bands.get("lower"),
+            bollinger_middle=bands.get("middle"),
+            bollinger_upper=bands.get("upper"),
+            atr=self.atr.value,
+            vwap=self.vwap.value,
+        )
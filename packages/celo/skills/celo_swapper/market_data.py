@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the market data reads of the CeloSwapperAbciApp."""
+
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from packages.celo.skills.celo_swapper.fixed_point import (
+    BPS,
+    WAD,
+    from_wad,
+    get_amount_out,
+    sqrt_price_x96_to_wad,
+    wad_ratio,
+)
+
+
+V2_POOL = "v2"
+V3_POOL = "v3"
+
+# pool type -> [(field, view method)]
+POOL_READS = {
+    V2_POOL: [("reserves", "getReserves")],
+    V3_POOL: [("slot0", "slot0"), ("liquidity", "liquidity")],
+}
+ORACLE_READ = ("oracle_rate", "medianRate")
+# the amount under which the pair states of a snapshot are cached, as spot quotes
+SPOT_AMOUNT = 0
+Q96 = 2**96
+
+
+def build_pair_reads(
+    pairs: List[Dict[str, str]], sorted_oracles_address: str, pools: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Build the batched view calls that read the state of every configured pair.
+
+    :param pairs: the configured pairs.
+    :param sorted_oracles_address: the address of the `SortedOracles` contract.
+    :param pools: whether to read the pools, or only the oracles.
+    :return: the reads, each tagged with the pair and the field it populates.
+    """
+    reads = []
+    for pair in pairs:
+        pool_reads = POOL_READS[pair["pool_type"]] if pools else []
+        for field, method in pool_reads:
+            reads.append(
+                dict(
+                    pair=pair["name"],
+                    field=field,
+                    target=pair["pool"],
+                    method=method,
+                    args=[],
+                )
+            )
+        rate_feed = pair.get("rate_feed")
+        if rate_feed:
+            field, method = ORACLE_READ
+            reads.append(
+                dict(
+                    pair=pair["name"],
+                    field=field,
+                    target=sorted_oracles_address,
+                    method=method,
+                    args=[rate_feed],
+                )
+            )
+    return reads
+
+
+def parse_pair_reads(
+    reads: List[Dict[str, Any]], state: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Build a market snapshot out of the results of the batched reads.
+
+    :param reads: the reads, as built by `build_pair_reads`.
+    :param state: the state returned by the multicall3 contract.
+    :return: the snapshot, with the raw on-chain values of every pair.
+    """
+    pairs: Dict[str, Dict[str, Optional[List[int]]]] = {}
+    for read, result in zip(reads, state["results"]):
+        values = result["values"] if result["success"] else None
+        pairs.setdefault(read["pair"], {})[read["field"]] = values
+    return dict(
+        block_number=state["block_number"],
+        block_timestamp=state["block_timestamp"],
+        pairs=pairs,
+    )
+
+
+def serialize_snapshot(snapshot: Dict[str, Any]) -> str:
+    """Serialize a snapshot canonically, so that equal snapshots have equal digests."""
+    return json.dumps(snapshot, sort_keys=True)
+
+
+def snapshot_digest(serialized_snapshot: str) -> str:
+    """Get the digest of a serialized snapshot."""
+    return hashlib.sha256(serialized_snapshot.encode()).hexdigest()
+
+
+def pair_price_wad(state: Dict[str, Optional[List[int]]]) -> Optional[int]:
+    """
+    Get the price of a pair, in raw token1 units per raw token0 unit, as a wad.
+
+    The pool price is preferred; the oracle rate is used if the pool could not be read.
+
+    :param state: the state of the pair in a snapshot.
+    :return: the price, or None if neither the pool nor the oracle could be read.
+    """
+    reserves = state.get("reserves")
+    if reserves and reserves[0] > 0:
+        return wad_ratio(reserves[1], reserves[0])
+    slot0 = state.get("slot0")
+    if slot0 and slot0[0] > 0:
+        return sqrt_price_x96_to_wad(slot0[0])
+    oracle_rate = state.get("oracle_rate")
+    if oracle_rate and oracle_rate[1] > 0:
+        return wad_ratio(oracle_rate[0], oracle_rate[1])
+    return None
+
+
+def pair_price(state: Dict[str, Optional[List[int]]]) -> Optional[float]:
+    """Get the price of a pair as a float, derived from its wad price."""
+    price = pair_price_wad(state)
+    return None if price is None else from_wad(price)
+
+
+def quote_amount_out(
+    state: Dict[str, Optional[List[int]]],
+    amount_in: int,
+    zero_for_one: bool,
+    fee_bps: int,
+) -> Optional[int]:
+    """
+    Quote a swap against the pool state of a pair, in raw token units.
+
+    v2 pools are quoted exactly against their reserves; v3 pools are quoted at their
+    spot price, which ignores the price impact within the current tick range.
+
+    :param state: the state of the pair in a snapshot.
+    :param amount_in: the amount swapped in.
+    :param zero_for_one: whether token0 is swapped in for token1, or the reverse.
+    :param fee_bps: the fee of the pool, in basis points.
+    :return: the amount swapped out, or None if the pool could not be read.
+    """
+    reserves = state.get("reserves")
+    if reserves and reserves[0] > 0 and reserves[1] > 0:
+        reserve_in, reserve_out = reserves[:2] if zero_for_one else reserves[1::-1]
+        return get_amount_out(amount_in, reserve_in, reserve_out, fee_bps)
+    slot0 = state.get("slot0")
+    if slot0 and slot0[0] > 0:
+        price = sqrt_price_x96_to_wad(slot0[0])
+        if price == 0:
+            return None
+        amount_in_after_fee = amount_in * (BPS - fee_bps) // BPS
+        if zero_for_one:
+            return amount_in_after_fee * price // WAD
+        return amount_in_after_fee * WAD // price
+    return None
+
+
+def quote_curve(
+    state: Dict[str, Optional[List[int]]],
+    amounts_in: np.ndarray,
+    zero_for_one: bool,
+    fee_bps: int,
+) -> Optional[np.ndarray]:
+    """
+    Quote many amounts against the pool state of a pair at once, in floats.
+
+    This is the vectorized counterpart of `quote_amount_out`, to compare the price
+    impact of many amounts cheaply; exact amounts are quoted with `quote_amount_out`.
+
+    :param state: the state of the pair in a snapshot.
+    :param amounts_in: the amounts swapped in.
+    :param zero_for_one: whether token0 is swapped in for token1, or the reverse.
+    :param fee_bps: the fee of the pool, in basis points.
+    :return: the amounts swapped out, or None if the pool could not be read.
+    """
+    amounts_in_after_fee = amounts_in * ((BPS - fee_bps) / BPS)
+    reserves = state.get("reserves")
+    if reserves and reserves[0] > 0 and reserves[1] > 0:
+        reserve_in, reserve_out = reserves[:2] if zero_for_one else reserves[1::-1]
+        return (
+            amounts_in_after_fee
+            * float(reserve_out)
+            / (float(reserve_in) + amounts_in_after_fee)
+        )
+    slot0 = state.get("slot0")
+    if slot0 and slot0[0] > 0:
+        price = sqrt_price_x96_to_wad(slot0[0])
+        if price == 0:
+            return None
+        if zero_for_one:
+            return amounts_in_after_fee * (price / WAD)
+        return amounts_in_after_fee * (WAD / price)
+    return None
+
+
+def parse_source_price(body: bytes, path: str) -> Optional[float]:
+    """
+    Get a price out of the JSON response of an off-chain price source.
+
+    :param body: the body of the response.
+    :param path: the dot-separated path of the price in the response, e.g. `celo.usd`.
+    :return: the price, or None if it could not be found.
+    """
+    try:
+        value: Any = json.loads(body)
+        for key in path.split("."):
+            value = value[int(key)] if isinstance(value, list) else value[key]
+        return float(value)
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""
+This module contains the mech requests of the CeloSwapperAbciApp.
+
+The prompts of a period are batched: one request per pair under consideration is put in
+`mech_requests`, in the format of the mech interaction skill, which sends them all in a
+single multisend transaction of the safe. Every request carries a nonce derived from the
+agreed market data, so that all agents build the same batch and the responses can be
+matched back to their pairs. The results are cached by pair, tool and bucket of the
+signal they were asked for, so that a prompt repeated with a slightly different price or
+score is answered from the cache.
+"""
+
+import hashlib
+import json
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+
+# the namespace of the nonces of the requests
+NONCE_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "celo_swapper/mech_requests")
+
+
+@dataclass(frozen=True)
+class MechMetadata:
+    """A request to a mech, as the mech interaction skill expects it."""
+
+    prompt: str
+    tool: str
+    nonce: str
+
+
+def request_nonce(market_data_digest: str, pair: str, tool: str) -> str:
+    """Get the nonce of the request for a pair, the same for every agent."""
+    return str(uuid.uuid5(NONCE_NAMESPACE, f"{market_data_digest}:{pair}:{tool}"))
+
+
+def signal_bucket(score: float, width: float) -> int:
+    """Get the bucket of a score, the nearest multiple of `width` to it."""
+    return int(round(score / width))
+
+
+def response_key(pair: str, bucket: int, tool: str) -> str:
+    """Get the key of the response for a pair and the bucket of its signal."""
+    return hashlib.sha256(f"{tool}\n{pair}\n{bucket}".encode()).hexdigest()
+
+
+def build_mech_requests(
+    pairs: Iterable[str],
+    prices: Mapping[str, float],
+    scores: Mapping[str, float],
+    template: str,
+    tool: str,
+    market_data_digest: str,
+) -> Tuple[List[MechMetadata], Dict[str, str]]:
+    """
+    Build the batch of requests of a period, one per pair.
+
+    :param pairs: the pairs to ask about, in order.
+    :param prices: the agreed price of every pair.
+    :param scores: the agreed score of every pair.
+    :param template: the prompt, formatted with the `pair`, `price` and `score`.
+    :param tool: the mech tool to request.
+    :param market_data_digest: the digest of the agreed market data.
+    :return: the requests, and the pair of every request by nonce.
+    """
+    requests, request_pairs = [], {}
+    for pair in pairs:
+        prompt = template.format(
+            pair=pair, price=f"{prices[pair]:.8g}", score=f"{scores[pair]:.4f}"
+        )
+        nonce = request_nonce(market_data_digest, pair, tool)
+        requests.append(MechMetadata(prompt=prompt, tool=tool, nonce=nonce))
+        request_pairs[nonce] = pair
+    return requests, request_pairs
+
+
+def serialize_requests(requests: Iterable[MechMetadata]) -> str:
+    """Serialize requests as the mech interaction skill stores them."""
+    return json.dumps([asdict(request) for request in requests], sort_keys=True)
+
+
+def demultiplex_responses(
+    request_pairs: Mapping[str, str], responses: Iterable[Mapping[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Match the responses of a batch back to the pairs they were requested for.
+
+    :param request_pairs: the pair of every request, by nonce.
+    :param responses: the responses, each with the `nonce` of its request.
+    :return: the result of every pair that got a response. Responses to unknown
+        requests and responses without a result are left out.
+    """
+    results = {}
+    for response in responses:
+        pair = request_pairs.get(response.get("nonce", ""))
+        if pair is not None and response.get("result") is not None:
+            results[pair] = response["result"]
+    return results
+
+
+def mech_confirms(result: Any, score: float, threshold: float) -> bool:
+    """
+    Check whether the result of a prediction tool confirms the direction of a signal.
+
+    :param result: the result, a JSON mapping with the `p_yes` and `p_no` that the price
+        of the pair will be higher, or its serialization.
+    :param score: the agreed score of the pair, positive to buy and negative to sell.
+    :param threshold: the probability the direction of the signal needs, at least.
+    :return: whether the direction of the signal is likely enough. A result that is not
+        a prediction confirms nothing.
+    """
+    try:
+        prediction = json.loads(result) if isinstance(result, str) else result
+        p_yes = float(prediction["p_yes"])
+        p_no = float(prediction.get("p_no", 1.0 - p_yes))
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return False
+    return (p_yes if score > 0 else p_no) >= threshold
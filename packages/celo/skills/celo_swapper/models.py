@@ -19,7 +19,20 @@
 
 """This module contains the shared state for the abci skill of CeloSwapperAbciApp."""
 
-from packages.valory.skills.abstract_round_abci.models import BaseParams
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple, cast
+
+import numpy as np
+from aea.helpers.ipfs.base import IPFSHashOnly
+from aea.skills.base import Model
+
+from packages.valory.skills.abstract_round_abci.models import (
+    BaseParams,
+    MIN_RESET_PAUSE_DURATION,
+)
 from packages.valory.skills.abstract_round_abci.models import (
     BenchmarkTool as BaseBenchmarkTool,
 )
@@ -27,7 +40,15 @@ from packages.valory.skills.abstract_round_abci.models import Requests as BaseRe
 from packages.valory.skills.abstract_round_abci.models import (
     SharedState as BaseSharedState,
 )
+from packages.valory.skills.abstract_round_abci.models import TypeCheckMixin
+from packages.celo.skills.celo_swapper.delivery import DeliveryTracker
+from packages.celo.skills.celo_swapper.history import OHLCVStore, history_path
+from packages.celo.skills.celo_swapper.indexer import PoolIndex
+from packages.celo.skills.celo_swapper.indicators import IndicatorEngine
+from packages.celo.skills.celo_swapper.mech import response_key, signal_bucket
+from packages.celo.skills.celo_swapper.router import RouteIndex
 from packages.celo.skills.celo_swapper.rounds import CeloSwapperAbciApp
+from packages.celo.skills.celo_swapper.strategies import available_strategies
 
 
 class SharedState(BaseSharedState):
@@ -35,7 +56,483 @@ class SharedState(BaseSharedState):
 
     abci_app_cls = CeloSwapperAbciApp
 
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the state."""
+        super().__init__(*args, **kwargs)
+        self.last_collected_block: Optional[int] = None
+        self.pool_index = PoolIndex()
+        self.route_index = RouteIndex()
+        # the key of the last strategy evaluation, its serialized scores and duration
+        self.strategy_evaluation: Optional[Tuple[str, str, Optional[float]]] = None
+
+
+QuoteKey = Tuple[str, int, int]
+
+
+class QuoteCache(Model, TypeCheckMixin):
+    """
+    Keep the quotes read during a period, pinned to the block they were read at.
+
+    Quotes are keyed by pair, amount bucket and block number, so a quote is only reused
+    for the exact chain state it was read at. Entries expire after `ttl` seconds and the
+    least recently used ones are evicted once the cache holds `max_size` quotes.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the quote cache."""
+        self.ttl: int = self._ensure("ttl", kwargs, int)
+        self.max_size: int = self._ensure("max_size", kwargs, int)
+        self.amount_precision: int = self._ensure("amount_precision", kwargs, int)
+        super().__init__(*args, **kwargs)
+        self._quotes: "OrderedDict[QuoteKey, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        """Get the number of cached quotes, including the expired ones."""
+        return len(self._quotes)
+
+    def bucket(self, amount: int) -> int:
+        """Round an amount down to `amount_precision` significant digits."""
+        if amount <= 0:
+            return 0
+        scale = 10 ** max(len(str(amount)) - self.amount_precision, 0)
+        return amount - amount % scale
+
+    def key(self, pair: str, amount: int, block_number: int) -> QuoteKey:
+        """Get the key of a quote."""
+        return pair, self.bucket(amount), block_number
+
+    def get(self, pair: str, amount: int, block_number: int) -> Optional[Any]:
+        """Get a quote, or None if it is not cached or has expired."""
+        key = self.key(pair, amount, block_number)
+        entry = self._quotes.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, quote = entry
+        if expires_at <= time.monotonic():
+            del self._quotes[key]
+            self.misses += 1
+            return None
+        self._quotes.move_to_end(key)
+        self.hits += 1
+        return quote
+
+    def put(self, pair: str, amount: int, block_number: int, quote: Any) -> None:
+        """Cache a quote, evicting the least recently used ones if the cache is full."""
+        key = self.key(pair, amount, block_number)
+        self._quotes[key] = (time.monotonic() + self.ttl, quote)
+        self._quotes.move_to_end(key)
+        while len(self._quotes) > self.max_size:
+            self._quotes.popitem(last=False)
+
+
+class IpfsPins(Model, TypeCheckMixin):
+    """
+    Keep the hashes of the files pinned on IPFS by this agent, to skip uploading again.
+
+    The hash of a file is computed locally, the way the IPFS node computes it when the
+    file is added wrapped in a directory, so that a duplicate is recognized before it is
+    sent. The `max_size` most recently used hashes are kept.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the pins."""
+        self.max_size: int = self._ensure("max_size", kwargs, int)
+        super().__init__(*args, **kwargs)
+        self._hashes: "OrderedDict[str, None]" = OrderedDict()
+
+    def __contains__(self, ipfs_hash: object) -> bool:
+        """Check whether a file was pinned, refreshing its hash if so."""
+        if ipfs_hash not in self._hashes:
+            return False
+        self._hashes.move_to_end(cast(str, ipfs_hash))
+        return True
+
+    def __len__(self) -> int:
+        """Get the number of pinned hashes kept."""
+        return len(self._hashes)
+
+    @staticmethod
+    def content_hash(path: str, data: str) -> str:
+        """Compute the IPFS hash of a file, wrapped in a directory like the node."""
+        return IPFSHashOnly.hash_bytes(
+            data.encode("utf-8"),
+            wrap=True,
+            cid_v1=False,
+            file_name_if_wrap=Path(path).name,
+        )
+
+    def add(self, ipfs_hash: str) -> None:
+        """Record that a file was pinned."""
+        self._hashes[ipfs_hash] = None
+        self._hashes.move_to_end(ipfs_hash)
+        while len(self._hashes) > self.max_size:
+            self._hashes.popitem(last=False)
+
+
+class MechCache(Model, TypeCheckMixin):
+    """
+    Answer the prompts the mechs answered recently from the agreed cache.
+
+    The cache is kept in the synchronized data, so that every agent answers the same
+    prompts from it, and carried over across periods; it does not survive a restart. The
+    results are keyed by pair, tool and bucket of `bucket_width` of the signal they were
+    asked for. Entries expire `ttl_periods` periods after they were delivered, and only
+    the `max_size` most recently delivered ones are kept, the lowest keys on ties.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the mech cache."""
+        self.ttl_periods: int = self._ensure("ttl_periods", kwargs, int)
+        self.max_size: int = self._ensure("max_size", kwargs, int)
+        self.bucket_width: float = self._ensure("bucket_width", kwargs, float)
+        super().__init__(*args, **kwargs)
+
+    def key(self, pair: str, score: float, tool: str) -> str:
+        """Get the key of the result for a pair, asked with a score, to a tool."""
+        return response_key(pair, signal_bucket(score, self.bucket_width), tool)
+
+    def get(self, cache: Dict[str, Any], key: str, period: int) -> Optional[Any]:
+        """Get a result of the agreed cache, or None if it is missing or expired."""
+        entry = cache.get(key)
+        if entry is None or period - entry["period"] >= self.ttl_periods:
+            return None
+        return entry["result"]
+
+    def put(
+        self, cache: Dict[str, Any], results: Dict[str, Any], period: int
+    ) -> Dict[str, Any]:
+        """
+        Get the agreed cache after some results were delivered.
+
+        :param cache: the agreed cache.
+        :param results: the delivered results, by key.
+        :param period: the period the results were delivered in.
+        :return: the cache with the results, without the expired and evicted entries.
+        """
+        entries = {
+            key: entry
+            for key, entry in cache.items()
+            if period - entry["period"] < self.ttl_periods
+        }
+        entries.update(
+            {key: dict(period=period, result=result) for key, result in results.items()}
+        )
+        kept = sorted(entries, key=lambda key: (-entries[key]["period"], key))
+        return {key: entries[key] for key in sorted(kept[: self.max_size])}
+
+
+class MechDeliveries(Model, TypeCheckMixin):
+    """
+    Keep how to poll for the deliveries of the outstanding mech requests.
+
+    The `Deliver` logs of the mech at `mech_address` are polled once per decision, in
+    ranges of at most `chunk_size` blocks, by a tracker that remembers the blocks it
+    polled already.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the tracker of the mech deliveries."""
+        self.mech_address: str = self._ensure("mech_address", kwargs, str)
+        chunk_size: int = self._ensure("chunk_size", kwargs, int)
+        super().__init__(*args, **kwargs)
+        self.tracker = DeliveryTracker(chunk_size)
+
+
+class SourceHealth(Model, TypeCheckMixin):
+    """
+    Keep the rolling latency and error rate of the endpoints the skill chooses between.
+
+    A circuit breaker is opened on a source after `failure_threshold` consecutive
+    failures, taking it out of the ranking for `cooldown` seconds. After the cooldown the
+    source is tried again; a success closes the breaker and a failure opens it again.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the registry."""
+        self.window: int = self._ensure("window", kwargs, int)
+        self.failure_threshold: int = self._ensure("failure_threshold", kwargs, int)
+        self.cooldown: float = self._ensure("cooldown", kwargs, float)
+        self.timeout_slack: float = self._ensure("timeout_slack", kwargs, float)
+        super().__init__(*args, **kwargs)
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._outcomes: Dict[str, Deque[bool]] = {}
+        self._consecutive_failures: Dict[str, int] = {}
+        self._open_until: Dict[str, float] = {}
+
+    def record(self, name: str, latency: float, success: bool) -> None:
+        """Record the outcome of a request to a source."""
+        self._latencies.setdefault(name, deque(maxlen=self.window)).append(latency)
+        self._outcomes.setdefault(name, deque(maxlen=self.window)).append(success)
+        if success:
+            self._consecutive_failures[name] = 0
+            self._open_until.pop(name, None)
+            return
+        failures = self._consecutive_failures.get(name, 0) + 1
+        self._consecutive_failures[name] = failures
+        if failures >= self.failure_threshold:
+            self._open_until[name] = time.monotonic() + self.cooldown
+
+    def record_straggler(self, name: str, latency: float) -> None:
+        """
+        Record a source that had not answered when a quorum of the others had.
+
+        Only the latency is recorded, as the source did not fail. Callers pass the time
+        the source was waited for at least, or a timeout penalty, so that a source that
+        is always late is not ranked among the fast ones.
+
+        :param name: the name of the source.
+        :param latency: the latency to record for the source.
+        """
+        self._latencies.setdefault(name, deque(maxlen=self.window)).append(latency)
+
+    def latency(self, name: str) -> float:
+        """Get the rolling median latency of a source, infinite if never measured."""
+        latencies = self._latencies.get(name)
+        return float(np.median(latencies)) if latencies else float("inf")
+
+    def error_rate(self, name: str) -> float:
+        """Get the rolling error rate of a source, 0 if it was never requested."""
+        outcomes = self._outcomes.get(name)
+        return 1 - sum(outcomes) / len(outcomes) if outcomes else 0.0
+
+    def is_open(self, name: str) -> bool:
+        """Check whether the circuit breaker of a source is open."""
+        return self._open_until.get(name, 0.0) > time.monotonic()
+
+    def rank(self, names: Iterable[str]) -> List[str]:
+        """
+        Rank the sources fastest-first, leaving out the ones with an open breaker.
+
+        Sources that were never measured are ranked last, as the slowest. They are still
+        measured, as every available source is requested. Ties are broken by error
+        rate, then by name.
+
+        :param names: the names of the sources.
+        :return: the available sources, fastest-first.
+        """
+        return sorted(
+            (name for name in names if not self.is_open(name)),
+            key=lambda name: (self.latency(name), self.error_rate(name), name),
+        )
+
+    def timeout(self, ranked: List[str], quorum: int, default: float) -> float:
+        """
+        Get how long to wait for a quorum of the ranked sources.
+
+        The wait is bounded by the rolling latency of the slowest source of the quorum,
+        with some slack, so that a degraded source does not cost the full `default`.
+
+        :param ranked: the sources, as ranked by `rank`.
+        :param quorum: the number of sources to wait for.
+        :param default: the configured timeout, which is never exceeded.
+        :return: the timeout.
+        """
+        fastest = ranked[:quorum]
+        measured = all(name in self._latencies for name in fastest)
+        if len(fastest) < quorum or not measured:
+            return default
+        expected = max(self.latency(name) for name in fastest)
+        return min(default, expected * self.timeout_slack)
+
+
+class LatencyBudget(Model, TypeCheckMixin):
+    """
+    Decide from the agreed latency of the strategy evaluation when to degrade it.
+
+    The agreed latency holds the median durations of the recent full evaluations, up to
+    `window` of them, and the number of degraded evaluations since the last full one.
+    The evaluation is degraded once the median of the recent durations exceeds `budget`
+    of the round timeout. A full evaluation is tried again after `probe_interval`
+    degraded ones, so that the agents recover once the slowdown is over. The latency is
+    kept in the synchronized data, so that every agent degrades in the same periods.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the budget."""
+        self.budget: float = self._ensure("budget", kwargs, float)
+        self.window: int = self._ensure("window", kwargs, int)
+        self.probe_interval: int = self._ensure("probe_interval", kwargs, int)
+        super().__init__(*args, **kwargs)
+
+    def record(
+        self, latency: Dict[str, Any], duration: Optional[float], degraded: bool
+    ) -> Dict[str, Any]:
+        """
+        Get the latency after an evaluation.
+
+        :param latency: the agreed latency before the evaluation.
+        :param duration: the agreed duration of the evaluation, if it was a full one.
+        :param degraded: whether the evaluation was degraded.
+        :return: the latency after the evaluation.
+        """
+        durations = list(latency.get("durations", []))
+        degraded_runs = latency.get("degraded_runs", 0)
+        if degraded:
+            return dict(durations=durations, degraded_runs=degraded_runs + 1)
+        if duration is None:
+            return dict(durations=durations, degraded_runs=degraded_runs)
+        return dict(durations=(durations + [duration])[-self.window :], degraded_runs=0)
+
+    def is_exceeded(self, latency: Dict[str, Any], round_timeout: float) -> bool:
+        """Check whether the agreed latency calls for a degraded evaluation."""
+        durations = latency.get("durations", [])
+        if not durations or latency.get("degraded_runs", 0) >= self.probe_interval:
+            return False
+        return float(np.median(durations)) > self.deadline(round_timeout)
+
+    def deadline(self, round_timeout: float) -> float:
+        """Get how long an evaluation may run, `budget` of the round timeout."""
+        return self.budget * round_timeout
+
+
+class Params(BaseParams):
+    """Parameters."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the parameters object."""
+        self.multicall3_address: str = self._ensure("multicall3_address", kwargs, str)
+        self.sorted_oracles_address: str = self._ensure(
+            "sorted_oracles_address", kwargs, str
+        )
+        self.pairs: List[Dict[str, str]] = self._ensure(
+            "pairs", kwargs, List[Dict[str, str]]
+        )
+        self.market_data_on_ipfs: bool = self._ensure(
+            "market_data_on_ipfs", kwargs, bool
+        )
+        self.block_driven_collection: bool = self._ensure(
+            "block_driven_collection", kwargs, bool
+        )
+        self.index_pool_events: bool = self._ensure("index_pool_events", kwargs, bool)
+        self.block_poll_interval: float = self._ensure(
+            "block_poll_interval", kwargs, float
+        )
+        self.new_block_timeout: float = self._ensure(
+            "new_block_timeout", kwargs, float
+        )
+        self.aggregation_mad_threshold: float = self._ensure(
+            "aggregation_mad_threshold", kwargs, float
+        )
+        self.aggregation_tolerance: float = self._ensure(
+            "aggregation_tolerance", kwargs, float
+        )
+        self.strategies: List[str] = self._ensure("strategies", kwargs, List[str])
+        unknown = set(self.strategies) - set(available_strategies())
+        if not self.strategies or unknown:
+            raise ValueError(
+                f"`strategies` must name at least one of {available_strategies()}, "
+                f"got {self.strategies}."
+            )
+        self.strategy_lookback: int = self._ensure("strategy_lookback", kwargs, int)
+        self.strategy_sensitivity: float = self._ensure(
+            "strategy_sensitivity", kwargs, float
+        )
+        self.swap_signal_threshold: float = self._ensure(
+            "swap_signal_threshold", kwargs, float
+        )
+        self.max_swaps_per_period: int = self._ensure(
+            "max_swaps_per_period", kwargs, int
+        )
+        self.swap_amount: int = self._ensure("swap_amount", kwargs, int)
+        self.swap_fee_bps: int = self._ensure("swap_fee_bps", kwargs, int)
+        self.swap_slippage_bps: int = self._ensure("swap_slippage_bps", kwargs, int)
+        self.max_route_hops: int = self._ensure("max_route_hops", kwargs, int)
+        self.max_split_routes: int = self._ensure("max_split_routes", kwargs, int)
+        self.split_steps: int = self._ensure("split_steps", kwargs, int)
+        self.mech_signal_threshold: float = self._ensure(
+            "mech_signal_threshold", kwargs, float
+        )
+        self.mech_batch_size: int = self._ensure("mech_batch_size", kwargs, int)
+        self.mech_confirmation_threshold: float = self._ensure(
+            "mech_confirmation_threshold", kwargs, float
+        )
+        self.mech_prompt_template: str = self._ensure(
+            "mech_prompt_template", kwargs, str
+        )
+        self.mech_tool: str = self._ensure("mech_tool", kwargs, str)
+        self.ipfs_max_in_flight: int = self._ensure("ipfs_max_in_flight", kwargs, int)
+        self.price_sources: List[Dict[str, str]] = self._ensure(
+            "price_sources", kwargs, List[Dict[str, str]]
+        )
+        self.price_source_quorum: int = self._ensure(
+            "price_source_quorum", kwargs, int
+        )
+        self.price_source_timeout: float = self._ensure(
+            "price_source_timeout", kwargs, float
+        )
+        super().__init__(*args, **kwargs)
+        if self.block_driven_collection:
+            self._check_block_driven_collection()
+
+    def _check_block_driven_collection(self) -> None:
+        """
+        Check that the block-driven collection fits in its round.
+
+        New blocks set the cadence of the periods, so the pause between them must be
+        kept at its floor. The wait for a new block must leave the round enough time to
+        collect the market data after it, which is bounded by `price_source_timeout`.
+
+        :raises ValueError: if the params do not fit the block-driven collection.
+        """
+        if self.reset_pause_duration != MIN_RESET_PAUSE_DURATION:
+            raise ValueError(
+                f"`reset_pause_duration` must be {MIN_RESET_PAUSE_DURATION} with "
+                f"`block_driven_collection`, got {self.reset_pause_duration}."
+            )
+        collection_budget = self.round_timeout_seconds - self.price_source_timeout
+        if self.new_block_timeout >= collection_budget:
+            raise ValueError(
+                f"`new_block_timeout` must be less than {collection_budget}, the "
+                "`round_timeout_seconds` minus the `price_source_timeout`, got "
+                f"{self.new_block_timeout}."
+            )
+
+    def strategy_params(self) -> SimpleNamespace:
+        """Get the `strategy_*` params, in a namespace that can be sent to a worker."""
+        return SimpleNamespace(
+            **{
+                name: value
+                for name, value in vars(self).items()
+                if name.startswith("strategy_")
+            }
+        )
+
+
+class MarketHistory(Model, TypeCheckMixin):
+    """Keep the local OHLCV history of every pair."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the market history."""
+        self.history_dir = Path(self._ensure("history_dir", kwargs, str))
+        self.candle_interval: int = self._ensure("candle_interval", kwargs, int)
+        super().__init__(*args, **kwargs)
+        self._stores: Dict[str, OHLCVStore] = {}
+        self._indicators: Dict[str, IndicatorEngine] = {}
+
+    def store(self, pair: str) -> OHLCVStore:
+        """Get the store of a pair, opening it on first use."""
+        if pair not in self._stores:
+            self._stores[pair] = OHLCVStore(
+                history_path(self.history_dir, pair), self.candle_interval
+            )
+        return self._stores[pair]
+
+    def indicators(self, pair: str, period: int) -> IndicatorEngine:
+        """Get the indicator engine of a pair for a period, starting it on first use."""
+        key = f"{pair}:{period}"
+        if key not in self._indicators:
+            self._indicators[key] = IndicatorEngine(period)
+        return self._indicators[key]
+
+    def teardown(self) -> None:
+        """Flush the stores to disk."""
+        for store in self._stores.values():
+            store.flush()
+        super().teardown()
+
 
-Params = BaseParams
 Requests = BaseRequests
 BenchmarkTool = BaseBenchmarkTool
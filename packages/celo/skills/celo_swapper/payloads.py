@@ -20,6 +20,7 @@
 """This module contains the transaction payloads of the CeloSwapperAbciApp."""
 
 from dataclasses import dataclass
+from typing import Optional
 
 from packages.valory.skills.abstract_round_abci.base import BaseTxPayload
 
@@ -28,40 +29,41 @@ from packages.valory.skills.abstract_round_abci.base import BaseTxPayload
 class DecisionMakingPayload(BaseTxPayload):
     """Represent a transaction payload for the DecisionMakingRound."""
 
-    # TODO: define your attributes
-
-
-@dataclass(frozen=True)
-class FinishedDecisionMakingPayload(BaseTxPayload):
-    """Represent a transaction payload for the FinishedDecisionMakingRound."""
-
-    # TODO: define your attributes
+    deliveries: str
 
 
 @dataclass(frozen=True)
 class MarketDataCollectionPayload(BaseTxPayload):
     """Represent a transaction payload for the MarketDataCollectionRound."""
 
-    # TODO: define your attributes
+    content: Optional[str]
+    digest: Optional[str] = None
+    ipfs_hash: Optional[str] = None
+    prices: Optional[str] = None
+    block_number: Optional[int] = None
 
 
 @dataclass(frozen=True)
 class MechRequestPreparationPayload(BaseTxPayload):
     """Represent a transaction payload for the MechRequestPreparationRound."""
 
-    # TODO: define your attributes
+    requests: Optional[str]
+    request_pairs: Optional[str] = None
+    cached_results: Optional[str] = None
+    request_hashes: Optional[str] = None
 
 
 @dataclass(frozen=True)
 class StrategyEvaluationPayload(BaseTxPayload):
     """Represent a transaction payload for the StrategyEvaluationRound."""
 
-    # TODO: define your attributes
+    scores: Optional[str]
+    duration: Optional[float] = None
 
 
 @dataclass(frozen=True)
 class SwapPreparationPayload(BaseTxPayload):
     """Represent a transaction payload for the SwapPreparationRound."""
 
-    # TODO: define your attributes
+    orders: Optional[str]
 
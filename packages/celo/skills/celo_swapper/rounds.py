@@ -19,36 +19,51 @@
 
 """This package contains the rounds of CeloSwapperAbciApp."""
 
+import json
+from abc import ABC
+from collections import Counter
 from enum import Enum
-from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Set, Tuple, cast
+
+import numpy as np
 
 from packages.valory.skills.abstract_round_abci.base import (
     AbciApp,
     AbciAppTransitionFunction,
-    AbstractRound,
     AppState,
     BaseSynchronizedData,
+    CollectDifferentUntilThresholdRound,
+    CollectSameUntilThresholdRound,
+    CollectionRound,
     DegenerateRound,
+    DeserializedCollection,
     EventToTimeout,
+    get_name,
 )
 
+from packages.celo.skills.celo_swapper.aggregation import median_aggregate
+from packages.celo.skills.celo_swapper.delivery import pending_requests
+from packages.celo.skills.celo_swapper.mech import (
+    demultiplex_responses,
+    mech_confirms,
+)
 from packages.celo.skills.celo_swapper.payloads import (
     DecisionMakingPayload,
-    FinishedDecisionMakingPayload,
     MarketDataCollectionPayload,
     MechRequestPreparationPayload,
     StrategyEvaluationPayload,
     SwapPreparationPayload,
 )
+from packages.celo.skills.celo_swapper.strategies import rank_candidates
 
 
 class Event(Enum):
     """CeloSwapperAbciApp Events"""
 
+    CACHED = "cached"
     MECH = "mech"
     ROUND_TIMEOUT = "round_timeout"
     SWAP = "swap"
-    STRATEGY = "strategy"
     DONE = "done"
     NO_MAJORITY = "no_majority"
 
@@ -60,161 +75,501 @@ class SynchronizedData(BaseSynchronizedData):
     This data is replicated by the tendermint application.
     """
 
+    def _get_deserialized(self, key: str) -> DeserializedCollection:
+        """Strictly get a collection and return it deserialized."""
+        serialized = self.db.get_strict(key)
+        return CollectionRound.deserialize_collection(serialized)
+
+    @property
+    def market_data(self) -> Optional[str]:
+        """Get the agreed market data snapshot, if it was not stored on IPFS."""
+        return self.db.get("market_data", None)
+
+    @property
+    def market_data_digest(self) -> str:
+        """Get the digest of the agreed market data snapshot."""
+        return str(self.db.get_strict("market_data_digest"))
+
+    @property
+    def market_data_ipfs_hash(self) -> Optional[str]:
+        """Get the IPFS hash of the agreed market data snapshot, if it was stored on IPFS."""
+        return self.db.get("market_data_ipfs_hash", None)
+
+    @property
+    def market_data_block(self) -> Optional[int]:
+        """Get the block the agreed market data snapshot was collected at."""
+        return self.db.get("market_data_block", None)
+
+    @property
+    def indexed_block(self) -> Optional[int]:
+        """Get the block the pool events were indexed up to, carried across periods."""
+        return self.db.get("indexed_block", None)
+
+    @property
+    def market_prices(self) -> Dict[str, float]:
+        """Get the aggregated price of every pair."""
+        return json.loads(self.db.get_strict("market_prices"))
+
+    @property
+    def participant_to_market_data(self) -> DeserializedCollection:
+        """Get the participants to market data."""
+        return self._get_deserialized("participant_to_market_data")
+
+    @property
+    def strategy_scores(self) -> Dict[str, float]:
+        """Get the aggregated strategy score of every pair."""
+        return json.loads(self.db.get_strict("strategy_scores"))
+
+    @property
+    def strategy_latency(self) -> Dict[str, Any]:
+        """Get the agreed latency of the strategy evaluation, carried across periods."""
+        return json.loads(self.db.get("strategy_latency", None) or "{}")
+
+    @property
+    def strongest_pairs(self) -> List[str]:
+        """Get the pairs with the strongest agreed scores, carried across periods."""
+        return json.loads(self.db.get("strongest_pairs", None) or "[]")
+
+    @property
+    def participant_to_strategy_scores(self) -> DeserializedCollection:
+        """Get the participants to strategy scores."""
+        return self._get_deserialized("participant_to_strategy_scores")
+
+    @property
+    def mech_requests(self) -> List[Dict[str, str]]:
+        """Get the agreed batch of mech requests."""
+        return json.loads(self.db.get("mech_requests", None) or "[]")
+
+    @property
+    def mech_request_pairs(self) -> Dict[str, str]:
+        """Get the pair of every mech request of the batch, by nonce."""
+        return json.loads(self.db.get("mech_request_pairs", None) or "{}")
+
+    @property
+    def participant_to_mech_requests(self) -> DeserializedCollection:
+        """Get the participants to mech requests."""
+        return self._get_deserialized("participant_to_mech_requests")
+
+    @property
+    def mech_responses(self) -> List[Dict[str, Any]]:
+        """Get the responses of the mechs, as stored by the mech interaction skill."""
+        responses = self.db.get("mech_responses", None) or []
+        return json.loads(responses) if isinstance(responses, str) else responses
+
+    @property
+    def mech_request_hashes(self) -> Dict[str, str]:
+        """Get the IPFS hash of the pinned metadata of every mech request, by nonce."""
+        return json.loads(self.db.get("mech_request_hashes", None) or "{}")
+
+    @property
+    def mech_cached_results(self) -> Dict[str, Any]:
+        """Get the results that were found in the mech cache, by pair."""
+        return json.loads(self.db.get("mech_cached_results", None) or "{}")
+
+    @property
+    def mech_outstanding(self) -> Dict[str, Dict[str, Any]]:
+        """Get the mech requests sent but not answered yet, carried across periods."""
+        return json.loads(self.db.get("mech_outstanding", None) or "{}")
+
+    @property
+    def mech_deliveries(self) -> Dict[str, Any]:
+        """Get the agreed results delivered for the outstanding requests, by id."""
+        return json.loads(self.db.get("mech_deliveries", None) or "{}")
+
+    @property
+    def participant_to_mech_deliveries(self) -> DeserializedCollection:
+        """Get the participants to mech deliveries."""
+        return self._get_deserialized("participant_to_mech_deliveries")
+
+    @property
+    def mech_results(self) -> Dict[str, Any]:
+        """Get the result of the mech for every pair that got one in the period."""
+        return json.loads(self.db.get("mech_results", None) or "{}")
+
+    @property
+    def mech_cache(self) -> Dict[str, Dict[str, Any]]:
+        """Get the agreed cache of the mech results, with the period of every entry."""
+        return json.loads(self.db.get("mech_cache", None) or "{}")
+
+    @property
+    def swap_candidates(self) -> List[str]:
+        """Get the agreed pairs to swap, strongest signal first."""
+        return json.loads(self.db.get("swap_candidates", None) or "[]")
+
+    @property
+    def swap_orders(self) -> List[Dict[str, Any]]:
+        """Get the agreed swap orders, in the order of the candidates."""
+        return json.loads(self.db.get("swap_orders", None) or "[]")
+
+    @property
+    def participant_to_swap_orders(self) -> DeserializedCollection:
+        """Get the participants to swap orders."""
+        return self._get_deserialized("participant_to_swap_orders")
+
+
+class MedianAggregationRound(CollectDifferentUntilThresholdRound, ABC):
+    """
+    MedianAggregationRound
 
-class DecisionMakingRound(AbstractRound):
-    """DecisionMakingRound"""
-
-    payload_class = DecisionMakingPayload
-    payload_attribute = ""  # TODO: update
-    synchronized_data_class = SynchronizedData
-
-    # TODO: replace AbstractRound with one of CollectDifferentUntilAllRound,
-    # CollectSameUntilAllRound, CollectSameUntilThresholdRound,
-    # CollectDifferentUntilThresholdRound, OnlyKeeperSendsRound, VotingRound,
-    # from packages/valory/skills/abstract_round_abci/base.py
-    # or implement the methods
+    Collects a numeric vector from k of n agents, as a JSON mapping of keys to numbers
+    under `vector_attribute`, and aggregates them with an element-wise median once the
+    outliers are masked. The agents do not need to send identical payloads, so tiny
+    differences in their readings do not prevent the round from finishing.
 
-    def end_block(self) -> Optional[Tuple[BaseSynchronizedData, Enum]]:
-        """Process the end of the block."""
-        raise NotImplementedError
+    `done_event`, or the event returned by `get_event`, is emitted with the aggregated
+    vector saved under `selection_key`. `none_event` is emitted if no agent sent a value.
+    """
 
-    def check_payload(self, payload: DecisionMakingPayload) -> None:
-        """Check payload."""
-        raise NotImplementedError
+    none_event: Any
+    selection_key: str
+    vector_attribute: str
 
-    def process_payload(self, payload: DecisionMakingPayload) -> None:
-        """Process payload."""
-        raise NotImplementedError
+    def get_vectors(self) -> List[Mapping[str, Optional[float]]]:
+        """Get the vectors of the collected payloads, in the order of their senders."""
+        vectors = []
+        for sender in sorted(self.collection):
+            serialized = getattr(self.collection[sender], self.vector_attribute)
+            vectors.append({} if serialized is None else json.loads(serialized))
+        return vectors
 
+    def additional_data(self) -> Dict[str, Any]:
+        """Get the data to save along with the aggregated vector."""
+        return {}
 
-class FinishedDecisionMakingRound(AbstractRound):
-    """FinishedDecisionMakingRound"""
-
-    payload_class = FinishedDecisionMakingPayload
-    payload_attribute = ""  # TODO: update
-    synchronized_data_class = SynchronizedData
-
-    # TODO: replace AbstractRound with one of CollectDifferentUntilAllRound,
-    # CollectSameUntilAllRound, CollectSameUntilThresholdRound,
-    # CollectDifferentUntilThresholdRound, OnlyKeeperSendsRound, VotingRound,
-    # from packages/valory/skills/abstract_round_abci/base.py
-    # or implement the methods
+    def get_event(self, aggregated: Dict[str, float]) -> Enum:
+        """Get the event to emit for an aggregated vector."""
+        return self.done_event
 
     def end_block(self) -> Optional[Tuple[BaseSynchronizedData, Enum]]:
         """Process the end of the block."""
-        raise NotImplementedError
-
-    def check_payload(self, payload: FinishedDecisionMakingPayload) -> None:
-        """Check payload."""
-        raise NotImplementedError
-
-    def process_payload(self, payload: FinishedDecisionMakingPayload) -> None:
-        """Process payload."""
-        raise NotImplementedError
-
+        if self.collection_threshold_reached:
+            self.block_confirmations += 1
+        if not (
+            self.collection_threshold_reached
+            and self.block_confirmations > self.required_block_confirmations
+        ):
+            return None
+
+        params = self.context.params
+        senders = sorted(self.collection)
+        aggregated, mask = median_aggregate(
+            self.get_vectors(),
+            params.aggregation_mad_threshold,
+            params.aggregation_tolerance,
+        )
+        outliers = [sender for sender, row in zip(senders, mask) if row.any()]
+        if outliers:
+            self.context.logger.warning(
+                f"Ignoring outlying values of {self.vector_attribute} from {outliers}."
+            )
+        if not aggregated:
+            synchronized_data = self.synchronized_data.update(
+                synchronized_data_class=self.synchronized_data_class,
+                **self.additional_data(),
+            )
+            return synchronized_data, self.none_event
+
+        synchronized_data = self.synchronized_data.update(
+            synchronized_data_class=self.synchronized_data_class,
+            **{
+                self.collection_key: self.serialized_collection,
+                self.selection_key: json.dumps(aggregated, sort_keys=True),
+                **self.additional_data(),
+            },
+        )
+        return synchronized_data, self.get_event(aggregated)
+
+
+class DecisionMakingRound(CollectSameUntilThresholdRound):
+    """DecisionMakingRound"""
 
-class MarketDataCollectionRound(AbstractRound):
+    payload_class = DecisionMakingPayload
+    synchronized_data_class = SynchronizedData
+    done_event = Event.DONE
+    no_majority_event = Event.NO_MAJORITY
+    none_event = Event.DONE
+    collection_key = get_name(SynchronizedData.participant_to_mech_deliveries)
+    selection_key = get_name(SynchronizedData.mech_deliveries)
+    payload_attribute = "deliveries"
+
+    def end_block(  # pylint: disable=too-many-locals
+        self,
+    ) -> Optional[Tuple[BaseSynchronizedData, Enum]]:
+        """
+        Swap the pairs whose signal the mech results of the period confirm.
+
+        The results of the period are the cached ones, the ones the responses of the
+        batch came with, and the agreed deliveries of the outstanding requests, which
+        may have been sent in an earlier period. The requests of the batch still waiting
+        for their result are added to the outstanding ones, and the ones older than the
+        mech cache are dropped. The results that were not cached are added to the cache,
+        keyed by the pair and the score they were asked for. The confirmed pairs are
+        ranked by their scores.
+
+        :return: the synchronized data and the event, or None if the round is not done.
+        """
+        result = super().end_block()
+        if result is None:
+            return None
+        synchronized_data, event = result
+        if event != self.done_event:
+            return result
+        synchronized_data = cast(SynchronizedData, synchronized_data)
+        params = self.context.params
+        mech_cache = self.context.mech_cache
+        period = synchronized_data.period_count
+        scores = synchronized_data.strategy_scores
+        requests = synchronized_data.mech_requests
+        request_pairs = synchronized_data.mech_request_pairs
+        answered = demultiplex_responses(
+            request_pairs, synchronized_data.mech_responses
+        )
+        results = {**synchronized_data.mech_cached_results, **answered}
+        fresh = {}
+        for request in requests:
+            pair = request_pairs.get(request["nonce"])
+            if pair in answered and pair in scores:
+                key = mech_cache.key(pair, scores[pair], request["tool"])
+                fresh[key] = answered[pair]
+        outstanding = {
+            **pending_requests(
+                synchronized_data.mech_responses,
+                requests,
+                request_pairs,
+                scores,
+                synchronized_data.market_data_block,
+                period,
+            ),
+            **synchronized_data.mech_outstanding,
+        }
+        deliveries = synchronized_data.mech_deliveries
+        for request_id in sorted(set(deliveries) & set(outstanding)):
+            request = outstanding.pop(request_id)
+            key = mech_cache.key(request["pair"], request["score"], request["tool"])
+            fresh[key] = results[request["pair"]] = deliveries[request_id]
+        outstanding = {
+            request_id: request
+            for request_id, request in outstanding.items()
+            if period - request["period"] < mech_cache.ttl_periods
+        }
+        cache = mech_cache.put(synchronized_data.mech_cache, fresh, period)
+        confirmed = {
+            pair: scores[pair]
+            for pair, pair_result in results.items()
+            if pair in scores
+            and mech_confirms(
+                pair_result, scores[pair], params.mech_confirmation_threshold
+            )
+        }
+        swap_candidates = rank_candidates(confirmed, 0.0, params.max_swaps_per_period)
+        synchronized_data = synchronized_data.update(
+            synchronized_data_class=self.synchronized_data_class,
+            **{
+                get_name(SynchronizedData.mech_results): json.dumps(
+                    results, sort_keys=True
+                ),
+                get_name(SynchronizedData.mech_outstanding): json.dumps(
+                    outstanding, sort_keys=True
+                ),
+                get_name(SynchronizedData.swap_candidates): json.dumps(swap_candidates),
+                get_name(SynchronizedData.mech_cache): json.dumps(
+                    cache, sort_keys=True
+                ),
+            },
+        )
+        return synchronized_data, Event.SWAP if swap_candidates else self.done_event
+
+
+class MarketDataCollectionRound(MedianAggregationRound):
     """MarketDataCollectionRound"""
 
     payload_class = MarketDataCollectionPayload
-    payload_attribute = ""  # TODO: update
     synchronized_data_class = SynchronizedData
-
-    # TODO: replace AbstractRound with one of CollectDifferentUntilAllRound,
-    # CollectSameUntilAllRound, CollectSameUntilThresholdRound,
-    # CollectDifferentUntilThresholdRound, OnlyKeeperSendsRound, VotingRound,
-    # from packages/valory/skills/abstract_round_abci/base.py
-    # or implement the methods
-
-    def end_block(self) -> Optional[Tuple[BaseSynchronizedData, Enum]]:
-        """Process the end of the block."""
-        raise NotImplementedError
-
-    def check_payload(self, payload: MarketDataCollectionPayload) -> None:
-        """Check payload."""
-        raise NotImplementedError
-
-    def process_payload(self, payload: MarketDataCollectionPayload) -> None:
-        """Process payload."""
-        raise NotImplementedError
-
-
-class MechRequestPreparationRound(AbstractRound):
+    done_event = Event.DONE
+    none_event = Event.NO_MAJORITY
+    collection_key = get_name(SynchronizedData.participant_to_market_data)
+    selection_key = get_name(SynchronizedData.market_prices)
+    vector_attribute = "prices"
+
+    def additional_data(self) -> Dict[str, Any]:
+        """
+        Select the snapshot sent by most agents, and carry the persisted keys over.
+
+        The snapshots are counted by digest, whether they were sent inline or through
+        IPFS. Ties between digests go to the lowest digest. Of the payloads with the
+        selected digest, the one sent through IPFS with the lowest hash is kept, or the
+        inline one if none was. The selection therefore does not depend on the order
+        the payloads arrived in, and every agent selects the same snapshot.
+
+        The block of the selected snapshot becomes the cursor of the pool event indexer;
+        the previous cursor is carried over if no snapshot was sent. The other keys
+        persisted across periods are carried over too, so that they are in the data of
+        every period.
+
+        :return: the selected snapshot and the keys persisted across periods.
+        """
+        db = self.synchronized_data.db
+        persisted = {
+            key: db.get(key, None)
+            for key in sorted(CeloSwapperAbciApp.cross_period_persisted_keys)
+        }
+        payloads = [
+            payload
+            for payload in cast(
+                Dict[str, MarketDataCollectionPayload], self.collection
+            ).values()
+            if payload.digest is not None
+        ]
+        if not payloads:
+            return persisted
+        votes = Counter(payload.digest for payload in payloads)
+        digest = min(votes, key=lambda digest: (-votes[digest], digest))
+        selected = min(
+            (payload for payload in payloads if payload.digest == digest),
+            key=lambda payload: (
+                payload.ipfs_hash is None,
+                payload.ipfs_hash or "",
+                payload.content or "",
+            ),
+        )
+        if selected.block_number is not None:
+            persisted[get_name(SynchronizedData.indexed_block)] = selected.block_number
+        return {
+            get_name(SynchronizedData.market_data): selected.content,
+            get_name(SynchronizedData.market_data_block): selected.block_number,
+            get_name(SynchronizedData.market_data_digest): digest,
+            get_name(SynchronizedData.market_data_ipfs_hash): selected.ipfs_hash,
+            **persisted,
+        }
+
+
+class MechRequestPreparationRound(CollectSameUntilThresholdRound):
     """MechRequestPreparationRound"""
 
     payload_class = MechRequestPreparationPayload
-    payload_attribute = ""  # TODO: update
     synchronized_data_class = SynchronizedData
-
-    # TODO: replace AbstractRound with one of CollectDifferentUntilAllRound,
-    # CollectSameUntilAllRound, CollectSameUntilThresholdRound,
-    # CollectDifferentUntilThresholdRound, OnlyKeeperSendsRound, VotingRound,
-    # from packages/valory/skills/abstract_round_abci/base.py
-    # or implement the methods
+    done_event = Event.DONE
+    no_majority_event = Event.NO_MAJORITY
+    none_event = Event.DONE
+    collection_key = get_name(SynchronizedData.participant_to_mech_requests)
+    selection_key = (
+        get_name(SynchronizedData.mech_requests),
+        get_name(SynchronizedData.mech_request_pairs),
+        get_name(SynchronizedData.mech_cached_results),
+        get_name(SynchronizedData.mech_request_hashes),
+    )
 
     def end_block(self) -> Optional[Tuple[BaseSynchronizedData, Enum]]:
-        """Process the end of the block."""
-        raise NotImplementedError
-
-    def check_payload(self, payload: MechRequestPreparationPayload) -> None:
-        """Check payload."""
-        raise NotImplementedError
-
-    def process_payload(self, payload: MechRequestPreparationPayload) -> None:
-        """Process payload."""
-        raise NotImplementedError
-
-
-class StrategyEvaluationRound(AbstractRound):
+        """
+        Skip to the decision if there is nothing to send, but something to decide on.
+
+        That is when every prompt of the batch was answered from cache, or is waiting
+        for the result of a request sent in an earlier period.
+
+        :return: the synchronized data and the event, or None if the round is not done.
+        """
+        result = super().end_block()
+        if result is None:
+            return None
+        synchronized_data, event = result
+        synchronized_data = cast(SynchronizedData, synchronized_data)
+        if (
+            event == self.done_event
+            and not synchronized_data.mech_requests
+            and (
+                synchronized_data.mech_cached_results
+                or synchronized_data.mech_outstanding
+            )
+        ):
+            return synchronized_data, Event.CACHED
+        return result
+
+
+class StrategyEvaluationRound(MedianAggregationRound):
     """StrategyEvaluationRound"""
 
     payload_class = StrategyEvaluationPayload
-    payload_attribute = ""  # TODO: update
     synchronized_data_class = SynchronizedData
-
-    # TODO: replace AbstractRound with one of CollectDifferentUntilAllRound,
-    # CollectSameUntilAllRound, CollectSameUntilThresholdRound,
-    # CollectDifferentUntilThresholdRound, OnlyKeeperSendsRound, VotingRound,
-    # from packages/valory/skills/abstract_round_abci/base.py
-    # or implement the methods
+    done_event = Event.DONE
+    none_event = Event.NO_MAJORITY
+    collection_key = get_name(SynchronizedData.participant_to_strategy_scores)
+    selection_key = get_name(SynchronizedData.strategy_scores)
+    vector_attribute = "scores"
 
     def end_block(self) -> Optional[Tuple[BaseSynchronizedData, Enum]]:
-        """Process the end of the block."""
-        raise NotImplementedError
-
-    def check_payload(self, payload: StrategyEvaluationPayload) -> None:
-        """Check payload."""
-        raise NotImplementedError
-
-    def process_payload(self, payload: StrategyEvaluationPayload) -> None:
-        """Process payload."""
-        raise NotImplementedError
-
-
-class SwapPreparationRound(AbstractRound):
+        """
+        Rank the swap candidates, and keep what the next evaluations build on.
+
+        The candidates are ranked from the aggregated scores, so that they agree with
+        the event. The median duration sent by the agents is folded into the agreed
+        latency, which decides whether the next evaluation is degraded, and the pairs
+        with the strongest scores are kept for a degraded evaluation to score.
+
+        :return: the synchronized data and the event, or None if the round is not done.
+        """
+        result = super().end_block()
+        if result is None:
+            return None
+        synchronized_data, event = result
+        synchronized_data = cast(SynchronizedData, synchronized_data)
+        params = self.context.params
+        latency_budget = self.context.latency_budget
+        latency = synchronized_data.strategy_latency
+        degraded = latency_budget.is_exceeded(latency, params.round_timeout_seconds)
+        durations = [
+            payload.duration
+            for payload in cast(
+                Dict[str, StrategyEvaluationPayload], self.collection
+            ).values()
+            if payload.duration is not None
+        ]
+        duration = float(np.median(durations)) if durations else None
+        latency = latency_budget.record(latency, duration, degraded)
+        scores = json.loads(synchronized_data.db.get("strategy_scores", None) or "{}")
+        swap_candidates = rank_candidates(
+            scores, params.swap_signal_threshold, params.max_swaps_per_period
+        )
+        strongest_pairs = (
+            rank_candidates(scores, 0.0, params.max_swaps_per_period)
+            if scores
+            else synchronized_data.strongest_pairs
+        )
+        synchronized_data = synchronized_data.update(
+            synchronized_data_class=self.synchronized_data_class,
+            **{
+                get_name(SynchronizedData.swap_candidates): json.dumps(swap_candidates),
+                get_name(SynchronizedData.strategy_latency): json.dumps(latency),
+                get_name(SynchronizedData.strongest_pairs): json.dumps(strongest_pairs),
+            },
+        )
+        return synchronized_data, event
+
+    def get_event(self, aggregated: Dict[str, float]) -> Enum:
+        """Swap on a strong signal, ask the mech on a weak one, and do nothing otherwise."""
+        params = self.context.params
+        strongest = max(abs(score) for score in aggregated.values())
+        if strongest >= params.swap_signal_threshold:
+            return Event.SWAP
+        if strongest >= params.mech_signal_threshold:
+            return Event.MECH
+        return Event.DONE
+
+
+class SwapPreparationRound(CollectSameUntilThresholdRound):
     """SwapPreparationRound"""
 
     payload_class = SwapPreparationPayload
-    payload_attribute = ""  # TODO: update
     synchronized_data_class = SynchronizedData
+    done_event = Event.DONE
+    no_majority_event = Event.NO_MAJORITY
+    none_event = Event.DONE
+    collection_key = get_name(SynchronizedData.participant_to_swap_orders)
+    selection_key = get_name(SynchronizedData.swap_orders)
+    payload_attribute = "orders"
 
-    # TODO: replace AbstractRound with one of CollectDifferentUntilAllRound,
-    # CollectSameUntilAllRound, CollectSameUntilThresholdRound,
-    # CollectDifferentUntilThresholdRound, OnlyKeeperSendsRound, VotingRound,
-    # from packages/valory/skills/abstract_round_abci/base.py
-    # or implement the methods
-
-    def end_block(self) -> Optional[Tuple[BaseSynchronizedData, Enum]]:
-        """Process the end of the block."""
-        raise NotImplementedError
-
-    def check_payload(self, payload: SwapPreparationPayload) -> None:
-        """Check payload."""
-        raise NotImplementedError
 
-    def process_payload(self, payload: SwapPreparationPayload) -> None:
-        """Process payload."""
-        raise NotImplementedError
+class FinishedDecisionMakingRound(DegenerateRound):
+    """FinishedDecisionMakingRound"""
 
 
 class FinishedMechRequestPreparationRound(DegenerateRound):
@@ -230,7 +585,47 @@ class FinishedSwapPreparationRound(DegenerateRound):
 
 
 class CeloSwapperAbciApp(AbciApp[Event]):
-    """CeloSwapperAbciApp"""
+    """CeloSwapperAbciApp
+
+    Initial round: MarketDataCollectionRound
+
+    Initial states: {DecisionMakingRound, MarketDataCollectionRound, StrategyEvaluationRound}
+
+    Transition states:
+        0. MarketDataCollectionRound
+            - done: 1.
+            - no majority: 0.
+            - round timeout: 0.
+        1. StrategyEvaluationRound
+            - done: 8.
+            - mech: 2.
+            - swap: 3.
+            - no majority: 1.
+            - round timeout: 1.
+        2. MechRequestPreparationRound
+            - done: 7.
+            - cached: 4.
+            - no majority: 2.
+            - round timeout: 2.
+        3. SwapPreparationRound
+            - done: 6.
+            - no majority: 3.
+            - round timeout: 3.
+        4. DecisionMakingRound
+            - done: 5.
+            - swap: 3.
+            - no majority: 4.
+            - round timeout: 4.
+        5. FinishedDecisionMakingRound
+        6. FinishedSwapPreparationRound
+        7. FinishedMechRequestPreparationRound
+        8. FinishedStrategyEvaluationRound
+
+    Final states: {FinishedDecisionMakingRound, FinishedMechRequestPreparationRound, FinishedStrategyEvaluationRound, FinishedSwapPreparationRound}
+
+    Timeouts:
+
+    """
 
     initial_round_cls: AppState = MarketDataCollectionRound
     initial_states: Set[AppState] = {DecisionMakingRound, MarketDataCollectionRound, StrategyEvaluationRound}
@@ -249,6 +644,7 @@ class CeloSwapperAbciApp(AbciApp[Event]):
         },
         MechRequestPreparationRound: {
             Event.DONE: FinishedMechRequestPreparationRound,
+            Event.CACHED: DecisionMakingRound,
             Event.NO_MAJORITY: MechRequestPreparationRound,
             Event.ROUND_TIMEOUT: MechRequestPreparationRound
         },
@@ -258,8 +654,8 @@ class CeloSwapperAbciApp(AbciApp[Event]):
             Event.ROUND_TIMEOUT: SwapPreparationRound
         },
         DecisionMakingRound: {
-            Event.MECH: FinishedDecisionMakingRound,
-            Event.STRATEGY: StrategyEvaluationRound,
+            Event.DONE: FinishedDecisionMakingRound,
+            Event.SWAP: SwapPreparationRound,
             Event.NO_MAJORITY: DecisionMakingRound,
             Event.ROUND_TIMEOUT: DecisionMakingRound
         },
@@ -268,16 +664,25 @@ class CeloSwapperAbciApp(AbciApp[Event]):
         FinishedMechRequestPreparationRound: {},
         FinishedStrategyEvaluationRound: {}
     }
-    final_states: Set[AppState] = {FinishedStrategyEvaluationRound, FinishedMechRequestPreparationRound, FinishedSwapPreparationRound}
+    final_states: Set[AppState] = {FinishedStrategyEvaluationRound, FinishedMechRequestPreparationRound, FinishedSwapPreparationRound, FinishedDecisionMakingRound}
     event_to_timeout: EventToTimeout = {}
-    cross_period_persisted_keys: FrozenSet[str] = frozenset()
+    cross_period_persisted_keys: FrozenSet[str] = frozenset(
+        {
+            get_name(SynchronizedData.indexed_block),
+            get_name(SynchronizedData.mech_cache),
+            get_name(SynchronizedData.mech_outstanding),
+            get_name(SynchronizedData.strategy_latency),
+            get_name(SynchronizedData.strongest_pairs),
+        }
+    )
     db_pre_conditions: Dict[AppState, Set[str]] = {
         DecisionMakingRound: [],
-    	MarketDataCollectionRound: [],
-    	StrategyEvaluationRound: [],
+        MarketDataCollectionRound: [],
+        StrategyEvaluationRound: [],
     }
     db_post_conditions: Dict[AppState, Set[str]] = {
         FinishedStrategyEvaluationRound: [],
-    	FinishedMechRequestPreparationRound: [],
-    	FinishedSwapPreparationRound: [],
+        FinishedMechRequestPreparationRound: [],
+        FinishedSwapPreparationRound: [],
+        FinishedDecisionMakingRound: [],
     }
@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""
+This module contains the swap router of the CeloSwapperAbciApp.
+
+The configured pools are kept as a token graph, in an adjacency index that is only
+touched for the pools that changed since it was last updated. Routes are searched hop
+by hop over the index, quoting every edge against the pool states of the period.
+Large orders are split across routes that share no pool, by comparing their price
+impact curves on a grid of amounts.
+"""
+
+from dataclasses import dataclass
+from typing import AbstractSet, Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from packages.celo.skills.celo_swapper.market_data import (
+    quote_amount_out,
+    quote_curve,
+)
+
+
+PairConfig = Dict[str, str]
+
+
+@dataclass(frozen=True)
+class Hop:
+    """A swap through one pool, in one direction."""
+
+    pair: str
+    pool: str
+    pool_type: str
+    token_in: str
+    token_out: str
+    zero_for_one: bool
+
+
+@dataclass(frozen=True)
+class Route:
+    """A path of hops, with the amount going in and out of every hop."""
+
+    hops: Tuple[Hop, ...]
+    amounts: Tuple[int, ...]
+
+    @property
+    def amount_in(self) -> int:
+        """Get the amount swapped in the first hop."""
+        return self.amounts[0]
+
+    @property
+    def amount_out(self) -> int:
+        """Get the amount swapped out of the last hop."""
+        return self.amounts[-1]
+
+    def to_json(self) -> List[Dict[str, Any]]:
+        """Get the hops of the route as JSON, with the amount out of every hop."""
+        return [
+            dict(
+                pair=hop.pair,
+                pool=hop.pool,
+                pool_type=hop.pool_type,
+                zero_for_one=hop.zero_for_one,
+                amount_out=amount_out,
+            )
+            for hop, amount_out in zip(self.hops, self.amounts[1:])
+        ]
+
+
+def pair_tokens(pair: PairConfig) -> Tuple[str, str]:
+    """
+    Get the tokens of a pair.
+
+    :param pair: the configuration of the pair, with its `token0` and `token1`, or a
+        name made of them, e.g. `CELO-cUSD`.
+    :return: token0 and token1.
+    """
+    if "token0" in pair and "token1" in pair:
+        return pair["token0"], pair["token1"]
+    token0, token1 = pair["name"].split("-", 1)
+    return token0, token1
+
+
+def pair_hops(pair: PairConfig) -> Tuple[Hop, Hop]:
+    """Get the hops of a pair, token0 for token1 first."""
+    token0, token1 = pair_tokens(pair)
+    return tuple(  # type: ignore
+        Hop(
+            pair=pair["name"],
+            pool=pair["pool"],
+            pool_type=pair["pool_type"],
+            token_in=token_in,
+            token_out=token_out,
+            zero_for_one=zero_for_one,
+        )
+        for token_in, token_out, zero_for_one in (
+            (token0, token1, True),
+            (token1, token0, False),
+        )
+    )
+
+
+def quote_route(
+    hops: Sequence[Hop], amount_in: int, states: Dict[str, Any], fee_bps: int
+) -> Optional[Route]:
+    """
+    Quote an amount through some hops, in integers.
+
+    :param hops: the hops of the route.
+    :param amount_in: the amount swapped in the first hop.
+    :param states: the state of every pair, by name.
+    :param fee_bps: the fee of every pool, in basis points.
+    :return: the route, or None if one of its hops could not be quoted.
+    """
+    amounts = [amount_in]
+    for hop in hops:
+        state = states.get(hop.pair)
+        amount_out = (
+            None
+            if state is None
+            else quote_amount_out(state, amounts[-1], hop.zero_for_one, fee_bps)
+        )
+        if not amount_out:
+            return None
+        amounts.append(amount_out)
+    return Route(hops=tuple(hops), amounts=tuple(amounts))
+
+
+def route_curve(
+    hops: Sequence[Hop],
+    amounts_in: np.ndarray,
+    states: Dict[str, Any],
+    fee_bps: int,
+) -> Optional[np.ndarray]:
+    """
+    Quote many amounts through some hops at once, in floats.
+
+    :param hops: the hops of the route.
+    :param amounts_in: the amounts swapped in the first hop.
+    :param states: the state of every pair, by name.
+    :param fee_bps: the fee of every pool, in basis points.
+    :return: the amounts swapped out of the last hop, or None if a hop has no quote.
+    """
+    amounts: Optional[np.ndarray] = amounts_in
+    for hop in hops:
+        state = states.get(hop.pair)
+        if state is None or amounts is None:
+            return None
+        amounts = quote_curve(state, amounts, hop.zero_for_one, fee_bps)
+    return amounts
+
+
+def allocate(curves: np.ndarray) -> np.ndarray:
+    """
+    Allocate the steps of a grid of amounts to the routes that swap the most out.
+
+    Every step goes to the route with the largest marginal output for its next step.
+    As price impact makes every curve concave, this maximizes the total output on the
+    grid. Ties go to the first route.
+
+    :param curves: the output of every route for 0 to `steps` steps, by row.
+    :return: the number of steps allocated to every route.
+    """
+    n_routes, n_points = curves.shape
+    gains = np.hstack([np.diff(curves, axis=1), np.full((n_routes, 1), -np.inf)])
+    rows = np.arange(n_routes)
+    counts = np.zeros(n_routes, dtype=int)
+    for _ in range(n_points - 1):
+        counts[np.argmax(gains[rows, counts])] += 1
+    return counts
+
+
+def better(route: Route, other: Optional[Route]) -> bool:
+    """
+    Check whether a route is better than another one.
+
+    More out is better, then fewer hops, then the first pair names in order, so that
+    every agent picks the same route among equally good ones.
+    """
+    if other is None:
+        return True
+    return (
+        -route.amount_out,
+        len(route.hops),
+        [hop.pair for hop in route.hops],
+    ) < (
+        -other.amount_out,
+        len(other.hops),
+        [hop.pair for hop in other.hops],
+    )
+
+
+class RouteIndex:
+    """
+    Keep the configured pools as a token graph, to route swaps over it.
+
+    The index maps every token to the hops swapping it out, in the order of their pairs.
+    Updating it with the configured pairs only adds and removes the hops of the pairs
+    that were added, removed or changed since the last update.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty index."""
+        self.pairs: Dict[str, PairConfig] = {}
+        self.adjacency: Dict[str, List[Hop]] = {}
+
+    def update(self, pairs: List[PairConfig]) -> int:
+        """
+        Update the index with the configured pairs.
+
+        :param pairs: the configured pairs.
+        :return: the number of pairs that were added, removed or changed.
+        """
+        configured = {pair["name"]: pair for pair in pairs}
+        indexed = self.pairs
+        stale = [name for name in indexed if indexed[name] != configured.get(name)]
+        fresh = [name for name in configured if configured[name] != indexed.get(name)]
+        for name in stale:
+            for hop in pair_hops(self.pairs.pop(name)):
+                hops = self.adjacency[hop.token_in]
+                hops.remove(hop)
+                if not hops:
+                    del self.adjacency[hop.token_in]
+        for name in fresh:
+            pair = self.pairs[name] = dict(configured[name])
+            for hop in pair_hops(pair):
+                hops = self.adjacency.setdefault(hop.token_in, [])
+                hops.append(hop)
+                hops.sort(key=lambda other: other.pair)
+        return len(set(stale) | set(fresh))
+
+    def best_route(  # pylint: disable=too-many-arguments
+        self,
+        token_in: str,
+        token_out: str,
+        amount_in: int,
+        states: Dict[str, Any],
+        max_hops: int,
+        fee_bps: int,
+        exclude: AbstractSet[str] = frozenset(),
+    ) -> Optional[Route]:
+        """
+        Find the route that swaps the most out for an amount in, in up to `max_hops`.
+
+        The best route to every token is extended one hop at a time, without going
+        through a token twice. Hops through excluded pairs, pairs without a state, or
+        that quote nothing, are skipped.
+
+        :param token_in: the token swapped in.
+        :param token_out: the token swapped out.
+        :param amount_in: the amount swapped in, in raw token units.
+        :param states: the state of every pair, by name.
+        :param max_hops: the maximum number of hops of the route.
+        :param fee_bps: the fee of every pool, in basis points.
+        :param exclude: the names of the pairs not to route through.
+        :return: the best route, or None if the tokens are not connected.
+        """
+        frontier: Dict[str, Route] = {token_in: Route(hops=(), amounts=(amount_in,))}
+        best: Optional[Route] = None
+        for _ in range(max_hops):
+            reached: Dict[str, Route] = {}
+            for token in sorted(frontier):
+                route = frontier[token]
+                visited = {token} | {hop.token_in for hop in route.hops}
+                for hop in self.adjacency.get(token, []):
+                    state = states.get(hop.pair)
+                    if state is None or hop.token_out in visited or hop.pair in exclude:
+                        continue
+                    amount_out = quote_amount_out(
+                        state, route.amount_out, hop.zero_for_one, fee_bps
+                    )
+                    if not amount_out:
+                        continue
+                    extended = Route(
+                        hops=route.hops + (hop,),
+                        amounts=route.amounts + (amount_out,),
+                    )
+                    if better(extended, reached.get(hop.token_out)):
+                        reached[hop.token_out] = extended
+            arrived = reached.pop(token_out, None)
+            if arrived is not None and better(arrived, best):
+                best = arrived
+            if not reached:
+                break
+            frontier = reached
+        return best
+
+    def split_order(  # pylint: disable=too-many-arguments,too-many-locals
+        self,
+        token_in: str,
+        token_out: str,
+        amount_in: int,
+        states: Dict[str, Any],
+        max_hops: int,
+        fee_bps: int,
+        max_routes: int,
+        steps: int,
+    ) -> List[Route]:
+        """
+        Split an order across up to `max_routes` routes, to limit its price impact.
+
+        The routes are the best ones for the whole amount that share no pool with the
+        ones found before them, so that their outputs do not depend on each other. The
+        amount is split in `steps` steps between them on their price impact curves,
+        and every leg is quoted again in integers. The split is only kept if it swaps
+        more out than the best route alone.
+
+        :param token_in: the token swapped in.
+        :param token_out: the token swapped out.
+        :param amount_in: the amount swapped in, in raw token units.
+        :param states: the state of every pair, by name.
+        :param max_hops: the maximum number of hops of every route.
+        :param fee_bps: the fee of every pool, in basis points.
+        :param max_routes: the maximum number of routes to split the order across.
+        :param steps: the number of steps to split the amount in.
+        :return: the routes of the legs of the order, or none if no route was found.
+        """
+        routes: List[Route] = []
+        used: Set[str] = set()
+        while len(routes) < max_routes:
+            route = self.best_route(
+                token_in, token_out, amount_in, states, max_hops, fee_bps, used
+            )
+            if route is None:
+                break
+            routes.append(route)
+            used.update(hop.pair for hop in route.hops)
+        if len(routes) < 2 or steps < 2:
+            return routes[:1]
+
+        grid = amount_in * np.arange(steps + 1, dtype=float) / steps
+        curves = [route_curve(route.hops, grid, states, fee_bps) for route in routes]
+        if any(curve is None for curve in curves):
+            return routes[:1]
+        counts = allocate(np.vstack(curves))
+        amounts = [amount_in * int(count) // steps for count in counts]
+        amounts[int(np.argmax(counts))] += amount_in - sum(amounts)
+
+        legs = []
+        for route, amount in zip(routes, amounts):
+            if amount == 0:
+                continue
+            leg = quote_route(route.hops, amount, states, fee_bps)
+            if leg is None:
+                return routes[:1]
+            legs.append(leg)
+        if sum(leg.amount_out for leg in legs) <= routes[0].amount_out:
+            return routes[:1]
+        return legs
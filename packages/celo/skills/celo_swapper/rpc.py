@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""
+This module contains the sources of logs and blocks of the CeloSwapperAbciApp tools.
+
+The command line tools read logs and block timestamps from a JSON-RPC endpoint, or from
+a recorded fixture. Long block ranges are split into chunks, by the tools and by the
+watcher of the mech deliveries alike.
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Tuple, Union
+
+import numpy as np
+import requests
+
+
+class RpcError(Exception):
+    """An error returned by a JSON-RPC endpoint."""
+
+
+class RpcSource:
+    """
+    Fetch logs and block timestamps from a JSON-RPC endpoint.
+
+    The source is shared by the worker threads of the backfill, and a `requests.Session`
+    is not thread-safe, so every thread keeps its own session to the endpoint.
+    """
+
+    def __init__(self, url: str, timeout: float = 30.0) -> None:
+        """Initialize the source."""
+        self.url = url
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        """Get the session of the current thread, opening it on first use."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def call(self, method: str, params: List[Any]) -> Any:
+        """Make a JSON-RPC call."""
+        response = self.session.post(
+            self.url,
+            json=dict(jsonrpc="2.0", id=1, method=method, params=params),
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        body = response.json()
+        if "error" in body:
+            raise RpcError(f"{method} failed: {body['error']}")
+        return body["result"]
+
+    def get_block_number(self) -> int:
+        """Get the latest block."""
+        return int(self.call("eth_blockNumber", []), 16)
+
+    def get_block_timestamp(self, block_number: int) -> int:
+        """Get the timestamp of a block."""
+        block = self.call("eth_getBlockByNumber", [hex(block_number), False])
+        return int(block["timestamp"], 16)
+
+    def get_logs(
+        self, address: str, topics: List[str], from_block: int, to_block: int
+    ) -> List[Dict[str, Any]]:
+        """Get the logs of a contract, matching any of the topics, in a block range."""
+        return self.call(
+            "eth_getLogs",
+            [
+                dict(
+                    address=address,
+                    topics=[topics],
+                    fromBlock=hex(from_block),
+                    toBlock=hex(to_block),
+                )
+            ],
+        )
+
+
+class FixtureSource:
+    """
+    Serve logs and block timestamps from a recorded fixture.
+
+    The fixture is a JSON file with the recorded `logs`, as returned by `eth_getLogs`,
+    and the `timestamps` of some blocks, by block number. The timestamps of the other
+    blocks are interpolated.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        """Load the fixture."""
+        fixture = json.loads(Path(path).read_text())
+        self.logs: List[Dict[str, Any]] = fixture["logs"]
+        timestamps = sorted(
+            (int(block), int(timestamp))
+            for block, timestamp in fixture["timestamps"].items()
+        )
+        self._blocks = np.array([block for block, _ in timestamps])
+        self._timestamps = np.array([timestamp for _, timestamp in timestamps])
+
+    def get_block_number(self) -> int:
+        """Get the latest recorded block."""
+        return int(self._blocks[-1])
+
+    def get_block_timestamp(self, block_number: int) -> int:
+        """Get the timestamp of a block."""
+        return int(np.interp(block_number, self._blocks, self._timestamps))
+
+    def get_logs(
+        self, address: str, topics: List[str], from_block: int, to_block: int
+    ) -> List[Dict[str, Any]]:
+        """Get the recorded logs of a contract, matching any of the topics, by block."""
+        return [
+            log
+            for log in self.logs
+            if log["address"].lower() == address.lower()
+            and log["topics"][0].lower() in topics
+            and from_block <= int(log["blockNumber"], 16) <= to_block
+        ]
+
+
+Source = Union[RpcSource, FixtureSource]
+Chunk = Tuple[int, int]
+
+
+def split_range(from_block: int, to_block: int, chunk_size: int) -> List[Chunk]:
+    """Split an inclusive block range into chunks of at most `chunk_size` blocks."""
+    return [
+        (start, min(start + chunk_size - 1, to_block))
+        for start in range(from_block, to_block + 1, chunk_size)
+    ]
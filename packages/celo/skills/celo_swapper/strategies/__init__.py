@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""
+This package contains the strategies of the CeloSwapperAbciApp.
+
+Strategies register by name with the dotted path of their entry point, and their module
+is only imported the first time they are selected, so that the dependencies of the
+strategies that are not configured are never loaded.
+
+A strategy is a callable that gets the features of every pair, as a pairs × features
+`FeatureMatrix` of their current price and indicators, and the `strategy_*` params of
+the skill. It scores every pair at once, column by column, and returns a score in
+[-1, 1] for every pair it scores. Strategies are run through `run_strategies`, which
+only takes picklable arguments, so that they can run in a worker process.
+"""
+
+import importlib
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+
+Indicators = Mapping[str, Mapping[str, Optional[float]]]
+PRICE_FEATURE = "price"
+
+
+@dataclass(frozen=True)
+class FeatureMatrix:
+    """The features of every pair, one row per pair and one column per feature."""
+
+    pairs: Tuple[str, ...]
+    features: Tuple[str, ...]
+    values: np.ndarray
+
+    @classmethod
+    def build(
+        cls, prices: Mapping[str, float], indicators: Indicators
+    ) -> "FeatureMatrix":
+        """
+        Build the matrix of the pairs that have a price.
+
+        :param prices: the current price of every pair.
+        :param indicators: the indicators of every pair.
+        :return: the matrix, with the pairs and the indicators in order, the price
+            first, and NaN for the missing values.
+        """
+        pairs = tuple(sorted(prices))
+        names = {name for pair in pairs for name in indicators.get(pair, {})}
+        features = (PRICE_FEATURE, *sorted(names - {PRICE_FEATURE}))
+        values = np.full((len(pairs), len(features)), np.nan)
+        for row, pair in enumerate(pairs):
+            pair_features = dict(indicators.get(pair, {}), price=prices[pair])
+            for column, feature in enumerate(features):
+                value = pair_features.get(feature)
+                if value is not None:
+                    values[row, column] = value
+        return cls(pairs=pairs, features=features, values=values)
+
+    def column(self, feature: str) -> np.ndarray:
+        """Get a feature of every pair, all NaN if no pair has it."""
+        if feature not in self.features:
+            return np.full(len(self.pairs), np.nan)
+        return self.values[:, self.features.index(feature)]
+
+
+Strategy = Callable[[FeatureMatrix, Any], Dict[str, float]]
+
+_registry: Dict[str, str] = {}
+_loaded: Dict[str, Strategy] = {}
+
+
+def register(name: str, entry_point: str) -> None:
+    """
+    Register a strategy without importing it.
+
+    :param name: the name the strategy is selected by.
+    :param entry_point: the path of the strategy, as `package.module:callable`.
+    """
+    if name in _registry and _registry[name] != entry_point:
+        raise ValueError(f"Strategy {name!r} is already registered.")
+    _registry[name] = entry_point
+
+
+def available_strategies() -> List[str]:
+    """Get the names of the registered strategies."""
+    return sorted(_registry)
+
+
+def load_strategy(name: str) -> Strategy:
+    """
+    Get a strategy, importing its module on first use.
+
+    :param name: the name of the strategy.
+    :return: the strategy.
+    """
+    if name not in _loaded:
+        if name not in _registry:
+            raise ValueError(
+                f"Unknown strategy {name!r}, expected one of {available_strategies()}."
+            )
+        module_name, attribute = _registry[name].split(":")
+        _loaded[name] = getattr(importlib.import_module(module_name), attribute)
+    return _loaded[name]
+
+
+def run_strategies(
+    names: List[str], matrix: FeatureMatrix, params: Any
+) -> List[Dict[str, float]]:
+    """
+    Run strategies on the same features.
+
+    :param names: the names of the strategies.
+    :param matrix: the features of every pair.
+    :param params: the params of the strategies.
+    :return: the scores of every strategy, in the order of their names.
+    """
+    return [load_strategy(name)(matrix, params) for name in names]
+
+
+def rank_candidates(
+    scores: Mapping[str, float], threshold: float, limit: int
+) -> List[str]:
+    """
+    Rank the pairs worth swapping, strongest signal first.
+
+    :param scores: the score of every pair.
+    :param threshold: the absolute score a pair needs to be a candidate.
+    :param limit: the maximum number of candidates.
+    :return: the candidates, ties broken by name so that every agent ranks alike.
+    """
+    candidates = [pair for pair, score in scores.items() if abs(score) >= threshold]
+    candidates.sort(key=lambda pair: (-abs(scores[pair]), pair))
+    return candidates[:limit]
+
+
+register("momentum", f"{__name__}.momentum:momentum")
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the momentum strategy of the CeloSwapperAbciApp."""
+
+from typing import Any, Dict
+
+import numpy as np
+
+from packages.celo.skills.celo_swapper.fixed_point import (
+    WAD,
+    from_wads,
+    to_wad,
+    to_wads,
+    wad_clip,
+    wad_div,
+    wad_mul,
+)
+from packages.celo.skills.celo_swapper.strategies import FeatureMatrix, PRICE_FEATURE
+
+
+def momentum_scores(
+    pairs: np.ndarray,
+    prices: np.ndarray,
+    averages: np.ndarray,
+    sensitivity: float,
+) -> Dict[str, float]:
+    """
+    Score every pair by how far its price moved away from its recent average.
+
+    :param pairs: the names of the pairs.
+    :param prices: the current price of every pair, NaN if it has none.
+    :param averages: the moving average of the closing prices of every pair, NaN if
+        it has none.
+    :param sensitivity: the multiplier applied to the relative move.
+    :return: the scores in [-1, 1], positive when the price is above its average.
+        Pairs without a price or an average are not scored. The scores are computed
+        in fixed point over the columns of wads, so that every agent gets the same
+        ones.
+    """
+    scored = ~np.isnan(prices) & (np.nan_to_num(averages) > 0)
+    move = wad_div(to_wads(prices[scored]), to_wads(averages[scored])) - WAD
+    scores = wad_clip(wad_mul(move, to_wad(sensitivity)), -WAD, WAD)
+    return dict(zip(pairs[scored].tolist(), from_wads(scores).tolist()))
+
+
+def momentum(matrix: FeatureMatrix, params: Any) -> Dict[str, float]:
+    """Score every pair against its simple moving average, by `strategy_sensitivity`."""
+    return momentum_scores(
+        np.array(matrix.pairs, dtype=object),
+        matrix.column(PRICE_FEATURE),
+        matrix.column("sma"),
+        params.strategy_sensitivity,
+    )
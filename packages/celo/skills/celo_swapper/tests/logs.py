@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Build the raw logs of the events decoded by the CeloSwapper, for the tests."""
+
+from typing import Any, Dict, Sequence
+
+from packages.celo.skills.celo_swapper.delivery import DELIVER_TOPIC
+from packages.celo.skills.celo_swapper.events import INT256_OFFSET
+
+
+def build_log(  # pylint: disable=too-many-arguments
+    topic: str,
+    *words: int,
+    address: str = "0x0000000000000000000000000000000000000001",
+    block: int = 1,
+    index: int = 0,
+    indexed: Sequence[str] = (),
+    tail: str = "",
+    as_hex: bool = True,
+) -> Dict[str, Any]:
+    """
+    Build a log, as returned by `eth_getLogs`.
+
+    :param topic: the topic of the event.
+    :param words: the words of the data, as signed integers.
+    :param address: the address of the contract that emitted the log.
+    :param block: the block of the log.
+    :param index: the index of the log in its block.
+    :param indexed: the topics of the indexed arguments of the event.
+    :param tail: the hex data following the words, e.g. dynamic bytes.
+    :param as_hex: whether the block and the index are hex strings, as the RPC returns
+        them, or integers, as the contract API returns them.
+    :return: the log.
+    """
+    data = "".join(f"{word % INT256_OFFSET:064x}" for word in words)
+    return dict(
+        address=address,
+        topics=[topic, *indexed],
+        data=f"0x{data}{tail}",
+        blockNumber=hex(block) if as_hex else block,
+        logIndex=hex(index) if as_hex else index,
+    )
+
+
+def deliver_log(request_id: int, data: str, **kwargs: Any) -> Dict[str, Any]:
+    """Build a `Deliver` log of a mech, with the bytes of its data padded to words."""
+    padded = data + "0" * (-len(data) % 64)
+    return build_log(
+        DELIVER_TOPIC,
+        request_id,
+        0x40,
+        len(data) // 2,
+        indexed=["0x" + "00" * 32],
+        tail=padded,
+        **kwargs,
+    )
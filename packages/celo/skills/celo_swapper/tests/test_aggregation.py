@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Test the aggregation.py module of the CeloSwapper."""
+
+import numpy as np
+
+from packages.celo.skills.celo_swapper.aggregation import (
+    median_aggregate,
+    outlier_mask,
+    stack_vectors,
+)
+
+
+def test_stack_vectors() -> None:
+    """Test that missing values are stacked as NaN."""
+    keys, matrix = stack_vectors([{"b": 1.0, "a": 2.0}, {"a": 3.0, "c": None}])
+    assert keys == ["a", "b", "c"]
+    np.testing.assert_array_equal(matrix, [[2.0, 1.0, np.nan], [3.0, np.nan, np.nan]])
+
+
+def test_outlier_mask() -> None:
+    """Test that values far from the median are flagged, tiny differences are not."""
+    matrix = np.array([[1.0, 5.0], [1.0001, 5.0], [1.5, 5.0], [0.9999, np.nan]])
+    mask = outlier_mask(matrix, mad_threshold=3.0, tolerance=0.001)
+    np.testing.assert_array_equal(
+        mask, [[False, False], [False, False], [True, False], [False, False]]
+    )
+
+
+def test_median_aggregate() -> None:
+    """Test that the median is taken over the inliers and empty keys are dropped."""
+    aggregated, mask = median_aggregate(
+        [{"a": 1.0, "b": None}, {"a": 2.0}, {"a": 100.0}, {"a": 3.0}],
+        mad_threshold=3.0,
+        tolerance=0.001,
+    )
+    assert aggregated == {"a": 2.0}
+    assert mask[:, 0].tolist() == [False, False, True, False]
+
+
+def test_median_aggregate_without_values() -> None:
+    """Test that nothing is aggregated if no agent sent a value."""
+    aggregated, _ = median_aggregate([{}, {"a": None}], 3.0, 0.001)
+    assert aggregated == {}
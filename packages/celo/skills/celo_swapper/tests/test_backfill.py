@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Test the backfill.py module of the CeloSwapper."""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from packages.celo.skills.celo_swapper import backfill as backfill_module
+
+from packages.celo.skills.celo_swapper.backfill import (
+    _logger,
+    backfill,
+    interpolate_timestamp,
+)
+from packages.celo.skills.celo_swapper.events import V2_SYNC_TOPIC
+from packages.celo.skills.celo_swapper.history import OHLCVStore, history_path
+from packages.celo.skills.celo_swapper.tests.logs import build_log
+
+
+POOL = "0x0000000000000000000000000000000000000001"
+PAIR = "CELO-cUSD"
+
+
+def write_fixture(path: Path, logs: List[Dict[str, Any]]) -> Path:
+    """Write a fixture with 5-second blocks, starting at block 0."""
+    path.write_text(json.dumps(dict(logs=logs, timestamps={"0": 0, "1000": 5000})))
+    return path
+
+
+def invoke(*args: str) -> Any:
+    """Invoke the command, muting its logs, which the live logging of pytest clashes with."""
+    with patch.object(_logger, "disabled", True):
+        return CliRunner().invoke(backfill, list(args), catch_exceptions=False)
+
+
+def test_interpolate_timestamp() -> None:
+    """Test estimating the timestamp of a block."""
+    assert interpolate_timestamp(15, (10, 100), (20, 150)) == 125
+    assert interpolate_timestamp(10, (10, 100), (10, 100)) == 100
+
+
+def test_backfill_and_resume(tmp_path: Path) -> None:
+    """Test backfilling from a fixture, and resuming an interrupted backfill."""
+    logs = [
+        build_log(V2_SYNC_TOPIC, 1, block, address=POOL, block=block)
+        for block in (3, 8, 12, 30, 31)
+    ]
+    fixture = write_fixture(tmp_path / "fixture.json", logs)
+    common = (
+        f"--pair={PAIR}",
+        f"--pool={POOL}",
+        f"--fixture={fixture}",
+        f"--history-dir={tmp_path}",
+        "--from-block=0",
+        "--chunk-size=10",
+        "--workers=2",
+    )
+
+    result = invoke(*common, "--to-block=19")
+    assert result.exit_code == 0, result.output
+    store = OHLCVStore(history_path(tmp_path, PAIR), 60)
+    assert store.last_block == 12
+    # blocks 3 and 8 fall within the first minute, block 12 within the second one
+    assert store.candles[["open", "high", "low", "close"]].tolist() == [
+        (3.0, 8.0, 3.0, 8.0),
+        (12.0, 12.0, 12.0, 12.0),
+    ]
+    checkpoint = history_path(tmp_path, PAIR).with_suffix(".checkpoint")
+    assert json.loads(checkpoint.read_text()) == dict(next_block=20)
+
+    with patch.object(
+        backfill_module, "fetch_chunk", wraps=backfill_module.fetch_chunk
+    ) as fetch_chunk:
+        result = invoke(*common)
+    assert result.exit_code == 0, result.output
+    # the resumed backfill starts from the checkpoint
+    assert min(call.args[3] for call in fetch_chunk.call_args_list) == (20, 29)
+    store = OHLCVStore(history_path(tmp_path, PAIR), 60)
+    assert store.last_block == 31
+    assert store.candles["close"].tolist() == [8.0, 12.0, 31.0]
+    assert json.loads(checkpoint.read_text()) == dict(next_block=1001)
+
+
+def test_backfill_requires_one_source(tmp_path: Path) -> None:
+    """Test that exactly one source must be given."""
+    result = CliRunner().invoke(
+        backfill, [f"--pair={PAIR}", f"--pool={POOL}", "--from-block=0"]
+    )
+    assert result.exit_code != 0
+    assert "Exactly one of --rpc and --fixture" in result.output
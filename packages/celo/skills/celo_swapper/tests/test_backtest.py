@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Test the backtest.py module of the CeloSwapper."""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+from click.testing import CliRunner
+
+from packages.celo.skills.celo_swapper.backtest import (
+    BacktestConfig,
+    FillModel,
+    backtest,
+    max_drawdown,
+    run_backtest,
+    sweep,
+)
+from packages.celo.skills.celo_swapper.history import (
+    OHLCV_DTYPE,
+    OHLCVStore,
+    history_path,
+)
+
+
+PAIR = "CELO-cUSD"
+CONFIG = BacktestConfig("momentum", lookback=3, sensitivity=10.0, swap_threshold=0.5)
+
+
+def trending_candles(closes: np.ndarray, volume: float = 0.0) -> np.ndarray:
+    """Get candles that open at the previous close."""
+    candles = np.zeros(len(closes), dtype=OHLCV_DTYPE)
+    candles["timestamp"] = 60 * np.arange(len(closes))
+    candles["open"] = np.insert(closes[:-1], 0, closes[0])
+    candles["high"] = np.maximum(candles["open"], closes)
+    candles["low"] = np.minimum(candles["open"], closes)
+    candles["close"] = closes
+    candles["volume"] = volume
+    return candles
+
+
+def test_fill_model() -> None:
+    """Test that fills are worse than the quote by the fee and the impact."""
+    model = FillModel(fee=0.01, impact=0.5, max_slippage=0.1)
+    assert model.slippage(10, 0) == 0.01
+    assert model.slippage(10, 100) == pytest.approx(0.06)
+    assert model.slippage(100, 100) == 0.1
+    assert model.fill_price(2.0, 10, 0, buy=True) == pytest.approx(2.02)
+    assert model.fill_price(2.0, 10, 0, buy=False) == pytest.approx(1.98)
+
+
+def test_max_drawdown() -> None:
+    """Test the largest drop from a running peak."""
+    assert max_drawdown(np.array([1.0, 2.0, 1.5, 3.0, 1.5])) == pytest.approx(0.5)
+    assert max_drawdown(np.array([])) == 0.0
+
+
+def test_run_backtest() -> None:
+    """Test that a rally is bought and the following crash is sold."""
+    closes = np.array([1.0] * 4 + [1.1, 1.2, 1.3, 1.4] + [1.0, 0.8, 0.7])
+    fill_model = FillModel(fee=0.0, impact=0.0)
+    result = run_backtest(
+        PAIR, trending_candles(closes), CONFIG, fill_model, 100.0, 50.0
+    )
+    # buys at the opens of 1.2 and 1.3 with 50 each, sells everything at the open of 0.8
+    position = 50 / 1.1 + 50 / 1.2
+    assert result.trades == 3
+    assert result.pnl == pytest.approx(position * 1.0 - 100.0)
+    assert result.max_drawdown > 0
+
+    costly = run_backtest(
+        PAIR, trending_candles(closes), CONFIG, FillModel(fee=0.01), 100.0, 50.0
+    )
+    assert costly.trades == result.trades
+    assert costly.pnl < result.pnl
+
+
+def test_sweep() -> None:
+    """Test that the configurations are backtested across processes, in order."""
+    candles = trending_candles(np.linspace(1.0, 2.0, 50))
+    configs = [
+        BacktestConfig("momentum", lookback, 10.0, threshold)
+        for lookback in (3, 5)
+        for threshold in (0.1, 2.0)
+    ]
+    results = sweep(PAIR, candles, configs, FillModel(), 100.0, 10.0, workers=2)
+    assert [result.config for result in results] == configs
+    for result in results:
+        expected = run_backtest(PAIR, candles, result.config, FillModel(), 100.0, 10.0)
+        assert result == expected
+    # a threshold no score can reach never trades
+    assert [result.trades == 0 for result in results] == [False, True, False, True]
+
+
+def test_cli(tmp_path: Path) -> None:
+    """Test the command on a stored history."""
+    store = OHLCVStore(history_path(tmp_path, PAIR), 60)
+    for candle in trending_candles(np.linspace(1.0, 2.0, 30)):
+        store.append(*candle.tolist())
+    store.flush()
+    output = tmp_path / "results.json"
+
+    result = CliRunner().invoke(
+        backtest,
+        [
+            f"--pair={PAIR}",
+            f"--history-dir={tmp_path}",
+            "--lookback=3,5",
+            "--swap-threshold=0.1",
+            "--workers=1",
+            f"--output={output}",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert "Backtested 2 configurations on 30 candles." in result.output
+    rows = json.loads(output.read_text())
+    assert {row["lookback"] for row in rows} == {3, 5}
+    assert rows[0]["pnl"] >= rows[1]["pnl"]
+
+    result = CliRunner().invoke(
+        backtest, [f"--pair={PAIR}", f"--history-dir={tmp_path}", "--strategy=nope"]
+    )
+    assert result.exit_code != 0
+    assert "Unknown strategies" in result.output
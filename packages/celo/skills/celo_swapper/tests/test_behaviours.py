@@ -19,28 +19,51 @@
 
 """This package contains round behaviours of CeloSwapperAbciApp."""
 
+import json
+import time
 from pathlib import Path
-from typing import Any, Dict, Hashable, Optional, Type
+from typing import Any, Dict, Generator, Hashable, List, Optional, Tuple, Type, cast
+from unittest import mock
 from dataclasses import dataclass, field
 
 import pytest
 
+from packages.valory.protocols.contract_api import ContractApiMessage
+from packages.valory.protocols.http import HttpMessage
+from packages.valory.protocols.ipfs import IpfsMessage
+from packages.valory.protocols.ledger_api import LedgerApiMessage
+from packages.valory.protocols.ledger_api.custom_types import State as LedgerState
+from packages.valory.protocols.contract_api.custom_types import State
 from packages.valory.skills.abstract_round_abci.base import AbciAppDB
+from packages.valory.skills.abstract_round_abci.behaviour_utils import (
+    TimeoutException,
+)
 from packages.valory.skills.abstract_round_abci.behaviours import (
     AbstractRoundBehaviour,
     BaseBehaviour,
     make_degenerate_behaviour,
 )
+from packages.valory.skills.abstract_round_abci.io_.store import SupportedFiletype
+from packages.celo.contracts.agent_mech.contract import AgentMechContract
+from packages.celo.contracts.multicall3.contract import Multicall3Contract
+from packages.celo.contracts.pool.contract import PoolContract
 from packages.celo.skills.celo_swapper.behaviours import (
     CeloSwapperBaseBehaviour,
     CeloSwapperRoundBehaviour,
     DecisionMakingBehaviour,
-    FinishedDecisionMakingBehaviour,
     MarketDataCollectionBehaviour,
     MechRequestPreparationBehaviour,
     StrategyEvaluationBehaviour,
     SwapPreparationBehaviour,
 )
+from packages.celo.skills.celo_swapper.delivery import DeliveryTracker, delivery_cid
+from packages.celo.skills.celo_swapper.events import V2_SYNC_TOPIC
+from packages.celo.skills.celo_swapper.mech import MechMetadata
+from packages.celo.skills.celo_swapper.market_data import (
+    serialize_snapshot,
+    snapshot_digest,
+)
+from packages.celo.skills.celo_swapper.tests.logs import build_log, deliver_log
 from packages.celo.skills.celo_swapper.rounds import (
     SynchronizedData,
     DegenerateRound,
@@ -62,6 +85,43 @@ from packages.valory.skills.abstract_round_abci.test_tools.base import (
 )
 
 
+POOL_ADDRESS = "0x1e593f1fe7b61c53874b54ec0c59fd0d5eb8621e"
+FEED_ADDRESS = "0x765de816845861e75a25fca122bb6898b8b1282a"
+EXCHANGE_ADDRESS = "0xd8763cba276a3738e6de85b4b3bf5fded6d6ca73"
+IPFS_HASH = "bafybeihvxq6bycqcvqpbhd5w3ecqrzq2gd3asoul5ffhrhbfdlwb6ujsaq"
+SNAPSHOT = dict(block_number=1, block_timestamp=0, pairs={})
+DIGEST = "ab" * 32
+OUTSTANDING = dict(pair="CELO-cUSD", score=0.3, tool="tool", block=50, period=0)
+SCORES = json.dumps({"CELO-cUSD": 0.3})
+
+
+def returning(value: Any) -> Any:
+    """Get a generator function that returns the given value without yielding."""
+
+    def generator(*_: Any, **__: Any) -> Generator[None, None, Any]:
+        """Return the value."""
+        return value
+        yield  # pylint: disable=unreachable
+
+    return generator
+
+
+def run_to_end(generator: Generator) -> Any:
+    """Drive a behaviour generator to its end and get its return value."""
+    while True:
+        try:
+            next(generator)
+        except StopIteration as stop:
+            return stop.value
+        time.sleep(0.01)
+
+
+def slow_sum(*values: int) -> int:
+    """Sum values, slowly."""
+    time.sleep(0.1)
+    return sum(values)
+
+
 @dataclass
 class BehaviourTestCase:
     """BehaviourTestCase"""
@@ -95,10 +155,10 @@ class BaseCeloSwapperTest(FSMBehaviourBaseCase):
         data = data if data is not None else {}
         self.fast_forward_to_behaviour(
             self.behaviour,
-            self.behaviour_class.behaviour_id,
+            self.behaviour_class.auto_behaviour_id(),
             SynchronizedData(AbciAppDB(setup_data=AbciAppDB.data_to_lists(data))),
         )
-        assert self.current_behaviour_id == self.behaviour_class.behaviour_id
+        assert self.current_behaviour_id == self.behaviour_class.auto_behaviour_id()
 
     def complete(self, event: Event) -> None:
         """Complete test"""
@@ -107,113 +167,1119 @@ class BaseCeloSwapperTest(FSMBehaviourBaseCase):
         self.mock_a2a_transaction()
         self._test_done_flag_set()
         self.end_round(done_event=event)
-        assert self.current_behaviour_id == self.next_behaviour_class.behaviour_id
+        assert self.current_behaviour_id == self.next_behaviour_class.auto_behaviour_id()
+
+
+class TestCeloSwapperBaseBehaviour(BaseCeloSwapperTest):
+    """Tests the helpers of CeloSwapperBaseBehaviour"""
+
+    behaviour_class: Type[BaseBehaviour] = MarketDataCollectionBehaviour
+
+    def respond(self, request: HttpMessage, status_code: int, body: bytes) -> None:
+        """Deliver the response to an http request."""
+        response = self.build_incoming_message(
+            message_type=HttpMessage,
+            dialogue_reference=(request.dialogue_reference[0], "stub"),
+            performative=HttpMessage.Performative.RESPONSE,
+            target=request.message_id,
+            message_id=-1,
+            to=str(self.skill.skill_context.skill_id),
+            sender=request.to,
+            version="",
+            status_code=status_code,
+            status_text="",
+            headers="",
+            body=body,
+        )
+        self.http_handler.handle(response)
+
+    def test_run_in_task_pool(self) -> None:
+        """Test that the behaviour yields until the task is done and gets its result."""
+
+        self.skill.skill_context.task_manager.start()
+        self.fast_forward()
+        behaviour = cast(CeloSwapperBaseBehaviour, self.behaviour.current_behaviour)
+        task = behaviour.run_in_task_pool(slow_sum, 1, 2, 3)
+        next(task)
+        assert run_to_end(task) == 6
+        with pytest.raises(TimeoutException):
+            run_to_end(behaviour.run_in_task_pool(slow_sum, 1, timeout=0.01))
+
+    def test_get_http_responses_quorum(self) -> None:
+        """Test that the fan-out resumes on quorum and ignores the stragglers."""
+
+        self.fast_forward()
+        behaviour = cast(CeloSwapperBaseBehaviour, self.behaviour.current_behaviour)
+        urls = {name: f"https://{name}.price" for name in ("a", "b", "c", "d")}
+        responses = behaviour.get_http_responses(urls, quorum=2)
+
+        next(responses)
+        self.assert_quantity_in_outbox(4)
+        requests = {
+            message.url: message
+            for message in (self.get_message_from_outbox() for _ in range(4))
+        }
+        self.respond(requests[urls["a"]], 200, b"1")
+        self.respond(requests[urls["b"]], 500, b"")
+        next(responses)
+        self.respond(requests[urls["c"]], 200, b"3")
+        with pytest.raises(StopIteration) as stop:
+            next(responses)
+        assert {name: message.body for name, message in stop.value.value.items()} == {
+            "a": b"1",
+            "c": b"3",
+        }
+        # the straggler is dropped without failing the handler
+        self.respond(requests[urls["d"]], 200, b"4")
+        health = behaviour.source_health
+        assert [health.error_rate(name) for name in "abcd"] == [0.0, 1.0, 0.0, 0.0]
+        assert health.latency("d") > 0.0
+
+    def test_get_http_responses_always_late(self) -> None:
+        """Test that a source that always misses the quorum is ranked last."""
+
+        self.fast_forward()
+        behaviour = cast(CeloSwapperBaseBehaviour, self.behaviour.current_behaviour)
+        urls = {name: f"https://{name}.price" for name in ("early", "prompt", "late")}
+        health = behaviour.source_health
+        for _ in range(3):
+            responses = behaviour.get_http_responses(urls, quorum=2, timeout=5.0)
+            next(responses)
+            requests = {
+                message.url: message
+                for message in (self.get_message_from_outbox() for _ in range(3))
+            }
+            self.respond(requests[urls["early"]], 200, b"1")
+            self.respond(requests[urls["prompt"]], 200, b"2")
+            with pytest.raises(StopIteration):
+                next(responses)
+            self.respond(requests[urls["late"]], 200, b"3")
+        assert health.latency("late") == 5.0
+        assert health.error_rate("late") == 0.0
+        assert health.rank(urls)[-1] == "late"
+        assert health.timeout(health.rank(urls), 2, 5.0) < 5.0
+
+    def test_send_files_to_ipfs(self) -> None:
+        """Test that uploads are pipelined and the pinned files are not sent again."""
+
+        self.behaviour.context.params.__dict__["ipfs_max_in_flight"] = 2
+        self.fast_forward()
+        behaviour = cast(CeloSwapperBaseBehaviour, self.behaviour.current_behaviour)
+        pins = behaviour.ipfs_pins
+        objs = {f"{name}.json": dict(name=name) for name in ("a", "b", "c", "d")}
+        expected = {
+            filename: pins.content_hash(filename, json.dumps(obj, indent=4))
+            for filename, obj in objs.items()
+        }
+        pins.add(expected["a.json"])
+        uploads = behaviour.send_files_to_ipfs(objs, filetype=SupportedFiletype.JSON)
+
+        def store(request: IpfsMessage) -> None:
+            """Store the file of a request, answering with its hash."""
+            ((filename, _),) = request.files.items()
+            response = self.build_incoming_message(
+                message_type=IpfsMessage,
+                dialogue_reference=(request.dialogue_reference[0], "stub"),
+                performative=IpfsMessage.Performative.IPFS_HASH,
+                target=request.message_id,
+                message_id=-1,
+                to=str(self.skill.skill_context.skill_id),
+                sender=request.to,
+                ipfs_hash=expected[filename],
+            )
+            self.skill.skill_context.handlers.ipfs.handle(response)
+
+        next(uploads)
+        self.assert_quantity_in_outbox(2)
+        first, second = (self.get_message_from_outbox() for _ in range(2))
+        store(first)
+        next(uploads)
+        self.assert_quantity_in_outbox(1)
+        third = self.get_message_from_outbox()
+        store(second)
+        store(third)
+        with pytest.raises(StopIteration) as stop:
+            next(uploads)
+        assert stop.value.value == expected
+        assert all(ipfs_hash in pins for ipfs_hash in expected.values())
+
+        # all the files are pinned now, so nothing is sent
+        pinned = run_to_end(behaviour.send_files_to_ipfs(objs, SupportedFiletype.JSON))
+        assert pinned == expected
+        self.assert_quantity_in_outbox(0)
+
+    def test_get_reference_prices_skips_failing_sources(self) -> None:
+        """Test that sources with an open circuit breaker are not requested."""
+
+        self.behaviour.context.params.__dict__.update(
+            price_sources=[
+                dict(name=name, url=f"https://{name}.price", pair="CELO-cUSD", path="p")
+                for name in ("up", "down")
+            ],
+            price_source_quorum=1,
+        )
+        self.fast_forward()
+        behaviour = cast(CeloSwapperBaseBehaviour, self.behaviour.current_behaviour)
+        for _ in range(behaviour.source_health.failure_threshold):
+            behaviour.source_health.record("down", 1.0, False)
+        prices = behaviour.get_reference_prices()
+
+        next(prices)
+        self.assert_quantity_in_outbox(1)
+        request = self.get_message_from_outbox()
+        assert request.url == "https://up.price"
+        self.respond(request, 200, b'{"p": 2.5}')
+        with pytest.raises(StopIteration) as stop:
+            next(prices)
+        assert stop.value.value == {"CELO-cUSD": {"up": 2.5}}
+
+    @pytest.mark.parametrize(
+        "data, from_ipfs, expected",
+        [
+            (
+                dict(
+                    market_data=serialize_snapshot(SNAPSHOT),
+                    market_data_digest=snapshot_digest(serialize_snapshot(SNAPSHOT)),
+                ),
+                None,
+                SNAPSHOT,
+            ),
+            (
+                dict(
+                    market_data_digest=snapshot_digest(serialize_snapshot(SNAPSHOT)),
+                    market_data_ipfs_hash=IPFS_HASH,
+                ),
+                SNAPSHOT,
+                SNAPSHOT,
+            ),
+            (
+                dict(
+                    market_data_digest="tampered",
+                    market_data_ipfs_hash=IPFS_HASH,
+                ),
+                SNAPSHOT,
+                None,
+            ),
+        ],
+    )
+    def test_get_market_data(
+        self,
+        data: Dict[str, Any],
+        from_ipfs: Optional[Dict[str, Any]],
+        expected: Optional[Dict[str, Any]],
+    ) -> None:
+        """Test that the agreed snapshot is fetched and checked against its digest."""
+
+        self.fast_forward(data)
+        behaviour = cast(CeloSwapperBaseBehaviour, self.behaviour.current_behaviour)
+        with mock.patch.object(
+            behaviour, "get_from_ipfs", side_effect=returning(from_ipfs)
+        ) as get_from_ipfs:
+            market_data = behaviour.get_market_data()
+            with pytest.raises(StopIteration) as stop:
+                next(market_data)
+        assert stop.value.value == expected
+        assert get_from_ipfs.called == (from_ipfs is not None)
 
 
 class TestDecisionMakingBehaviour(BaseCeloSwapperTest):
     """Tests DecisionMakingBehaviour"""
 
-    # TODO: set next_behaviour_class
     behaviour_class: Type[BaseBehaviour] = DecisionMakingBehaviour
-    next_behaviour_class: Type[BaseBehaviour] = ...
+    next_behaviour_class: Type[BaseBehaviour] = make_degenerate_behaviour(
+        FinishedDecisionMakingRound
+    )
 
-    # TODO: provide test cases
-    @pytest.mark.parametrize("test_case", [])
+    @pytest.mark.parametrize(
+        "test_case",
+        [
+            BehaviourTestCase(
+                name="nothing outstanding",
+                initial_data=dict(
+                    strategy_scores=SCORES,
+                    mech_responses=json.dumps([dict(nonce="a", result="yes")]),
+                    mech_cached_results=json.dumps({"cEUR-cUSD": "no"}),
+                ),
+                event=Event.DONE,
+                kwargs=dict(deliveries={}),
+            ),
+            BehaviourTestCase(
+                name="no market data block",
+                initial_data=dict(
+                    strategy_scores=SCORES,
+                    mech_outstanding=json.dumps({"7": OUTSTANDING}),
+                ),
+                event=Event.DONE,
+                kwargs=dict(deliveries={}),
+            ),
+        ],
+    )
     def test_run(self, test_case: BehaviourTestCase) -> None:
-        """Run tests."""
+        """Test that the deliveries of the outstanding requests are agreed on."""
 
         self.fast_forward(test_case.initial_data)
-        # TODO: mock the necessary calls
-        # self.mock_ ...
-        self.complete(test_case.event)
+        self.behaviour.context.mech_deliveries.__dict__["tracker"] = DeliveryTracker(
+            chunk_size=100
+        )
+        behaviour = self.behaviour.current_behaviour
+        with mock.patch.object(
+            behaviour, "send_a2a_transaction", wraps=behaviour.send_a2a_transaction
+        ) as send_a2a_transaction:
+            self.complete(test_case.event)
+        payload = send_a2a_transaction.call_args[0][0]
+        assert json.loads(payload.deliveries) == test_case.kwargs["deliveries"]
 
+    def test_collect_mech_deliveries(self) -> None:
+        """Test that a request still pending in its period is used once delivered."""
 
-class TestFinishedDecisionMakingBehaviour(BaseCeloSwapperTest):
-    """Tests FinishedDecisionMakingBehaviour"""
+        deliveries = self.behaviour.context.mech_deliveries
+        deliveries.__dict__["tracker"] = DeliveryTracker(chunk_size=100)
+        polled = []
 
-    # TODO: set next_behaviour_class
-    behaviour_class: Type[BaseBehaviour] = FinishedDecisionMakingBehaviour
-    next_behaviour_class: Type[BaseBehaviour] = ...
+        def poll(to_block: int) -> Generator[None, None, int]:
+            """Deliver request 7 from block 120 on."""
+            polled.append((deliveries.tracker.next_block, to_block))
+            if to_block < 120:
+                deliveries.tracker.advance(to_block)
+                return 0
+            deliveries.tracker.deliver(7, "yes")
+            return 1
+            yield  # pylint: disable=unreachable
 
-    # TODO: provide test cases
-    @pytest.mark.parametrize("test_case", [])
-    def test_run(self, test_case: BehaviourTestCase) -> None:
-        """Run tests."""
+        # the request is sent in period N, after the market data of block 100
+        self.fast_forward(
+            dict(
+                strategy_scores=SCORES,
+                mech_requests=json.dumps([dict(prompt="", tool="tool", nonce="a")]),
+                mech_request_pairs=json.dumps({"a": "CELO-cUSD"}),
+                mech_responses=json.dumps(
+                    [
+                        dict(nonce="a", requestId="7", result=None),
+                        dict(nonce="b", requestId="8", result=None),
+                    ]
+                ),
+                market_data_block=100,
+            )
+        )
+        behaviour = cast(DecisionMakingBehaviour, self.behaviour.current_behaviour)
+        with mock.patch.object(behaviour, "poll_mech_deliveries", side_effect=poll):
+            assert run_to_end(behaviour.collect_mech_deliveries()) == {}
+        assert deliveries.tracker.outstanding == [7]
 
-        self.fast_forward(test_case.initial_data)
-        # TODO: mock the necessary calls
-        # self.mock_ ...
-        self.complete(test_case.event)
+        # it is carried over to period N+1, where it is delivered
+        self.fast_forward(
+            dict(
+                strategy_scores=SCORES,
+                mech_outstanding=json.dumps({"7": dict(OUTSTANDING, block=101)}),
+                market_data_block=130,
+            )
+        )
+        behaviour = cast(DecisionMakingBehaviour, self.behaviour.current_behaviour)
+        with mock.patch.object(behaviour, "poll_mech_deliveries", side_effect=poll):
+            assert run_to_end(behaviour.collect_mech_deliveries()) == {"7": "yes"}
+        assert polled == [(101, 100), (101, 130)]
+        assert deliveries.tracker.outstanding == []
+
+    def test_poll_mech_deliveries(self) -> None:
+        """Test that the delivered results are fetched through the agent connections."""
+
+        self.fast_forward()
+        behaviour = cast(DecisionMakingBehaviour, self.behaviour.current_behaviour)
+        deliveries = self.behaviour.context.mech_deliveries
+        deliveries.__dict__["tracker"] = DeliveryTracker(chunk_size=100)
+        deliveries.tracker.track({1: 50, 2: 50})
+        logs = [
+            deliver_log(
+                request_id,
+                DIGEST,
+                address=deliveries.mech_address,
+                block=60,
+                index=request_id,
+                as_hex=False,
+            )
+            for request_id in (1, 3)
+        ]
+        responses = [
+            mock.MagicMock(
+                performative=ContractApiMessage.Performative.STATE,
+                state=State(ledger_id="ethereum", body=dict(logs=logs)),
+            ),
+            mock.MagicMock(performative=ContractApiMessage.Performative.ERROR),
+        ]
+        with mock.patch.object(
+            behaviour,
+            "get_contract_api_response",
+            side_effect=lambda **_: returning(responses.pop(0))(),
+        ) as get_contract_api_response, mock.patch.object(
+            behaviour,
+            "get_from_ipfs",
+            side_effect=returning(dict(requestId=1, result="yes")),
+        ) as get_from_ipfs:
+            assert run_to_end(behaviour.poll_mech_deliveries(249)) == 1
+        assert [
+            (call.kwargs["from_block"], call.kwargs["to_block"])
+            for call in get_contract_api_response.call_args_list
+        ] == [(50, 149), (150, 249)]
+        assert get_contract_api_response.call_args.kwargs["contract_id"] == str(
+            AgentMechContract.contract_id
+        )
+        get_from_ipfs.assert_called_once_with(
+            delivery_cid(DIGEST), filetype=SupportedFiletype.JSON
+        )
+        assert deliveries.tracker.results([1, 2]) == {1: "yes"}
+        assert deliveries.tracker.next_block == 150
+
+    def test_swap(self) -> None:
+        """Test that the confirmed pairs go on to the swap preparation."""
+
+        self.fast_forward(
+            dict(
+                strategy_scores=SCORES,
+                mech_cached_results=json.dumps({"CELO-cUSD": '{"p_yes": 0.9}'}),
+            )
+        )
+        self.next_behaviour_class = SwapPreparationBehaviour
+        self.complete(Event.SWAP)
 
 
 class TestMarketDataCollectionBehaviour(BaseCeloSwapperTest):
     """Tests MarketDataCollectionBehaviour"""
 
-    # TODO: set next_behaviour_class
     behaviour_class: Type[BaseBehaviour] = MarketDataCollectionBehaviour
-    next_behaviour_class: Type[BaseBehaviour] = ...
+    next_behaviour_class: Type[BaseBehaviour] = StrategyEvaluationBehaviour
 
-    # TODO: provide test cases
-    @pytest.mark.parametrize("test_case", [])
-    def test_run(self, test_case: BehaviourTestCase) -> None:
+    def setup(self, **kwargs: Any) -> None:
+        """Set up the test method, collecting at the latest block with inline payloads."""
+        super().setup(**kwargs)
+        self.behaviour.context.params.__dict__.update(
+            block_driven_collection=False, market_data_on_ipfs=False
+        )
+        self.behaviour.context.state.pool_index.clear()
+
+    @pytest.mark.parametrize(
+        "test_case",
+        [
+            BehaviourTestCase(
+                name="batched read",
+                initial_data={},
+                event=Event.DONE,
+                kwargs=dict(
+                    pairs=[
+                        dict(name="CELO-cUSD", pool=POOL_ADDRESS, pool_type="v2", rate_feed=FEED_ADDRESS),
+                    ],
+                    results=[
+                        dict(success=True, values=[10, 20, 1]),
+                        dict(success=True, values=[3, 4]),
+                    ],
+                ),
+            ),
+        ],
+    )
+    def test_run(self, test_case: BehaviourTestCase, tmp_path: Path) -> None:
         """Run tests."""
 
+        self.behaviour.context.params.__dict__["pairs"] = test_case.kwargs["pairs"]
+        self.behaviour.context.market_history.__dict__["history_dir"] = tmp_path
         self.fast_forward(test_case.initial_data)
-        # TODO: mock the necessary calls
-        # self.mock_ ...
+        self.behaviour.act_wrapper()
+        self.mock_contract_api_request(
+            contract_id=str(Multicall3Contract.contract_id),
+            request_kwargs=dict(
+                performative=ContractApiMessage.Performative.GET_STATE,
+                callable="aggregate_reads",
+            ),
+            response_kwargs=dict(
+                performative=ContractApiMessage.Performative.STATE,
+                state=State(
+                    ledger_id="ethereum",
+                    body=dict(
+                        block_number=1,
+                        block_timestamp=1700000000,
+                        results=test_case.kwargs["results"],
+                    ),
+                ),
+            ),
+        )
         self.complete(test_case.event)
+        store = self.behaviour.context.market_history.store("CELO-cUSD")
+        assert store.last_block == 1
+        assert store.candles["close"].tolist() == [2.0]
+
+        # the next behaviours are served the same states from the quote cache
+        states = self.behaviour.current_behaviour.get_pair_states(1)
+        with pytest.raises(StopIteration) as stop:
+            next(states)
+        # the index was seeded with the states, and only keeps what the events move
+        assert stop.value.value == {
+            "CELO-cUSD": dict(reserves=[10, 20], oracle_rate=[3, 4])
+        }
+
+    def test_block_driven(self, tmp_path: Path) -> None:
+        """Test that the collection is pinned to the new block that woke it up."""
+
+        self.behaviour.context.params.__dict__["block_driven_collection"] = True
+        self.behaviour.context.params.__dict__["pairs"] = []
+        self.behaviour.context.market_history.__dict__["history_dir"] = tmp_path
+        self.behaviour.context.state.last_collected_block = 4
+        self.fast_forward()
+        self.behaviour.act_wrapper()
+        self.mock_ledger_api_request(
+            request_kwargs=dict(
+                performative=LedgerApiMessage.Performative.GET_STATE,
+                callable="get_block_number",
+            ),
+            response_kwargs=dict(
+                performative=LedgerApiMessage.Performative.STATE,
+                state=LedgerState(
+                    ledger_id="ethereum", body=dict(get_block_number_result=5)
+                ),
+            ),
+        )
+        self.mock_contract_api_request(
+            contract_id=str(Multicall3Contract.contract_id),
+            request_kwargs=dict(
+                performative=ContractApiMessage.Performative.GET_STATE,
+                callable="aggregate_reads",
+            ),
+            response_kwargs=dict(
+                performative=ContractApiMessage.Performative.STATE,
+                state=State(
+                    ledger_id="ethereum",
+                    body=dict(
+                        block_number=5,
+                        block_timestamp=1700000000,
+                        results=[],
+                    ),
+                ),
+            ),
+        )
+        self.complete(Event.DONE)
+        assert self.behaviour.context.state.last_collected_block == 5
+
+    def test_indexed_collection(self, tmp_path: Path) -> None:
+        """Test that the pool states are moved forward with the events since the cursor."""
+
+        pairs = [
+            dict(name="CELO-cUSD", pool=POOL_ADDRESS, pool_type="v2", rate_feed=FEED_ADDRESS)
+        ]
+        self.behaviour.context.params.__dict__["pairs"] = pairs
+        self.behaviour.context.market_history.__dict__["history_dir"] = tmp_path
+        self.behaviour.context.state.pool_index.reset(
+            5, {"CELO-cUSD": dict(reserves=[10, 20, 1], oracle_rate=[3, 4])}
+        )
+        self.fast_forward(dict(indexed_block=5))
+        self.behaviour.act_wrapper()
+        self.mock_contract_api_request(
+            contract_id=str(PoolContract.contract_id),
+            request_kwargs=dict(
+                performative=ContractApiMessage.Performative.GET_STATE,
+                callable="get_logs",
+                contract_address=POOL_ADDRESS,
+            ),
+            response_kwargs=dict(
+                performative=ContractApiMessage.Performative.STATE,
+                state=State(
+                    ledger_id="ethereum",
+                    body=dict(
+                        block_number=7,
+                        block_timestamp=1700000000,
+                        logs=[
+                            build_log(
+                                V2_SYNC_TOPIC,
+                                10,
+                                40,
+                                address=POOL_ADDRESS,
+                                block=6,
+                                as_hex=False,
+                            )
+                        ],
+                    ),
+                ),
+            ),
+        )
+        # only the oracle is read, at the block the events were fetched up to
+        self.mock_contract_api_request(
+            contract_id=str(Multicall3Contract.contract_id),
+            request_kwargs=dict(
+                performative=ContractApiMessage.Performative.GET_STATE,
+                callable="aggregate_reads",
+            ),
+            response_kwargs=dict(
+                performative=ContractApiMessage.Performative.STATE,
+                state=State(
+                    ledger_id="ethereum",
+                    body=dict(
+                        block_number=7,
+                        block_timestamp=1700000000,
+                        results=[dict(success=True, values=[5, 4])],
+                    ),
+                ),
+            ),
+        )
+        self.complete(Event.DONE)
+        assert self.behaviour.context.state.pool_index.block_number == 7
+        assert self.behaviour.context.state.last_collected_block == 7
+
+        states = self.behaviour.current_behaviour.get_pair_states(7)
+        with pytest.raises(StopIteration) as stop:
+            next(states)
+        assert stop.value.value == {
+            "CELO-cUSD": dict(reserves=[10, 40], oracle_rate=[5, 4])
+        }
+
+    def test_indexed_collection_is_history_free(self) -> None:
+        """Test that agents with different index histories send the same snapshot."""
+
+        pair = dict(name="CELO-cUSD", pool=POOL_ADDRESS, pool_type="v2")
+        self.behaviour.context.params.__dict__["pairs"] = [
+            dict(pair, rate_feed=FEED_ADDRESS)
+        ]
+        self.fast_forward(dict(indexed_block=5))
+        behaviour = cast(
+            MarketDataCollectionBehaviour, self.behaviour.current_behaviour
+        )
+        block = dict(block_timestamp=1700000000)
+        logs = [
+            build_log(
+                V2_SYNC_TOPIC, 10, 40, address=POOL_ADDRESS, block=6, as_hex=False
+            )
+        ]
+        response = mock.MagicMock(
+            performative=ContractApiMessage.Performative.STATE,
+            state=mock.MagicMock(body=dict(block, block_number=7, logs=logs)),
+        )
+
+        def read_pair_states(
+            _pairs: List, block_identifier: int, pools: bool = True
+        ) -> Generator[None, None, Dict[str, Any]]:
+            """Read the seed at the cursor, or the oracle at the target block."""
+            state = dict(oracle_rate={5: [3, 4], 7: [5, 4]}[block_identifier])
+            if pools:
+                state.update(reserves=[10, 20, 1])
+            pairs = {"CELO-cUSD": state}
+            return dict(block, block_number=block_identifier, pairs=pairs)
+            yield  # pylint: disable=unreachable
+
+        digests = []
+        for history in (
+            # indexed since an earlier seed, with a pair that is no longer configured
+            {
+                "CELO-cUSD": dict(reserves=[10, 20, 0], oracle_rate=[1, 1]),
+                "cREAL-cUSD": dict(reserves=[1, 1, 0]),
+            },
+            # seeded at the cursor
+            None,
+        ):
+            index = self.behaviour.context.state.pool_index
+            index.clear()
+            if history is not None:
+                index.reset(5, history)
+            with mock.patch.object(
+                behaviour, "read_pair_states", side_effect=read_pair_states
+            ), mock.patch.object(
+                behaviour, "get_contract_api_response", side_effect=returning(response)
+            ):
+                snapshot = run_to_end(behaviour.index_pair_states(7))
+            assert snapshot["pairs"] == {
+                "CELO-cUSD": dict(reserves=[10, 40], oracle_rate=[5, 4])
+            }
+            digests.append(snapshot_digest(serialize_snapshot(snapshot)))
+        assert digests[0] == digests[1]
+
+    def test_content_addressed_payload(self, tmp_path: Path) -> None:
+        """Test that only the digest and the IPFS hash of the snapshot are sent."""
+
+        self.behaviour.context.params.__dict__["market_data_on_ipfs"] = True
+        self.behaviour.context.params.__dict__["pairs"] = []
+        self.behaviour.context.market_history.__dict__["history_dir"] = tmp_path
+        self.fast_forward()
+        behaviour = self.behaviour.current_behaviour
+        with mock.patch.object(
+            behaviour, "send_to_ipfs", side_effect=returning(IPFS_HASH)
+        ), mock.patch.object(
+            behaviour, "send_a2a_transaction", side_effect=returning(None)
+        ) as send_a2a_transaction:
+            self.behaviour.act_wrapper()
+            self.mock_contract_api_request(
+                contract_id=str(Multicall3Contract.contract_id),
+                request_kwargs=dict(
+                    performative=ContractApiMessage.Performative.GET_STATE,
+                    callable="aggregate_reads",
+                ),
+                response_kwargs=dict(
+                    performative=ContractApiMessage.Performative.STATE,
+                    state=State(
+                        ledger_id="ethereum", body=dict(SNAPSHOT, results=[])
+                    ),
+                ),
+            )
+        payload = send_a2a_transaction.call_args[0][0]
+        assert payload.content is None
+        assert payload.ipfs_hash == IPFS_HASH
+        assert payload.digest == snapshot_digest(serialize_snapshot(SNAPSHOT))
 
 
 class TestMechRequestPreparationBehaviour(BaseCeloSwapperTest):
     """Tests MechRequestPreparationBehaviour"""
 
-    # TODO: set next_behaviour_class
     behaviour_class: Type[BaseBehaviour] = MechRequestPreparationBehaviour
-    next_behaviour_class: Type[BaseBehaviour] = ...
+    next_behaviour_class: Type[BaseBehaviour] = make_degenerate_behaviour(
+        FinishedMechRequestPreparationRound
+    )
 
-    # TODO: provide test cases
-    @pytest.mark.parametrize("test_case", [])
-    def test_run(self, test_case: BehaviourTestCase) -> None:
-        """Run tests."""
+    @pytest.mark.parametrize(
+        "scores, outstanding, pairs",
+        [
+            (
+                {"CELO-cUSD": 0.3, "cEUR-cUSD": -0.4, "cREAL-cUSD": 0.01},
+                {},
+                ["cEUR-cUSD", "CELO-cUSD"],
+            ),
+            # the pairs waiting for an earlier request are not asked again
+            (
+                {"CELO-cUSD": 0.3, "cEUR-cUSD": -0.4, "cREAL-cUSD": 0.01},
+                {"7": OUTSTANDING},
+                ["cEUR-cUSD"],
+            ),
+            ({"CELO-cUSD": 0.01}, {}, []),
+        ],
+    )
+    def test_run(
+        self, scores: Dict[str, float], outstanding: Dict[str, Any], pairs: List[str]
+    ) -> None:
+        """Test that the pairs with a weak signal are batched into one request list."""
 
-        self.fast_forward(test_case.initial_data)
-        # TODO: mock the necessary calls
-        # self.mock_ ...
-        self.complete(test_case.event)
+        self.behaviour.context.params.__dict__["mech_batch_size"] = 3
+        self.behaviour.context.params.__dict__["mech_signal_threshold"] = 0.2
+        self.behaviour.context.params.__dict__["mech_tool"] = "prediction-online"
+        self.fast_forward(
+            dict(
+                market_prices=json.dumps({pair: 1.0 for pair in scores}),
+                market_data_digest="0xdigest",
+                strategy_scores=json.dumps(scores),
+                mech_outstanding=json.dumps(outstanding),
+            )
+        )
+        behaviour = self.behaviour.current_behaviour
+        with mock.patch.object(
+            behaviour, "send_a2a_transaction", side_effect=returning(None)
+        ) as send_a2a_transaction, mock.patch.object(
+            behaviour,
+            "send_files_to_ipfs",
+            side_effect=lambda objs, **_: returning(
+                {filename: f"hash_{filename}" for filename in objs}
+            )(),
+        ):
+            self.behaviour.act_wrapper()
+        payload = send_a2a_transaction.call_args[0][0]
+        if not pairs:
+            assert payload.requests is None and payload.request_pairs is None
+            assert payload.request_hashes is None
+            return
+        requests = json.loads(payload.requests)
+        request_pairs = json.loads(payload.request_pairs)
+        assert [request_pairs[request["nonce"]] for request in requests] == pairs
+        assert all(request["tool"] == "prediction-online" for request in requests)
+        assert all(pair in request["prompt"] for request, pair in zip(requests, pairs))
+        assert payload.cached_results is None
+        assert json.loads(payload.request_hashes) == {
+            request["nonce"]: f"hash_metadata_{request['nonce']}.json"
+            for request in requests
+        }
+
+    def test_partly_pinned_metadata(self) -> None:
+        """Test that no hashes are agreed on unless the whole batch was pinned."""
+
+        self.fast_forward()
+        behaviour = cast(
+            MechRequestPreparationBehaviour, self.behaviour.current_behaviour
+        )
+        requests = [
+            MechMetadata(prompt=pair, tool="tool", nonce=pair) for pair in ("a", "b")
+        ]
+        with mock.patch.object(
+            behaviour,
+            "send_files_to_ipfs",
+            side_effect=returning({"metadata_a.json": "hash_a"}),
+        ):
+            assert run_to_end(behaviour.pin_request_metadata(requests)) is None
+            assert run_to_end(behaviour.pin_request_metadata([])) is None
+
+    @pytest.mark.parametrize("delivered_period, cached", [(0, True), (-20, False)])
+    def test_cached_results(self, delivered_period: int, cached: bool) -> None:
+        """Test that the prompts answered recently for close scores are not resent."""
+
+        self.behaviour.context.params.__dict__["mech_batch_size"] = 3
+        self.behaviour.context.params.__dict__["mech_signal_threshold"] = 0.2
+        self.behaviour.context.params.__dict__["mech_tool"] = "prediction-online"
+        self.behaviour.context.params.__dict__["mech_prompt_template"] = "{pair}?"
+        mech_cache = self.behaviour.context.mech_cache
+        cache = mech_cache.put(
+            {},
+            {mech_cache.key("CELO-cUSD", 0.32, "prediction-online"): "yes"},
+            delivered_period,
+        )
+        scores = {"CELO-cUSD": 0.3, "cEUR-cUSD": -0.4}
+        self.fast_forward(
+            dict(
+                market_prices=json.dumps({pair: 1.0 for pair in scores}),
+                market_data_digest="0xdigest",
+                strategy_scores=json.dumps(scores),
+                mech_cache=json.dumps(cache),
+            )
+        )
+
+        behaviour = self.behaviour.current_behaviour
+        with mock.patch.object(
+            behaviour, "send_a2a_transaction", side_effect=returning(None)
+        ) as send_a2a_transaction, mock.patch.object(
+            behaviour, "pin_request_metadata", side_effect=returning(None)
+        ):
+            self.behaviour.act_wrapper()
+        payload = send_a2a_transaction.call_args[0][0]
+        if not cached:
+            assert payload.cached_results is None
+            assert len(json.loads(payload.requests)) == 2
+            return
+        assert [request["prompt"] for request in json.loads(payload.requests)] == [
+            "cEUR-cUSD?"
+        ]
+        assert list(json.loads(payload.request_pairs).values()) == ["cEUR-cUSD"]
+        assert json.loads(payload.cached_results) == {"CELO-cUSD": "yes"}
 
 
 class TestStrategyEvaluationBehaviour(BaseCeloSwapperTest):
     """Tests StrategyEvaluationBehaviour"""
 
-    # TODO: set next_behaviour_class
     behaviour_class: Type[BaseBehaviour] = StrategyEvaluationBehaviour
-    next_behaviour_class: Type[BaseBehaviour] = ...
+    next_behaviour_class: Type[BaseBehaviour] = SwapPreparationBehaviour
 
-    # TODO: provide test cases
-    @pytest.mark.parametrize("test_case", [])
-    def test_run(self, test_case: BehaviourTestCase) -> None:
+    @pytest.mark.parametrize(
+        "test_case",
+        [
+            BehaviourTestCase(
+                name="price above its average",
+                initial_data=dict(
+                    market_prices=json.dumps({"CELO-cUSD": 1.1}),
+                    market_data_digest="0xdigest",
+                ),
+                event=Event.SWAP,
+                kwargs=dict(
+                    lookback=2,
+                    closes=[1.0, 1.0, 1.0],
+                    scores={"CELO-cUSD": 1.0},
+                ),
+            ),
+        ],
+    )
+    def test_run(self, test_case: BehaviourTestCase, tmp_path: Path) -> None:
         """Run tests."""
 
+        self.behaviour.context.market_history.__dict__["history_dir"] = tmp_path
+        self.behaviour.context.market_history.__dict__["_stores"] = {}
+        self.behaviour.context.market_history.__dict__["_indicators"] = {}
+        self.behaviour.context.state.strategy_evaluation = None
+        self.behaviour.context.params.__dict__["strategy_lookback"] = test_case.kwargs[
+            "lookback"
+        ]
+        store = self.behaviour.context.market_history.store("CELO-cUSD")
+        for block, close in enumerate(test_case.kwargs["closes"]):
+            store.update(60 * block, block, close)
         self.fast_forward(test_case.initial_data)
-        # TODO: mock the necessary calls
-        # self.mock_ ...
+        self.skill.skill_context.task_manager.start()
+        # the behaviour yields until the strategies ran on the task manager
+        while self.behaviour.context.state.strategy_evaluation is None:
+            self.behaviour.act_wrapper()
+            time.sleep(0.01)
+        _, scores, duration = self.behaviour.context.state.strategy_evaluation
+        assert json.loads(scores) == test_case.kwargs["scores"]
+        assert duration is not None and duration >= 0.0
         self.complete(test_case.event)
 
+    def test_degraded_evaluation(self, tmp_path: Path) -> None:
+        """Test that a degraded evaluation scores the strongest pairs, shorter."""
+
+        self.behaviour.context.market_history.__dict__["history_dir"] = tmp_path
+        self.behaviour.context.market_history.__dict__["_stores"] = {}
+        self.behaviour.context.market_history.__dict__["_indicators"] = {}
+        self.behaviour.context.params.__dict__["strategy_lookback"] = 4
+        prices = {"CELO-cUSD": 1.1, "cEUR-cUSD": 1.1}
+        self.fast_forward(
+            dict(
+                market_prices=json.dumps(prices),
+                strongest_pairs=json.dumps(["cEUR-cUSD", "cREAL-cUSD"]),
+            )
+        )
+        behaviour = cast(StrategyEvaluationBehaviour, self.behaviour.current_behaviour)
+        with mock.patch.object(
+            behaviour, "run_in_task_pool", side_effect=returning([{"cEUR-cUSD": 1.0}])
+        ) as run_in_task_pool:
+            scores = run_to_end(behaviour.evaluate_strategy(degraded=True))
+        assert scores == {"cEUR-cUSD": 1.0}
+        _, names, matrix, _ = run_in_task_pool.call_args[0]
+        assert names == self.behaviour.context.params.strategies[:1]
+        assert matrix.pairs == ("cEUR-cUSD",)
+        assert matrix.column("price").tolist() == [1.1]
+        assert list(self.behaviour.context.market_history._indicators) == [
+            "cEUR-cUSD:2"
+        ]
+
+    @pytest.mark.parametrize("timeouts, expected", [(1, {"cEUR-cUSD": 1.0}), (2, {})])
+    def test_deadline(self, timeouts: int, expected: Dict, tmp_path: Path) -> None:
+        """Test that an evaluation missing its deadline falls back to a degraded one."""
+
+        self.behaviour.context.market_history.__dict__["history_dir"] = tmp_path
+        self.behaviour.context.market_history.__dict__["_stores"] = {}
+        self.behaviour.context.market_history.__dict__["_indicators"] = {}
+        self.fast_forward(
+            dict(
+                market_prices=json.dumps({"CELO-cUSD": 1.1, "cEUR-cUSD": 1.1}),
+                strongest_pairs=json.dumps(["cEUR-cUSD"]),
+            )
+        )
+        behaviour = cast(StrategyEvaluationBehaviour, self.behaviour.current_behaviour)
+        calls: List[Tuple] = []
+
+        def run_in_task_pool(
+            *args: Any, timeout: Optional[float] = None
+        ) -> Generator[None, None, List[Dict[str, float]]]:
+            """Miss the deadline `timeouts` times, then score the pairs."""
+            calls.append((args[1], args[2].pairs, timeout))
+            if len(calls) <= timeouts:
+                raise TimeoutException()
+            return [{"cEUR-cUSD": 1.0}]
+            yield  # pylint: disable=unreachable
+
+        with mock.patch.object(
+            behaviour, "run_in_task_pool", side_effect=run_in_task_pool
+        ):
+            scores = run_to_end(behaviour.evaluate_strategy())
+        assert scores == expected
+        strategies = self.behaviour.context.params.strategies
+        assert calls == [
+            (strategies, ("CELO-cUSD", "cEUR-cUSD"), 15.0),
+            (strategies[:1], ("cEUR-cUSD",), 15.0),
+        ]
+
+    @pytest.mark.parametrize(
+        "latency, degraded",
+        [
+            ({}, False),
+            (dict(durations=[30.0], degraded_runs=0), True),
+            (dict(durations=[30.0], degraded_runs=5), False),
+        ],
+    )
+    def test_degradation_is_agreed(self, latency: Dict, degraded: bool) -> None:
+        """Test that the agreed latency decides the degradation, full runs are timed."""
+
+        self.behaviour.context.state.strategy_evaluation = None
+        self.fast_forward(
+            dict(
+                market_prices=json.dumps({"CELO-cUSD": 1.1}),
+                market_data_digest="0xdigest",
+                strategy_latency=json.dumps(latency),
+            )
+        )
+        behaviour = self.behaviour.current_behaviour
+        with mock.patch.object(
+            behaviour, "evaluate_strategy", side_effect=returning({})
+        ) as evaluate_strategy, mock.patch.object(
+            behaviour, "send_a2a_transaction", side_effect=returning(None)
+        ) as send_a2a_transaction:
+            self.behaviour.act_wrapper()
+        evaluate_strategy.assert_called_once_with(degraded)
+        payload = send_a2a_transaction.call_args[0][0]
+        if degraded:
+            assert payload.duration is None
+        else:
+            assert payload.duration >= 0.0
+
+    def test_retry_resends_cached_scores(self) -> None:
+        """Test that a retry on the same market data does not evaluate again."""
+
+        data = dict(
+            market_prices=json.dumps({"CELO-cUSD": 1.1}),
+            market_data_digest="0xdigest",
+        )
+        self.behaviour.context.state.strategy_evaluation = None
+        payloads = []
+        for _ in range(2):
+            self.fast_forward(data)
+            behaviour = self.behaviour.current_behaviour
+            with mock.patch.object(
+                behaviour,
+                "evaluate_strategy",
+                side_effect=returning({"CELO-cUSD": 0.5}),
+            ) as evaluate_strategy, mock.patch.object(
+                behaviour, "send_a2a_transaction", side_effect=returning(None)
+            ) as send_a2a_transaction:
+                self.behaviour.act_wrapper()
+            payloads.append(send_a2a_transaction.call_args[0][0].scores)
+        assert evaluate_strategy.call_count == 0
+        assert payloads == [json.dumps({"CELO-cUSD": 0.5})] * 2
+
+        self.fast_forward(dict(data, market_data_digest="0xother"))
+        behaviour = self.behaviour.current_behaviour
+        with mock.patch.object(
+            behaviour, "evaluate_strategy", side_effect=returning({})
+        ) as evaluate_strategy, mock.patch.object(
+            behaviour, "send_a2a_transaction", side_effect=returning(None)
+        ):
+            self.behaviour.act_wrapper()
+        assert evaluate_strategy.call_count == 1
+
 
 class TestSwapPreparationBehaviour(BaseCeloSwapperTest):
     """Tests SwapPreparationBehaviour"""
 
-    # TODO: set next_behaviour_class
     behaviour_class: Type[BaseBehaviour] = SwapPreparationBehaviour
-    next_behaviour_class: Type[BaseBehaviour] = ...
+    next_behaviour_class: Type[BaseBehaviour] = make_degenerate_behaviour(
+        FinishedSwapPreparationRound
+    )
 
-    # TODO: provide test cases
-    @pytest.mark.parametrize("test_case", [])
-    def test_run(self, test_case: BehaviourTestCase) -> None:
-        """Run tests."""
+    @pytest.mark.parametrize(
+        "candidates, max_route_hops, expected",
+        [
+            (["CELO-cUSD"], 1, [("CELO-cUSD", False, [("CELO-cUSD", False, 498)])]),
+            (
+                ["cEUR-cUSD", "CELO-cUSD"],
+                1,
+                [
+                    ("cEUR-cUSD", True, [("cEUR-cUSD", True, 996)]),
+                    ("CELO-cUSD", False, [("CELO-cUSD", False, 498)]),
+                ],
+            ),
+            # buying CELO through cEUR swaps twice as much out as the direct pool
+            (
+                ["CELO-cUSD"],
+                2,
+                [
+                    (
+                        "CELO-cUSD",
+                        False,
+                        [("cEUR-cUSD", False, 996), ("CELO-cEUR", False, 992)],
+                    )
+                ],
+            ),
+            (["unknown"], 2, []),
+        ],
+    )
+    def test_run(
+        self, candidates: List[str], max_route_hops: int, expected: List[Tuple]
+    ) -> None:
+        """Test that the orders of the candidates are routed in integers, in order."""
 
-        self.fast_forward(test_case.initial_data)
-        # TODO: mock the necessary calls
-        # self.mock_ ...
-        self.complete(test_case.event)
+        pairs = [
+            dict(name="CELO-cUSD", pool=POOL_ADDRESS, pool_type="v2"),
+            dict(name="cEUR-cUSD", pool=FEED_ADDRESS, pool_type="v2"),
+            dict(name="CELO-cEUR", pool=EXCHANGE_ADDRESS, pool_type="v2"),
+        ]
+        pools = {pair["name"]: pair["pool"] for pair in pairs}
+        states = {
+            "CELO-cUSD": dict(reserves=[10**6, 2 * 10**6, 1]),
+            "cEUR-cUSD": dict(reserves=[10**6, 10**6, 1]),
+            "CELO-cEUR": dict(reserves=[10**6, 10**6, 1]),
+        }
+        self.behaviour.context.params.__dict__["pairs"] = pairs
+        self.behaviour.context.params.__dict__["max_route_hops"] = max_route_hops
+        self.behaviour.context.params.__dict__["max_split_routes"] = 1
+        self.behaviour.context.params.__dict__["split_steps"] = 20
+        self.behaviour.context.params.__dict__["swap_amount"] = 1000
+        self.behaviour.context.params.__dict__["swap_fee_bps"] = 30
+        self.behaviour.context.params.__dict__["swap_slippage_bps"] = 50
+        content = serialize_snapshot(SNAPSHOT)
+        self.fast_forward(
+            dict(
+                market_data=content,
+                market_data_digest=snapshot_digest(content),
+                strategy_scores=json.dumps({"CELO-cUSD": 0.6, "cEUR-cUSD": -0.55}),
+                swap_candidates=json.dumps(candidates),
+            )
+        )
+        behaviour = self.behaviour.current_behaviour
+        with mock.patch.object(
+            behaviour, "get_pair_states", side_effect=returning(states)
+        ), mock.patch.object(
+            behaviour, "send_a2a_transaction", side_effect=returning(None)
+        ) as send_a2a_transaction:
+            self.behaviour.act_wrapper()
+        payload = send_a2a_transaction.call_args[0][0]
+        orders = [
+            dict(
+                pair=pair,
+                zero_for_one=zero_for_one,
+                amount_in=1000,
+                amount_out=hops[-1][2],
+                min_amount_out=hops[-1][2] * 9950 // 10000,
+                legs=[
+                    dict(
+                        amount_in=1000,
+                        amount_out=hops[-1][2],
+                        min_amount_out=hops[-1][2] * 9950 // 10000,
+                        route=[
+                            dict(
+                                pair=hop_pair,
+                                pool=pools[hop_pair],
+                                pool_type="v2",
+                                zero_for_one=hop_zero_for_one,
+                                amount_out=amount_out,
+                            )
+                            for hop_pair, hop_zero_for_one, amount_out in hops
+                        ],
+                    )
+                ],
+                block_number=SNAPSHOT["block_number"],
+            )
+            for pair, zero_for_one, hops in expected
+        ]
+        assert payload.orders == (json.dumps(orders, sort_keys=True) if orders else None)
 
+    def test_split_order(self) -> None:
+        """Test that a large order is split into legs across parallel pools."""
+
+        self.behaviour.context.params.__dict__["pairs"] = [
+            dict(name="cEUR-cUSD", pool=FEED_ADDRESS, pool_type="v2"),
+            dict(
+                name="cEUR-cUSD-2",
+                pool=EXCHANGE_ADDRESS,
+                pool_type="v2",
+                token0="cEUR",
+                token1="cUSD",
+            ),
+        ]
+        states = {
+            "cEUR-cUSD": dict(reserves=[10**6, 10**6, 1]),
+            "cEUR-cUSD-2": dict(reserves=[10**6, 2 * 10**6, 1]),
+        }
+        self.behaviour.context.params.__dict__["max_route_hops"] = 2
+        self.behaviour.context.params.__dict__["max_split_routes"] = 3
+        self.behaviour.context.params.__dict__["split_steps"] = 20
+        self.behaviour.context.params.__dict__["swap_amount"] = 5 * 10**5
+        self.behaviour.context.params.__dict__["swap_fee_bps"] = 30
+        self.behaviour.context.params.__dict__["swap_slippage_bps"] = 50
+        content = serialize_snapshot(SNAPSHOT)
+        self.fast_forward(
+            dict(
+                market_data=content,
+                market_data_digest=snapshot_digest(content),
+                strategy_scores=json.dumps({"cEUR-cUSD": -0.55}),
+                swap_candidates=json.dumps(["cEUR-cUSD"]),
+            )
+        )
+        behaviour = self.behaviour.current_behaviour
+        with mock.patch.object(
+            behaviour, "get_pair_states", side_effect=returning(states)
+        ), mock.patch.object(
+            behaviour, "send_a2a_transaction", side_effect=returning(None)
+        ) as send_a2a_transaction:
+            self.behaviour.act_wrapper()
+        (order,) = json.loads(send_a2a_transaction.call_args[0][0].orders)
+        assert [
+            (leg["route"][0]["pool"], leg["amount_in"], leg["amount_out"])
+            for leg in order["legs"]
+        ] == [(EXCHANGE_ADDRESS, 475000, 642756), (FEED_ADDRESS, 25000, 24318)]
+        assert order["amount_in"] == 5 * 10**5
+        assert order["amount_out"] == 642756 + 24318
+        assert order["min_amount_out"] == sum(
+            leg["min_amount_out"] for leg in order["legs"]
+        )
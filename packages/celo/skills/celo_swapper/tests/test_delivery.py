@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Test the delivery.py module of the CeloSwapper."""
+
+from packages.celo.skills.celo_swapper.delivery import (
+    Delivery,
+    DeliveryTracker,
+    decode_deliver_log,
+    delivery_cid,
+    delivery_result,
+    pending_requests,
+)
+from packages.celo.skills.celo_swapper.tests.logs import deliver_log
+
+
+MECH = "0x0000000000000000000000000000000000000002"
+DIGEST = "ab" * 32
+
+
+def test_decode_deliver_log() -> None:
+    """Test decoding a `Deliver` log."""
+    log = deliver_log(3, DIGEST, address=MECH, block=7)
+    assert decode_deliver_log(log) == Delivery(
+        request_id=3, block_number=7, data=DIGEST
+    )
+    assert decode_deliver_log(deliver_log(3, "1234", block=7)) == Delivery(
+        request_id=3, block_number=7, data="1234"
+    )
+    assert decode_deliver_log(dict(log, blockNumber=7)) == Delivery(
+        request_id=3, block_number=7, data=DIGEST
+    )
+    assert decode_deliver_log(dict(log, topics=["0x00"])) is None
+    assert decode_deliver_log(dict(log, topics=[])) is None
+    assert delivery_cid("1234") == "f017012201234"
+
+
+def test_delivery_result() -> None:
+    """Test getting the result of a delivery from its IPFS directory."""
+    response = dict(requestId=3, result="yes")
+    assert delivery_result(response, 3) == "yes"
+    assert delivery_result({"3": response, "4": dict(result="no")}, 3) == "yes"
+    assert delivery_result({"4": dict(result="no")}, 3) is None
+    assert delivery_result(None, 3) is None
+
+
+def test_pending_requests() -> None:
+    """Test that only the sent requests of the batch without a result are pending."""
+    requests = [dict(prompt="", tool="tool", nonce=nonce) for nonce in "abcd"]
+    request_pairs = {"a": "CELO-cUSD", "b": "cEUR-cUSD", "c": "cREAL-cUSD"}
+    responses = [
+        dict(nonce="a", requestId="7", result=None),
+        dict(nonce="b", requestId="8", result="yes"),
+        dict(nonce="c", requestId=None, result=None),
+        dict(nonce="d", requestId="9", result=None),
+    ]
+    scores = {"CELO-cUSD": 0.3, "cEUR-cUSD": -0.4, "cREAL-cUSD": 0.2}
+    assert pending_requests(responses, requests, request_pairs, scores, 100, 2) == {
+        "7": dict(pair="CELO-cUSD", score=0.3, tool="tool", block=101, period=2)
+    }
+    assert pending_requests(responses, requests, request_pairs, scores, None, 2)[
+        "7"
+    ]["block"] is None
+
+
+def test_tracker() -> None:
+    """Test that only the outstanding requests are resolved, in batched block ranges."""
+    tracker = DeliveryTracker(chunk_size=200)
+    assert tracker.ranges(1000) == []
+
+    tracker.track({1: 500, 2: 500})
+    assert tracker.ranges(1000) == [(500, 699), (700, 899), (900, 1000)]
+    logs = [
+        deliver_log(request_id, DIGEST, address=MECH, block=block)
+        for request_id, block in ((1, 550), (2, 620), (3, 300))
+    ]
+    deliveries = tracker.deliveries(logs)
+    assert [delivery.request_id for delivery in deliveries] == [1, 2]
+    tracker.deliver(1, "yes")
+    tracker.deliver(3, "unknown")
+    tracker.advance(699)
+    assert tracker.outstanding == [2]
+    assert tracker.ranges(1000) == [(700, 899), (900, 1000)]
+    assert tracker.results([1, 2, 3]) == {1: "yes"}
+
+    # a request sent before the last poll moves the next block back
+    tracker.track({1: 500, 2: 500, 3: 250})
+    assert tracker.ranges(1000)[0] == (250, 449)
+    assert tracker.outstanding == [2, 3]
+    assert tracker.results([1]) == {1: "yes"}
+
+    # the requests that are not tracked anymore are forgotten
+    tracker.track({2: 500})
+    assert tracker.outstanding == [2]
+    assert tracker.results([1]) == {}
+    tracker.track({})
+    assert tracker.outstanding == [] and tracker.next_block is None
+
+
+def test_tracker_from_latest() -> None:
+    """Test that requests tracked without a block are looked for from the last one."""
+    tracker = DeliveryTracker(chunk_size=100)
+    tracker.track({1: None})
+    assert tracker.ranges(600) == [(600, 600)]
+    tracker.advance(600)
+    assert tracker.ranges(600) == []
+    assert tracker.ranges(650) == [(601, 650)]
+    # a request that cannot have been delivered yet is not polled for
+    tracker.track({2: 700})
+    assert tracker.ranges(650) == [(601, 650)]
+    tracker.track({2: 700})
+    tracker.advance(650)
+    assert tracker.next_block == 651
+    tracker = DeliveryTracker(chunk_size=100)
+    tracker.track({2: 700})
+    assert tracker.ranges(650) == []
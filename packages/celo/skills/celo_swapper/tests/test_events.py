@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Test the events.py module of the CeloSwapper."""
+
+from typing import Any, Dict
+
+import pytest
+
+from packages.celo.skills.celo_swapper.events import (
+    BlockCandle,
+    PoolEvent,
+    V2_SWAP_TOPIC,
+    V2_SYNC_TOPIC,
+    V3_SWAP_TOPIC,
+    apply_pool_log,
+    block_candles,
+    decode_pool_log,
+)
+from packages.celo.skills.celo_swapper.market_data import Q96
+from packages.celo.skills.celo_swapper.tests.logs import build_log
+
+
+@pytest.mark.parametrize(
+    "log, expected",
+    (
+        (build_log(V2_SYNC_TOPIC, 4, 10), PoolEvent(1, 0, 2.5, 0.0)),
+        (build_log(V2_SWAP_TOPIC, 3, 0, 2, 7), PoolEvent(1, 0, None, 5.0)),
+        (build_log(V3_SWAP_TOPIC, -6, 12, 2 * Q96, 1, 0), PoolEvent(1, 0, 4.0, 6.0)),
+        (build_log(V2_SYNC_TOPIC, 0, 10), None),
+        (build_log("0x00", 1), None),
+        (dict(topics=[], data="0x"), None),
+    ),
+)
+def test_decode_pool_log(log: Dict[str, Any], expected: PoolEvent) -> None:
+    """Test decoding the logs of a pool."""
+    assert decode_pool_log(log) == expected
+
+
+def test_block_candles() -> None:
+    """Test folding events into one candle per block."""
+    events = [
+        PoolEvent(2, 1, None, 3.0),
+        PoolEvent(1, 0, None, 1.0),
+        PoolEvent(2, 0, 4.0, 0.0),
+        PoolEvent(1, 1, 2.0, 0.0),
+        PoolEvent(1, 2, 1.0, 2.0),
+    ]
+    candles, last_price = block_candles(events)
+    assert candles == [
+        BlockCandle(1, 2.0, 2.0, 1.0, 1.0, 2.0),
+        BlockCandle(2, 4.0, 4.0, 4.0, 4.0, 3.0),
+    ]
+    assert last_price == 4.0
+
+    candles, _ = block_candles([PoolEvent(3, 0, None, 1.0)], last_price)
+    assert candles == [BlockCandle(3, 4.0, 4.0, 4.0, 4.0, 1.0)]
+
+
+def test_apply_pool_log() -> None:
+    """Test that pool logs move the raw state of a pair forward."""
+    state: Dict[str, Any] = dict(reserves=[1, 2, 3], oracle_rate=[5, 4])
+    assert apply_pool_log(state, build_log(V2_SYNC_TOPIC, 4, 10))
+    assert not apply_pool_log(state, build_log(V2_SWAP_TOPIC, 3, 0, 2, 7))
+    assert state == dict(reserves=[4, 10, 3], oracle_rate=[5, 4])
+
+    state = dict(slot0=[Q96, 0, 1, 2, 3, 4, True], liquidity=[5])
+    assert apply_pool_log(state, build_log(V3_SWAP_TOPIC, -6, 12, 2 * Q96, 7, -3))
+    assert state == dict(slot0=[2 * Q96, -3, 1, 2, 3, 4, True], liquidity=[7])
+    assert not apply_pool_log(state, dict(topics=[], data="0x"))
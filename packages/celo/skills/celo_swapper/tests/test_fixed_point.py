@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Test the fixed_point.py module of the CeloSwapper."""
+
+import numpy as np
+import pytest
+
+from packages.celo.skills.celo_swapper.fixed_point import (
+    RAY,
+    WAD,
+    from_wad,
+    from_wads,
+    get_amount_out,
+    mul_div,
+    ray_div,
+    ray_mul,
+    ray_to_wad,
+    sqrt_price_x96_to_wad,
+    to_wad,
+    to_wads,
+    wad_clip,
+    wad_div,
+    wad_mul,
+    wad_ratio,
+    wad_to_ray,
+)
+
+
+def test_mul_div_rounds_half_away_from_zero() -> None:
+    """Test that products and quotients are rounded half away from zero."""
+    assert mul_div(5, 1, 2) == 3
+    assert mul_div(-5, 1, 2) == -3
+    assert mul_div(5, 1, -2) == -3
+    assert mul_div(4, 1, 3) == 1
+    assert mul_div(-4, 1, 3) == -1
+    with pytest.raises(ZeroDivisionError):
+        mul_div(1, 1, 0)
+
+
+def test_wad_and_ray() -> None:
+    """Test the wad and ray operations."""
+    assert wad_mul(to_wad(1.5), to_wad(2)) == to_wad(3)
+    assert wad_div(to_wad(1), to_wad(3)) == 333333333333333333
+    assert wad_div(to_wad(2), to_wad(3)) == 666666666666666667
+    assert ray_mul(RAY // 2, 3 * RAY) == 3 * RAY // 2
+    assert ray_div(RAY, 4 * RAY) == RAY // 4
+    assert wad_to_ray(WAD) == RAY
+    assert ray_to_wad(RAY + RAY // WAD // 2) == WAD + 1
+    assert wad_ratio(1, 3) == 333333333333333333
+    assert wad_clip(2 * WAD, -WAD, WAD) == WAD
+    assert wad_clip(-2 * WAD, -WAD, WAD) == -WAD
+
+
+def test_to_wad() -> None:
+    """Test that floats are converted through their decimal representation."""
+    assert to_wad(1.1) == 1_100_000_000_000_000_000
+    assert to_wad("0.000000000000000001") == 1
+    assert to_wad(-0.5) == -WAD // 2
+    assert from_wad(to_wad(0.3)) == 0.3
+
+
+def test_columns_of_wads() -> None:
+    """Test that columns of wads get the same results as every wad on its own."""
+    values = [1.1, -0.5, 0.3, 2.0]
+    wads = to_wads(np.array(values))
+    assert wads.tolist() == [to_wad(value) for value in values]
+    quotients = wad_div(wads, to_wads(np.array([3.0, 3.0, -7.0, 2.0])))
+    assert quotients.tolist() == [
+        wad_div(to_wad(a), to_wad(b)) for a, b in zip(values, [3.0, 3.0, -7.0, 2.0])
+    ]
+    assert wad_mul(wads, to_wad(2)).tolist() == [2 * wad for wad in wads.tolist()]
+    assert wad_clip(wads, -WAD // 4, WAD).tolist() == [WAD, -WAD // 4, to_wad(0.3), WAD]
+    assert from_wads(wads).tolist() == values
+    with pytest.raises(ZeroDivisionError):
+        wad_div(wads, to_wads(np.array([1.0, 0.0, 1.0, 1.0])))
+    assert to_wads(np.array([3, -2])).tolist() == [to_wad(3), to_wad(-2)]
+
+
+def test_sqrt_price_x96_to_wad() -> None:
+    """Test that v3 prices are converted exactly."""
+    assert sqrt_price_x96_to_wad(2**96) == WAD
+    assert sqrt_price_x96_to_wad(2 * 2**96) == 4 * WAD
+    assert sqrt_price_x96_to_wad(2**96 // 2) == WAD // 4
+
+
+def test_get_amount_out() -> None:
+    """Test that swaps are quoted like a constant-product pool does."""
+    assert get_amount_out(1000, 10**6, 2 * 10**6, 30) == 1992
+    assert get_amount_out(1000, 10**6, 2 * 10**6, 0) == 1998
+    assert get_amount_out(0, 10**6, 2 * 10**6, 30) == 0
+    assert get_amount_out(1000, 0, 2 * 10**6, 30) == 0
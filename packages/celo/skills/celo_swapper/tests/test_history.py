@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Test the history.py module of the CeloSwapper."""
+
+from pathlib import Path
+
+import pytest
+
+from packages.celo.skills.celo_swapper.history import NO_BLOCK, OHLCVStore
+
+
+def test_update_folds_observations_into_candles(tmp_path: Path) -> None:
+    """Test that observations within an interval are folded into a single candle."""
+    store = OHLCVStore(tmp_path / "pair.ohlcv", interval=60)
+    assert len(store) == 0
+    assert store.last_block == NO_BLOCK
+
+    assert store.update(120, 1, 2.0)
+    assert store.update(150, 2, 3.0, volume=1.0)
+    assert store.update(170, 3, 1.0, volume=2.0)
+    assert store.update(180, 4, 4.0)
+
+    assert store.candles[["open", "high", "low", "close", "volume"]].tolist() == [
+        (2.0, 3.0, 1.0, 1.0, 3.0),
+        (4.0, 4.0, 4.0, 4.0, 0.0),
+    ]
+    assert store.candles["timestamp"].tolist() == [120, 180]
+    assert store.last_block == 4
+
+
+def test_update_skips_known_blocks(tmp_path: Path) -> None:
+    """Test that blocks that are already stored are not folded again."""
+    store = OHLCVStore(tmp_path / "pair.ohlcv", interval=60)
+    assert store.update(120, 5, 2.0)
+    assert not store.update(130, 5, 3.0)
+    assert not store.update(130, 4, 3.0)
+    assert store.candles["close"].tolist() == [2.0]
+
+
+def test_append_grows_and_reopens(tmp_path: Path) -> None:
+    """Test that the store grows past its capacity and survives being reopened."""
+    path = tmp_path / "pair.ohlcv"
+    store = OHLCVStore(path, interval=60, initial_capacity=2)
+    for i in range(5):
+        store.append(60 * i, i, 1.0, 2.0, 0.5, 1.5, float(i))
+    assert store.capacity == 8
+    store.flush()
+
+    reopened = OHLCVStore(path, interval=60)
+    assert len(reopened) == 5
+    assert reopened.last_block == 4
+    assert reopened.index_of(120) == 2
+    assert reopened.index_of(130) is None
+    assert reopened.window(60, 180)["timestamp"].tolist() == [60, 120]
+    assert reopened.tail(2)["volume"].tolist() == [3.0, 4.0]
+
+
+def test_append_rejects_older_candles(tmp_path: Path) -> None:
+    """Test that candles can only be appended in increasing timestamp order."""
+    store = OHLCVStore(tmp_path / "pair.ohlcv", interval=60)
+    store.append(60, 1, 1.0, 1.0, 1.0, 1.0)
+    with pytest.raises(ValueError, match="not newer"):
+        store.append(60, 2, 1.0, 1.0, 1.0, 1.0)
+
+
+def test_invalid_store(tmp_path: Path) -> None:
+    """Test that invalid intervals and foreign files are rejected."""
+    with pytest.raises(ValueError, match="must be positive"):
+        OHLCVStore(tmp_path / "pair.ohlcv", interval=0)
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"\x00" * 64)
+    with pytest.raises(ValueError, match="not an OHLCV store"):
+        OHLCVStore(path, interval=60)
+
+
+def test_merge_folds_block_candles(tmp_path: Path) -> None:
+    """Test that the candles of blocks are folded into the candles of their interval."""
+    store = OHLCVStore(tmp_path / "pair.ohlcv", interval=60)
+    assert store.merge(125, 1, 2.0, 3.0, 1.5, 2.5, 1.0)
+    assert store.merge(130, 2, 2.5, 4.0, 1.0, 3.0, 2.0)
+    assert store.merge(190, 3, 3.0, 3.0, 3.0, 3.0)
+    assert not store.merge(200, 3, 9.0, 9.0, 9.0, 9.0)
+
+    assert store.candles[["open", "high", "low", "close", "volume"]].tolist() == [
+        (2.0, 4.0, 1.0, 3.0, 3.0),
+        (3.0, 3.0, 3.0, 3.0, 0.0),
+    ]
+    assert store.candles["timestamp"].tolist() == [120, 180]
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Test the indexer.py module of the CeloSwapper."""
+
+from packages.celo.skills.celo_swapper.events import (
+    V2_SWAP_TOPIC,
+    V2_SYNC_TOPIC,
+    V3_SWAP_TOPIC,
+)
+from packages.celo.skills.celo_swapper.indexer import PoolIndex
+from packages.celo.skills.celo_swapper.tests.logs import build_log
+
+
+V2_PAIR = dict(name="CELO-cUSD", pool="0xAa", pool_type="v2")
+V3_PAIR = dict(name="CELO-cEUR", pool="0xBb", pool_type="v3")
+
+
+def test_pool_index() -> None:
+    """Test seeding the index and moving it forward with logs."""
+    index = PoolIndex()
+    assert not index.covers([V2_PAIR])
+    assert index.topics([V2_PAIR, V3_PAIR]) == sorted(
+        [V2_SYNC_TOPIC, V2_SWAP_TOPIC, V3_SWAP_TOPIC]
+    )
+
+    seed = {"CELO-cUSD": dict(reserves=[10, 20, 1])}
+    index.reset(5, seed)
+    assert index.covers([V2_PAIR])
+    assert not index.covers([V2_PAIR, V3_PAIR])
+
+    logs = [
+        build_log(
+            V2_SYNC_TOPIC,
+            10,
+            reserve1,
+            address=pool,
+            block=block,
+            index=index,
+            as_hex=False,
+        )
+        for block, index, reserve1, pool in (
+            (7, 0, 40, "0xaa"),
+            (6, 3, 30, "0xaa"),
+            (6, 1, 25, "0xcc"),
+        )
+    ]
+    assert index.apply([V2_PAIR], logs, 8) == 2
+    assert index.block_number == 8
+    states = index.pair_states([V2_PAIR])
+    # only the values the events determine are indexed
+    assert states == {"CELO-cUSD": dict(reserves=[10, 40])}
+    # the seed and the returned states are not shared with the index
+    assert seed == {"CELO-cUSD": dict(reserves=[10, 20, 1])}
+    states["CELO-cUSD"]["reserves"] = None
+    assert index.states["CELO-cUSD"]["reserves"] == [10, 40]
+
+    # seeding again drops the pairs and the values of the previous seed
+    index.reset(9, {"CELO-cEUR": dict(slot0=[1, 2, 3], liquidity=[4], rate=[5])})
+    assert index.states == {"CELO-cEUR": dict(slot0=[1, 2], liquidity=[4])}
+
+    index.clear()
+    assert index.block_number is None
+    assert not index.covers([V2_PAIR])
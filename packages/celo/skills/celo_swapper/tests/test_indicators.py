@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Test the indicators.py module of the CeloSwapper."""
+
+from pathlib import Path
+from typing import Any, Callable, List
+
+import numpy as np
+import pytest
+
+from packages.celo.skills.celo_swapper.history import OHLCVStore
+from packages.celo.skills.celo_swapper.indicators import (
+    ATR,
+    Bollinger,
+    EMA,
+    IndicatorEngine,
+    RSI,
+    SMA,
+    VWAP,
+    atr,
+    bollinger,
+    ema,
+    rsi,
+    sma,
+    vwap,
+)
+
+
+PERIOD = 5
+
+
+def random_candles(n: int = 40, seed: int = 0) -> np.ndarray:
+    """Get a random walk of candles."""
+    rng = np.random.default_rng(seed)
+    close = 10 + np.cumsum(rng.normal(size=n))
+    spread = rng.uniform(0.1, 1.0, size=n)
+    return np.rec.fromarrays(
+        [close + spread, close - spread, close, rng.uniform(0, 5, size=n)],
+        names=["high", "low", "close", "volume"],
+    )
+
+
+def test_batch_values() -> None:
+    """Test the batch indicators on known values."""
+    closes = np.array([1.0, 2.0, 3.0, 4.0])
+    np.testing.assert_allclose(sma(closes, 2), [np.nan, 1.5, 2.5, 3.5])
+    np.testing.assert_allclose(ema(closes, 3), [np.nan, np.nan, 2.0, 3.0])
+    np.testing.assert_allclose(rsi(closes, 2), [np.nan, np.nan, 100.0, 100.0])
+    np.testing.assert_allclose(
+        bollinger(np.array([1.0, 3.0]), 2, 1.0),
+        [[np.nan, 1.0], [np.nan, 2.0], [np.nan, 3.0]],
+    )
+    ones = np.ones(3)
+    typical = np.array([1.0, 2.0, 4.0])
+    np.testing.assert_allclose(
+        vwap(typical, typical, typical, np.array([1.0, 1.0, 2.0]), 2),
+        [np.nan, 1.5, 10 / 3],
+    )
+    assert np.isnan(vwap(ones, ones, ones, np.zeros(3), 2)).all()
+
+
+@pytest.mark.parametrize(
+    "indicator, batch, columns",
+    [
+        (lambda: SMA(PERIOD), lambda c: sma(c.close, PERIOD), ["close"]),
+        (lambda: EMA(PERIOD), lambda c: ema(c.close, PERIOD), ["close"]),
+        (lambda: RSI(PERIOD), lambda c: rsi(c.close, PERIOD), ["close"]),
+        (
+            lambda: Bollinger(PERIOD),
+            lambda c: bollinger(c.close, PERIOD)[2],
+            ["close"],
+        ),
+        (
+            lambda: ATR(PERIOD),
+            lambda c: atr(c.high, c.low, c.close, PERIOD),
+            ["high", "low", "close"],
+        ),
+        (
+            lambda: VWAP(PERIOD),
+            lambda c: vwap(c.high, c.low, c.close, c.volume, PERIOD),
+            ["high", "low", "close", "volume"],
+        ),
+    ],
+)
+def test_incremental_matches_batch(
+    indicator: Callable[[], Any],
+    batch: Callable[[np.ndarray], np.ndarray],
+    columns: List[str],
+) -> None:
+    """Test that updating an indicator, or warming it up, matches the batch mode."""
+    candles = random_candles()
+    expected = batch(candles)
+
+    def value(instance: Any) -> float:
+        """Get the value of an indicator as a float, NaN if it is not defined."""
+        value = instance.value
+        if isinstance(value, dict):
+            value = value["upper"]
+        return np.nan if value is None else value
+
+    incremental = indicator()
+    values = []
+    for candle in candles:
+        incremental.update(*(candle[column] for column in columns))
+        values.append(value(incremental))
+    np.testing.assert_allclose(values, expected)
+
+    warmed_up = indicator()
+    warmed_up.warm_up(*(candles[column][:20] for column in columns))
+    assert value(warmed_up) == pytest.approx(expected[19], nan_ok=True)
+    for candle in candles[20:]:
+        warmed_up.update(*(candle[column] for column in columns))
+    assert value(warmed_up) == pytest.approx(expected[-1])
+
+
+def test_engine_sync(tmp_path: Path) -> None:
+    """Test that the engine only applies the candles closed since the last sync."""
+    candles = random_candles(60)
+    store = OHLCVStore(tmp_path / "pair.ohlcv", interval=60)
+    for i, candle in enumerate(candles[:30]):
+        store.append(
+            60 * i,
+            i,
+            candle.close,
+            candle.high,
+            candle.low,
+            candle.close,
+            candle.volume,
+        )
+
+    engine = IndicatorEngine(PERIOD)
+    # the last candle is still open
+    assert engine.sync(store) == 29
+    assert engine.last_timestamp == 60 * 28
+    assert engine.values()["sma"] == pytest.approx(sma(candles.close[:29], PERIOD)[-1])
+    assert engine.sync(store) == 0
+
+    for i, candle in enumerate(candles[30:], start=30):
+        store.append(
+            60 * i,
+            i,
+            candle.close,
+            candle.high,
+            candle.low,
+            candle.close,
+            candle.volume,
+        )
+    assert engine.sync(store) == 30
+    values = engine.values()
+    closed = candles[:59]
+    assert values["sma"] == pytest.approx(sma(closed.close, PERIOD)[-1])
+    assert values["ema"] == pytest.approx(ema(closed.close, PERIOD)[-1])
+    assert values["rsi"] == pytest.approx(rsi(closed.close, PERIOD)[-1])
+    assert values["atr"] == pytest.approx(
+        atr(closed.high, closed.low, closed.close, PERIOD)[-1]
+    )
+    assert values["vwap"] == pytest.approx(
+        vwap(closed.high, closed.low, closed.close, closed.volume, PERIOD)[-1]
+    )
+    lower, middle, upper = bollinger(closed.close, PERIOD)[:, -1]
+    assert (values["bollinger_lower"], values["bollinger_upper"]) == pytest.approx(
+        (lower, upper)
+    )
+    assert values["bollinger_middle"] == pytest.approx(middle)
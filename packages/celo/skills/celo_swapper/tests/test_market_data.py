@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Test the market_data.py module of the CeloSwapper."""
+
+import numpy as np
+
+from packages.celo.skills.celo_swapper.fixed_point import WAD
+from packages.celo.skills.celo_swapper.market_data import (
+    Q96,
+    build_pair_reads,
+    pair_price,
+    pair_price_wad,
+    parse_pair_reads,
+    parse_source_price,
+    quote_amount_out,
+    quote_curve,
+    serialize_snapshot,
+    snapshot_digest,
+)
+
+
+ORACLES = "0xefb84935239dacdecf7c5ba76d8de40b077b7b33"
+PAIRS = [
+    dict(name="CELO-cUSD", pool="0x01", pool_type="v2", rate_feed="0xfeed"),
+    dict(name="cEUR-cUSD", pool="0x02", pool_type="v3"),
+]
+
+
+def test_build_pair_reads() -> None:
+    """Test that every pair gets its pool reads and, optionally, an oracle read."""
+    reads = build_pair_reads(PAIRS, ORACLES)
+    assert [(read["pair"], read["method"], read["target"]) for read in reads] == [
+        ("CELO-cUSD", "getReserves", "0x01"),
+        ("CELO-cUSD", "medianRate", ORACLES),
+        ("cEUR-cUSD", "slot0", "0x02"),
+        ("cEUR-cUSD", "liquidity", "0x02"),
+    ]
+    assert reads[1]["args"] == ["0xfeed"]
+
+
+def test_parse_pair_reads() -> None:
+    """Test that the batched results are mapped back to their pairs."""
+    reads = build_pair_reads(PAIRS, ORACLES)
+    state = dict(
+        block_number=10,
+        block_timestamp=1700000000,
+        results=[
+            dict(success=True, values=[1, 2, 3]),
+            dict(success=True, values=[5, 1]),
+            dict(success=False, values=[]),
+            dict(success=True, values=[7]),
+        ],
+    )
+    assert parse_pair_reads(reads, state) == dict(
+        block_number=10,
+        block_timestamp=1700000000,
+        pairs={
+            "CELO-cUSD": dict(reserves=[1, 2, 3], oracle_rate=[5, 1]),
+            "cEUR-cUSD": dict(slot0=None, liquidity=[7]),
+        },
+    )
+
+
+def test_pair_price() -> None:
+    """Test that the pool price is preferred over the oracle rate."""
+    assert pair_price(dict(reserves=[2, 6, 1], oracle_rate=[1, 1])) == 3.0
+    assert pair_price(dict(slot0=[2 * Q96, 0, 0, 0, 0, 0, 1])) == 4.0
+    assert pair_price(dict(reserves=None, oracle_rate=[3, 2])) == 1.5
+    assert pair_price(dict(reserves=[0, 0, 0], oracle_rate=None)) is None
+    assert pair_price_wad(dict(reserves=[3, 1, 0])) == 333333333333333333
+
+
+def test_quote_amount_out() -> None:
+    """Test that v2 pools are quoted against their reserves and v3 ones at spot."""
+    v2 = dict(reserves=[10**6, 2 * 10**6, 1])
+    assert quote_amount_out(v2, 1000, True, 30) == 1992
+    assert quote_amount_out(v2, 1000, False, 30) == 498
+    v3 = dict(slot0=[2 * Q96, 0, 0, 0, 0, 0, 1], liquidity=[1])
+    assert quote_amount_out(v3, WAD, True, 0) == 4 * WAD
+    assert quote_amount_out(v3, WAD, False, 100) == 99 * WAD // 400
+    assert quote_amount_out(dict(reserves=None, oracle_rate=[1, 1]), 1, True, 0) is None
+
+
+def test_quote_curve() -> None:
+    """Test that the vectorized quotes follow the exact ones."""
+    amounts = np.array([0, 1000, 10**5])
+    for state, amount_in, fee_bps in [
+        (dict(reserves=[10**6, 2 * 10**6, 1]), amounts, 30),
+        (dict(slot0=[2 * Q96, 0, 0, 0, 0, 0, 1], liquidity=[1]), amounts * WAD, 100),
+    ]:
+        for zero_for_one in (True, False):
+            curve = quote_curve(state, amount_in, zero_for_one, fee_bps)
+            exact = [
+                quote_amount_out(state, int(amount), zero_for_one, fee_bps)
+                for amount in amount_in
+            ]
+            assert np.allclose(curve, exact, rtol=1e-5, atol=1)
+    assert quote_curve(dict(reserves=None), amounts, True, 0) is None
+
+
+def test_parse_source_price() -> None:
+    """Test that prices are found by their path in the response."""
+    assert parse_source_price(b'{"celo": {"usd": 0.75}}', "celo.usd") == 0.75
+    assert parse_source_price(b'{"data": [{"price": "1.5"}]}', "data.0.price") == 1.5
+    assert parse_source_price(b'{"celo": {}}', "celo.usd") is None
+    assert parse_source_price(b"not json", "celo.usd") is None
+
+
+def test_snapshot_digest() -> None:
+    """Test that equal snapshots have equal digests, whatever their key order."""
+    first = serialize_snapshot(dict(block_number=1, pairs={}))
+    second = serialize_snapshot(dict(pairs={}, block_number=1))
+    assert first == second
+    assert snapshot_digest(first) == snapshot_digest(second)
+    assert snapshot_digest(first) != snapshot_digest(serialize_snapshot({}))
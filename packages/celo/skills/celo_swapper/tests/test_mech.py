@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Test the mech.py module of the CeloSwapper."""
+
+import json
+from typing import Any
+
+import pytest
+
+from packages.celo.skills.celo_swapper.mech import (
+    MechMetadata,
+    build_mech_requests,
+    demultiplex_responses,
+    mech_confirms,
+    request_nonce,
+    response_key,
+    serialize_requests,
+    signal_bucket,
+)
+
+
+def test_build_mech_requests() -> None:
+    """Test that every pair gets its own request, with a reproducible nonce."""
+    requests, request_pairs = build_mech_requests(
+        ["cEUR-cUSD", "CELO-cUSD"],
+        {"CELO-cUSD": 0.75, "cEUR-cUSD": 1.0825},
+        {"CELO-cUSD": 0.3, "cEUR-cUSD": -0.45},
+        "{pair} at {price} scores {score}",
+        "prediction-online",
+        "0xdigest",
+    )
+    assert [request.prompt for request in requests] == [
+        "cEUR-cUSD at 1.0825 scores -0.4500",
+        "CELO-cUSD at 0.75 scores 0.3000",
+    ]
+    assert {request.tool for request in requests} == {"prediction-online"}
+    assert request_pairs == {
+        request.nonce: pair
+        for request, pair in zip(requests, ["cEUR-cUSD", "CELO-cUSD"])
+    }
+    assert requests[0].nonce == request_nonce(
+        "0xdigest", "cEUR-cUSD", "prediction-online"
+    )
+    assert requests[0].nonce != request_nonce(
+        "0xother", "cEUR-cUSD", "prediction-online"
+    )
+
+
+def test_serialize_requests() -> None:
+    """Test that requests are serialized as a list of metadata."""
+    request = MechMetadata(prompt="prompt", tool="tool", nonce="nonce")
+    assert json.loads(serialize_requests([request])) == [
+        dict(prompt="prompt", tool="tool", nonce="nonce")
+    ]
+
+
+def test_demultiplex_responses() -> None:
+    """Test that the responses are matched back to their pairs by nonce."""
+    responses = [
+        dict(nonce="b", result='{"p_yes": 0.2}'),
+        dict(nonce="a", result='{"p_yes": 0.7}'),
+        dict(nonce="unknown", result="{}"),
+        dict(nonce="c", result=None, error="timeout"),
+    ]
+    assert demultiplex_responses(
+        {"a": "CELO-cUSD", "b": "cEUR-cUSD", "c": "cREAL-cUSD"}, responses
+    ) == {"CELO-cUSD": '{"p_yes": 0.7}', "cEUR-cUSD": '{"p_yes": 0.2}'}
+
+
+def test_response_key() -> None:
+    """Test that prompts for the same pair and bucket of signal share their key."""
+    assert signal_bucket(0.26, 0.1) == signal_bucket(0.3, 0.1) == 3
+    assert signal_bucket(0.34, 0.1) == 3
+    assert signal_bucket(-0.31, 0.1) == -3
+    key = response_key("CELO-cUSD", 3, "tool")
+    assert key == response_key("CELO-cUSD", 3, "tool")
+    assert key != response_key("CELO-cUSD", 4, "tool")
+    assert key != response_key("cEUR-cUSD", 3, "tool")
+    assert key != response_key("CELO-cUSD", 3, "other-tool")
+
+
+@pytest.mark.parametrize(
+    "result, score, confirmed",
+    [
+        ('{"p_yes": 0.7, "p_no": 0.3}', 0.3, True),
+        ('{"p_yes": 0.7, "p_no": 0.3}', -0.3, False),
+        (dict(p_yes=0.2), -0.3, True),
+        ('{"p_yes": 0.55, "p_no": 0.45}', 0.3, False),
+        ("not a prediction", 0.3, False),
+        ('{"error": "timeout"}', 0.3, False),
+        ("0.7", 0.3, False),
+        (None, 0.3, False),
+    ],
+)
+def test_mech_confirms(result: Any, score: float, confirmed: bool) -> None:
+    """Test that a prediction confirms a signal likely enough in its direction."""
+    assert mech_confirms(result, score, 0.6) == confirmed
@@ -19,8 +19,27 @@
 
 """Test the models.py module of the CeloSwapper."""
 
+from pathlib import Path
+from typing import Any, Dict
+from unittest.mock import patch
+
+import pytest
+import yaml
+from aea.helpers.ipfs.base import IPFSHashOnly
+
+from packages.valory.skills.abstract_round_abci.models import MIN_RESET_PAUSE_DURATION
 from packages.valory.skills.abstract_round_abci.test_tools.base import DummyContext
-from packages.celo.skills.celo_swapper.models import SharedState
+from packages.celo.skills.celo_swapper.models import (
+    IpfsPins,
+    LatencyBudget,
+    MarketHistory,
+    MechCache,
+    MechDeliveries,
+    Params,
+    QuoteCache,
+    SharedState,
+    SourceHealth,
+)
 
 
 class TestSharedState:
@@ -30,3 +49,301 @@ class TestSharedState:
         """Test initialization."""
         SharedState(name="", skill_context=DummyContext())
 
+
+class TestParams:
+    """Test Params of CeloSwapper."""
+
+    @staticmethod
+    def params(**overrides: Any) -> Params:
+        """Get the params of the skill.yaml, with some overrides."""
+        config = yaml.safe_load((Path(__file__).parents[1] / "skill.yaml").read_text())
+        args: Dict[str, Any] = dict(config["models"]["params"]["args"], **overrides)
+        return Params(name="params", skill_context=DummyContext(), **args)
+
+    @pytest.mark.parametrize("block_driven_collection", [True, False])
+    def test_reset_pause(self, block_driven_collection: bool) -> None:
+        """Test that new blocks keep the pause between periods at its floor."""
+        params = self.params(block_driven_collection=block_driven_collection)
+        assert params.reset_pause_duration == MIN_RESET_PAUSE_DURATION
+        if block_driven_collection:
+            with pytest.raises(ValueError, match="reset_pause_duration"):
+                self.params(reset_pause_duration=60)
+        else:
+            params = self.params(block_driven_collection=False, reset_pause_duration=60)
+            assert params.reset_pause_duration == 60
+
+    @pytest.mark.parametrize(
+        "block_driven_collection, new_block_timeout, valid",
+        [(True, 10.0, True), (True, 25.0, False), (False, 25.0, True)],
+    )
+    def test_new_block_timeout(
+        self, block_driven_collection: bool, new_block_timeout: float, valid: bool
+    ) -> None:
+        """Test that the wait for a new block leaves the round time to collect."""
+        overrides = dict(
+            block_driven_collection=block_driven_collection,
+            new_block_timeout=new_block_timeout,
+            price_source_timeout=5.0,
+            round_timeout_seconds=30.0,
+        )
+        if valid:
+            assert self.params(**overrides).new_block_timeout == new_block_timeout
+            return
+        with pytest.raises(ValueError, match="new_block_timeout"):
+            self.params(**overrides)
+
+
+class TestQuoteCache:
+    """Test QuoteCache of CeloSwapper."""
+
+    @staticmethod
+    def quote_cache(ttl: int = 60, max_size: int = 2) -> QuoteCache:
+        """Create a quote cache."""
+        return QuoteCache(
+            ttl=ttl,
+            max_size=max_size,
+            amount_precision=2,
+            name="",
+            skill_context=DummyContext(),
+        )
+
+    def test_bucket(self) -> None:
+        """Test that amounts are bucketed by their significant digits."""
+        cache = self.quote_cache()
+        assert cache.bucket(0) == 0
+        assert cache.bucket(7) == 7
+        assert cache.bucket(12345) == 12000
+        assert cache.key("CELO-cUSD", 12999, 5) == ("CELO-cUSD", 12000, 5)
+
+    def test_block_pinning(self) -> None:
+        """Test that quotes are only served for the block they were read at."""
+        cache = self.quote_cache()
+        cache.put("CELO-cUSD", 12345, 5, "quote")
+        assert cache.get("CELO-cUSD", 12001, 5) == "quote"
+        assert cache.get("CELO-cUSD", 12001, 6) is None
+        assert cache.get("CELO-cUSD", 13000, 5) is None
+        assert (cache.hits, cache.misses) == (1, 2)
+
+    def test_lru_eviction(self) -> None:
+        """Test that the least recently used quote is evicted first."""
+        cache = self.quote_cache(max_size=2)
+        cache.put("a", 0, 1, "a")
+        cache.put("b", 0, 1, "b")
+        assert cache.get("a", 0, 1) == "a"
+        cache.put("c", 0, 1, "c")
+        assert len(cache) == 2
+        assert cache.get("b", 0, 1) is None
+        assert cache.get("a", 0, 1) == "a"
+
+    def test_ttl(self) -> None:
+        """Test that quotes expire after the ttl."""
+        cache = self.quote_cache(ttl=10)
+        with patch("time.monotonic", return_value=100.0):
+            cache.put("a", 0, 1, "a")
+        with patch("time.monotonic", return_value=109.0):
+            assert cache.get("a", 0, 1) == "a"
+        with patch("time.monotonic", return_value=110.0):
+            assert cache.get("a", 0, 1) is None
+        assert len(cache) == 0
+
+
+class TestMarketHistory:
+    """Test MarketHistory of CeloSwapper."""
+
+    def test_store(self, tmp_path: Path) -> None:
+        """Test that a store is opened once per pair."""
+        history = MarketHistory(
+            history_dir=str(tmp_path),
+            candle_interval=60,
+            name="",
+            skill_context=DummyContext(),
+        )
+        store = history.store("CELO-cUSD")
+        assert history.store("CELO-cUSD") is store
+        assert store.interval == 60
+        assert (tmp_path / "CELO-cUSD.ohlcv").exists()
+
+    def test_indicators(self, tmp_path: Path) -> None:
+        """Test that an indicator engine is kept per pair and period."""
+        history = MarketHistory(
+            history_dir=str(tmp_path),
+            candle_interval=60,
+            name="",
+            skill_context=DummyContext(),
+        )
+        engine = history.indicators("CELO-cUSD", 20)
+        assert history.indicators("CELO-cUSD", 20) is engine
+        assert history.indicators("CELO-cUSD", 10).period == 10
+        assert history.indicators("CELO-cUSD", 20) is engine
+
+
+class TestLatencyBudget:
+    """Test LatencyBudget of CeloSwapper."""
+
+    def test_degradation(self) -> None:
+        """Test that the evaluation is degraded while slow, with periodic probes."""
+        budget = LatencyBudget(
+            budget=0.5,
+            window=3,
+            probe_interval=2,
+            name="",
+            skill_context=DummyContext(),
+        )
+        latency: Dict[str, Any] = {}
+        assert not budget.is_exceeded(latency, 10.0)
+        latency = budget.record(latency, 4.0, False)
+        latency = budget.record(latency, 6.0, False)
+        assert not budget.is_exceeded(latency, 10.0)
+        latency = budget.record(latency, 7.0, False)
+        assert budget.is_exceeded(latency, 10.0)
+        latency = budget.record(latency, None, True)
+        assert budget.is_exceeded(latency, 10.0)
+        latency = budget.record(latency, None, True)
+        assert latency == dict(durations=[4.0, 6.0, 7.0], degraded_runs=2)
+        # a full evaluation is probed after `probe_interval` degraded ones
+        assert not budget.is_exceeded(latency, 10.0)
+        # a full evaluation without a duration leaves the latency as it was
+        assert budget.record(latency, None, False) == latency
+        latency = budget.record(latency, 2.0, False)
+        latency = budget.record(latency, 2.0, False)
+        assert latency == dict(durations=[7.0, 2.0, 2.0], degraded_runs=0)
+        assert not budget.is_exceeded(latency, 10.0)
+
+
+class TestIpfsPins:
+    """Test IpfsPins of CeloSwapper."""
+
+    def test_pins(self, tmp_path: Path) -> None:
+        """Test that hashes match the node's and the least recently used are evicted."""
+        pins = IpfsPins(max_size=2, name="", skill_context=DummyContext())
+        path = tmp_path / "metadata.json"
+        path.write_text('{"prompt": "?"}')
+        ipfs_hash = pins.content_hash(str(path), path.read_text())
+        assert ipfs_hash == IPFSHashOnly.get(str(path), wrap=True, cid_v1=False)
+        pins.add("a")
+        pins.add("b")
+        assert "a" in pins
+        pins.add("c")
+        assert len(pins) == 2
+        assert "b" not in pins and "a" in pins and "c" in pins
+
+
+class TestMechCache:
+    """Test MechCache of CeloSwapper."""
+
+    @staticmethod
+    def mech_cache(ttl_periods: int = 3, max_size: int = 2) -> MechCache:
+        """Create a mech cache."""
+        return MechCache(
+            ttl_periods=ttl_periods,
+            max_size=max_size,
+            bucket_width=0.1,
+            name="",
+            skill_context=DummyContext(),
+        )
+
+    def test_key(self) -> None:
+        """Test that close scores of a pair share their key."""
+        mech_cache = self.mech_cache()
+        key = mech_cache.key("CELO-cUSD", 0.3, "tool")
+        assert key == mech_cache.key("CELO-cUSD", 0.32, "tool")
+        assert key != mech_cache.key("CELO-cUSD", 0.36, "tool")
+        assert key != mech_cache.key("CELO-cUSD", 0.31, "other-tool")
+
+    def test_ttl_and_eviction(self) -> None:
+        """Test that results expire after some periods and the oldest are evicted."""
+        mech_cache = self.mech_cache()
+        cache = mech_cache.put({}, {"a": 1}, 0)
+        cache = mech_cache.put(cache, {"b": 2}, 1)
+        assert mech_cache.get(cache, "a", 2) == 1
+        assert mech_cache.get(cache, "a", 3) is None
+        assert mech_cache.get(cache, "c", 2) is None
+        cache = mech_cache.put(cache, {"c": 3}, 2)
+        assert cache == {
+            "b": dict(period=1, result=2),
+            "c": dict(period=2, result=3),
+        }
+        # the expired entries are dropped, the lowest keys kept on ties
+        assert mech_cache.put(cache, {"e": 5, "d": 4}, 4) == {
+            "d": dict(period=4, result=4),
+            "e": dict(period=4, result=5),
+        }
+        assert mech_cache.put(cache, {}, 5) == {}
+
+
+class TestMechDeliveries:
+    """Test MechDeliveries of CeloSwapper."""
+
+    def test_initialization(self) -> None:
+        """Test that the tracker polls in chunks of the configured size."""
+        deliveries = MechDeliveries(
+            mech_address="0x0000000000000000000000000000000000000002",
+            chunk_size=100,
+            name="",
+            skill_context=DummyContext(),
+        )
+        assert deliveries.tracker.chunk_size == 100
+        assert deliveries.tracker.outstanding == []
+
+
+class TestSourceHealth:
+    """Test SourceHealth of CeloSwapper."""
+
+    @staticmethod
+    def source_health() -> SourceHealth:
+        """Create a health registry."""
+        return SourceHealth(
+            window=4,
+            failure_threshold=2,
+            cooldown=30.0,
+            timeout_slack=2.0,
+            name="",
+            skill_context=DummyContext(),
+        )
+
+    def test_rank(self) -> None:
+        """Test that sources are ranked fastest-first, unmeasured ones last."""
+        health = self.source_health()
+        health.record("slow", 3.0, True)
+        health.record("fast", 1.0, True)
+        health.record("flaky", 1.0, True)
+        health.record("flaky", 1.0, False)
+        health.record_straggler("late", 5.0)
+        assert health.rank(["slow", "fast", "flaky", "new", "late"]) == [
+            "fast",
+            "flaky",
+            "slow",
+            "late",
+            "new",
+        ]
+        assert health.error_rate("flaky") == 0.5
+        assert health.error_rate("late") == 0.0
+        assert health.latency("new") == float("inf")
+
+    def test_circuit_breaker(self) -> None:
+        """Test that a failing source is left out until its cooldown ends."""
+        health = self.source_health()
+        with patch("time.monotonic", return_value=100.0):
+            health.record("a", 1.0, False)
+            assert not health.is_open("a")
+            health.record("a", 1.0, False)
+            assert health.rank(["a", "b"]) == ["b"]
+        with patch("time.monotonic", return_value=131.0):
+            # half-open: the source is tried again, and a failure opens it again
+            assert health.rank(["a"]) == ["a"]
+            health.record("a", 1.0, False)
+            assert health.is_open("a")
+            health.record("a", 1.0, True)
+            assert not health.is_open("a")
+
+    def test_timeout(self) -> None:
+        """Test that the wait is bounded by the latency of the quorum."""
+        health = self.source_health()
+        assert health.timeout(["a", "b"], 2, 10.0) == 10.0
+        health.record("a", 1.0, True)
+        assert health.timeout(["a", "b"], 2, 10.0) == 10.0
+        health.record("b", 2.0, True)
+        assert health.timeout(["a", "b"], 2, 10.0) == 4.0
+        assert health.timeout(["a", "b"], 1, 10.0) == 2.0
+        health.record("b", 8.0, True)
+        assert health.timeout(["a", "b"], 2, 10.0) == 10.0
@@ -27,7 +27,6 @@ import pytest
 from packages.celo.skills.celo_swapper.payloads import (
     BaseTxPayload,
     DecisionMakingPayload,
-    FinishedDecisionMakingPayload,
     MarketDataCollectionPayload,
     MechRequestPreparationPayload,
     StrategyEvaluationPayload,
@@ -44,8 +43,16 @@ class PayloadTestCase:
     content: Hashable
 
 
-# TODO: provide test cases
-@pytest.mark.parametrize("test_case", [])
+@pytest.mark.parametrize(
+    "test_case",
+    [
+        PayloadTestCase(
+            name="MarketDataCollectionPayload",
+            payload_cls=MarketDataCollectionPayload,
+            content='{"block_number": 1, "pairs": {}}',
+        ),
+    ],
+)
 def test_payloads(test_case: PayloadTestCase) -> None:
     """Tests for CeloSwapperAbciApp payloads"""
 
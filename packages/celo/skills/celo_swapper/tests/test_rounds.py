@@ -19,39 +19,42 @@
 
 """This package contains the tests for rounds of CeloSwapper."""
 
-from typing import Any, Type, Dict, List, Callable, Hashable, Mapping
+import hashlib
+import json
+from typing import Any, Type, Dict, List, Callable, Hashable, Mapping, Optional
 from dataclasses import dataclass, field
+from unittest.mock import MagicMock
 
 import pytest
 
+from packages.celo.skills.celo_swapper.models import LatencyBudget, MechCache
 from packages.celo.skills.celo_swapper.payloads import (
     DecisionMakingPayload,
-    FinishedDecisionMakingPayload,
     MarketDataCollectionPayload,
     MechRequestPreparationPayload,
     StrategyEvaluationPayload,
     SwapPreparationPayload,
 )
 from packages.celo.skills.celo_swapper.rounds import (
-    AbstractRound,
     Event,
     SynchronizedData,
     DecisionMakingRound,
-    FinishedDecisionMakingRound,
     MarketDataCollectionRound,
     MechRequestPreparationRound,
     StrategyEvaluationRound,
     SwapPreparationRound,
 )
 from packages.valory.skills.abstract_round_abci.base import (
+    AbstractRound,
     BaseTxPayload,
 )
+from packages.valory.skills.abstract_round_abci.test_tools.base import DummyContext
 from packages.valory.skills.abstract_round_abci.test_tools.rounds import (
+    get_participants,
     BaseRoundTestClass,
-    BaseOnlyKeeperSendsRoundTest,
     BaseCollectDifferentUntilThresholdRoundTest,
     BaseCollectSameUntilThresholdRoundTest,
- )
+)
 
 
 @dataclass
@@ -68,12 +71,30 @@ class RoundTestCase:
 
 
 MAX_PARTICIPANTS: int = 4
+PARAMS = MagicMock(
+    aggregation_mad_threshold=3.0,
+    aggregation_tolerance=0.001,
+    mech_confirmation_threshold=0.6,
+    mech_signal_threshold=0.2,
+    max_swaps_per_period=2,
+    round_timeout_seconds=30.0,
+    swap_signal_threshold=0.5,
+)
+LATENCY_BUDGET = LatencyBudget(
+    budget=0.5, window=2, probe_interval=2, name="", skill_context=DummyContext()
+)
+MECH_CACHE = MechCache(
+    ttl_periods=3, max_size=2, bucket_width=0.1, name="", skill_context=DummyContext()
+)
+
+
+STRONGEST_PAIRS = json.dumps(["CELO-cUSD"])
 
 
 class BaseCeloSwapperRoundTest(BaseRoundTestClass):
     """Base test class for CeloSwapper rounds."""
 
-    round_cls: Type[AbstractRound]
+    round_class: Type[AbstractRound]
     synchronized_data: SynchronizedData
     _synchronized_data_class = SynchronizedData
     _event_class = Event
@@ -83,8 +104,11 @@ class BaseCeloSwapperRoundTest(BaseRoundTestClass):
 
         self.synchronized_data.update(**test_case.initial_data)
 
-        test_round = self.round_cls(
+        test_round = self.round_class(
             synchronized_data=self.synchronized_data,
+            context=MagicMock(
+                params=PARAMS, latency_budget=LATENCY_BUDGET, mech_cache=MECH_CACHE
+            ),
         )
 
         self._complete_run(
@@ -99,80 +123,544 @@ class BaseCeloSwapperRoundTest(BaseRoundTestClass):
         )
 
 
-class TestDecisionMakingRound(BaseCeloSwapperRoundTest):
-    """Tests for DecisionMakingRound."""
+def get_market_data_payloads(
+    prices: List[Optional[Dict[str, float]]],
+    content: Optional[str] = None,
+    digest: Optional[str] = None,
+    ipfs_hash: Optional[str] = None,
+    block_number: Optional[int] = None,
+) -> Mapping[str, BaseTxPayload]:
+    """Get the market data payloads, with the given prices for every participant."""
+    return {
+        participant: MarketDataCollectionPayload(
+            participant,
+            content,
+            digest,
+            ipfs_hash,
+            None if participant_prices is None else json.dumps(participant_prices),
+            block_number,
+        )
+        for participant, participant_prices in zip(sorted(get_participants()), prices)
+    }
 
-    round_class = DecisionMakingRound
 
-    # TODO: provide test cases
-    @pytest.mark.parametrize("test_case", [])
+MARKET_DATA = json.dumps(
+    dict(
+        block_number=1,
+        pairs={"CELO-cUSD": dict(reserves=[1, 2])},
+    ),
+    sort_keys=True,
+)
+MARKET_DATA_DIGEST = hashlib.sha256(MARKET_DATA.encode()).hexdigest()
+OTHER_MARKET_DATA = MARKET_DATA.replace("[1, 2]", "[1, 3]")
+OTHER_MARKET_DATA_DIGEST = hashlib.sha256(OTHER_MARKET_DATA.encode()).hexdigest()
+MARKET_DATA_IPFS_HASH = "bafybeihvxq6bycqcvqpbhd5w3ecqrzq2gd3asoul5ffhrhbfdlwb6ujsaq"
+PRICES = [
+    {"CELO-cUSD": 2.0, "cEUR-cUSD": 1.1},
+    {"CELO-cUSD": 2.0001, "cEUR-cUSD": 1.1},
+    {"CELO-cUSD": 9.0},
+    {"CELO-cUSD": 1.9999, "cEUR-cUSD": 1.2},
+]
+MARKET_DATA_CHECKS = [
+    lambda synchronized_data: synchronized_data.market_prices,
+    lambda synchronized_data: synchronized_data.market_data,
+    lambda synchronized_data: synchronized_data.market_data_digest,
+    lambda synchronized_data: synchronized_data.market_data_ipfs_hash,
+    lambda synchronized_data: synchronized_data.market_data_block,
+    lambda synchronized_data: synchronized_data.indexed_block,
+]
+
+
+class TestMarketDataCollectionRound(
+    BaseCeloSwapperRoundTest, BaseCollectDifferentUntilThresholdRoundTest
+):
+    """Tests for MarketDataCollectionRound."""
+
+    round_class = MarketDataCollectionRound
+
+    @pytest.mark.parametrize(
+        "test_case",
+        [
+            RoundTestCase(
+                name="Happy path",
+                initial_data={},
+                payloads=get_market_data_payloads(
+                    PRICES, MARKET_DATA, MARKET_DATA_DIGEST, block_number=1
+                ),
+                final_data=dict(
+                    market_prices=json.dumps(
+                        {"CELO-cUSD": 2.0, "cEUR-cUSD": 1.1}, sort_keys=True
+                    ),
+                    market_data=MARKET_DATA,
+                    market_data_digest=MARKET_DATA_DIGEST,
+                    market_data_ipfs_hash=None,
+                    market_data_block=1,
+                    indexed_block=1,
+                ),
+                event=Event.DONE,
+                synchronized_data_attr_checks=MARKET_DATA_CHECKS,
+            ),
+            RoundTestCase(
+                name="Content-addressed",
+                initial_data={},
+                payloads=get_market_data_payloads(
+                    PRICES, None, MARKET_DATA_DIGEST, MARKET_DATA_IPFS_HASH
+                ),
+                final_data=dict(
+                    market_prices=json.dumps(
+                        {"CELO-cUSD": 2.0, "cEUR-cUSD": 1.1}, sort_keys=True
+                    ),
+                    market_data=None,
+                    market_data_digest=MARKET_DATA_DIGEST,
+                    market_data_ipfs_hash=MARKET_DATA_IPFS_HASH,
+                    market_data_block=None,
+                    indexed_block=None,
+                ),
+                event=Event.DONE,
+                synchronized_data_attr_checks=MARKET_DATA_CHECKS,
+            ),
+            RoundTestCase(
+                name="Tied snapshots",
+                initial_data={},
+                payloads={
+                    participant: MarketDataCollectionPayload(
+                        participant, content, digest, ipfs_hash, json.dumps(prices), 1
+                    )
+                    for participant, (content, digest, ipfs_hash), prices in zip(
+                        sorted(get_participants(), reverse=True),
+                        [
+                            (MARKET_DATA, MARKET_DATA_DIGEST, None),
+                            (OTHER_MARKET_DATA, OTHER_MARKET_DATA_DIGEST, None),
+                            (MARKET_DATA, MARKET_DATA_DIGEST, None),
+                            (None, OTHER_MARKET_DATA_DIGEST, MARKET_DATA_IPFS_HASH),
+                        ],
+                        PRICES,
+                    )
+                },
+                # two agents sent each digest, the lowest one is kept, through IPFS
+                final_data=dict(
+                    market_prices=json.dumps(
+                        {"CELO-cUSD": 2.0, "cEUR-cUSD": 1.1}, sort_keys=True
+                    ),
+                    market_data=None,
+                    market_data_digest=OTHER_MARKET_DATA_DIGEST,
+                    market_data_ipfs_hash=MARKET_DATA_IPFS_HASH,
+                    market_data_block=1,
+                    indexed_block=1,
+                ),
+                event=Event.DONE,
+                synchronized_data_attr_checks=MARKET_DATA_CHECKS,
+            ),
+            RoundTestCase(
+                name="No prices",
+                initial_data=dict(indexed_block=3, strongest_pairs=STRONGEST_PAIRS),
+                payloads=get_market_data_payloads([None] * MAX_PARTICIPANTS),
+                final_data=dict(indexed_block=3, strongest_pairs=STRONGEST_PAIRS),
+                event=Event.NO_MAJORITY,
+                synchronized_data_attr_checks=[
+                    lambda synchronized_data: synchronized_data.indexed_block,
+                    # the keys persisted across periods are carried over
+                    lambda synchronized_data: synchronized_data.strongest_pairs,
+                ],
+            ),
+        ],
+    )
     def test_run(self, test_case: RoundTestCase) -> None:
         """Run tests."""
 
         self.run_test(test_case)
 
 
-class TestFinishedDecisionMakingRound(BaseCeloSwapperRoundTest):
-    """Tests for FinishedDecisionMakingRound."""
+MECH_REQUESTS = json.dumps(
+    [dict(prompt="Will CELO-cUSD go up?", tool="prediction-online", nonce="a")]
+)
+MECH_REQUEST_PAIRS = json.dumps({"a": "CELO-cUSD"})
+CACHED_RESULTS = json.dumps({"cEUR-cUSD": "no"})
+MECH_REQUEST_HASHES = json.dumps({"a": "QmMetadata"})
 
-    round_class = FinishedDecisionMakingRound
 
-    # TODO: provide test cases
-    @pytest.mark.parametrize("test_case", [])
-    def test_run(self, test_case: RoundTestCase) -> None:
-        """Run tests."""
+def p_yes(probability: float) -> str:
+    """Get the prediction of a mech that the price will be higher."""
+    return json.dumps(dict(p_yes=probability, p_no=1.0 - probability))
 
-        self.run_test(test_case)
 
+class TestMechRequestPreparationRound(
+    BaseCeloSwapperRoundTest, BaseCollectSameUntilThresholdRoundTest
+):
+    """Tests for MechRequestPreparationRound."""
 
-class TestMarketDataCollectionRound(BaseCeloSwapperRoundTest):
-    """Tests for MarketDataCollectionRound."""
-
-    round_class = MarketDataCollectionRound
+    round_class = MechRequestPreparationRound
 
-    # TODO: provide test cases
-    @pytest.mark.parametrize("test_case", [])
+    @pytest.mark.parametrize(
+        "test_case",
+        [
+            RoundTestCase(
+                name=name,
+                initial_data=dict(
+                    mech_responses=json.dumps(
+                        [dict(nonce="a", result="yes"), dict(nonce="b", result="no")]
+                    )
+                ),
+                payloads={
+                    participant: MechRequestPreparationPayload(participant, *values)
+                    for participant in get_participants()
+                },
+                final_data=final_data,
+                event=event,
+                synchronized_data_attr_checks=[
+                    lambda synchronized_data: synchronized_data.mech_requests,
+                    lambda synchronized_data: synchronized_data.mech_cached_results,
+                    lambda synchronized_data: synchronized_data.mech_request_hashes,
+                ],
+                kwargs=dict(most_voted_payload=values[0]),
+            )
+            for name, values, final_data, event in (
+                (
+                    "Batch",
+                    (MECH_REQUESTS, MECH_REQUEST_PAIRS, None, MECH_REQUEST_HASHES),
+                    dict(
+                        mech_requests=MECH_REQUESTS,
+                        mech_request_pairs=MECH_REQUEST_PAIRS,
+                        mech_cached_results=None,
+                        mech_request_hashes=MECH_REQUEST_HASHES,
+                    ),
+                    Event.DONE,
+                ),
+                (
+                    "Partly cached",
+                    (MECH_REQUESTS, MECH_REQUEST_PAIRS, CACHED_RESULTS),
+                    dict(
+                        mech_requests=MECH_REQUESTS,
+                        mech_request_pairs=MECH_REQUEST_PAIRS,
+                        mech_cached_results=CACHED_RESULTS,
+                    ),
+                    Event.DONE,
+                ),
+                (
+                    "All cached",
+                    (None, None, CACHED_RESULTS),
+                    dict(
+                        mech_requests=None,
+                        mech_request_pairs=None,
+                        mech_cached_results=CACHED_RESULTS,
+                    ),
+                    Event.CACHED,
+                ),
+                ("Nothing to ask", (None, None, None), {}, Event.DONE),
+            )
+        ],
+    )
     def test_run(self, test_case: RoundTestCase) -> None:
         """Run tests."""
 
         self.run_test(test_case)
 
+    def test_outstanding(self) -> None:
+        """Test skipping to the decision when the pairs wait for earlier requests."""
+
+        self.run_test(
+            RoundTestCase(
+                name="Outstanding",
+                initial_data=dict(mech_outstanding=json.dumps({"7": PENDING_CELO})),
+                payloads={
+                    participant: MechRequestPreparationPayload(participant, None)
+                    for participant in get_participants()
+                },
+                final_data={},
+                event=Event.CACHED,
+                kwargs=dict(most_voted_payload=None),
+            )
+        )
 
-class TestMechRequestPreparationRound(BaseCeloSwapperRoundTest):
-    """Tests for MechRequestPreparationRound."""
 
-    round_class = MechRequestPreparationRound
+MECH_SCORES = json.dumps({"CELO-cUSD": 0.3, "cEUR-cUSD": -0.4})
+CACHED_CEUR = MECH_CACHE.key("cEUR-cUSD", -0.4, "prediction-online")
+DELIVERED_CELO = MECH_CACHE.key("CELO-cUSD", 0.3, "prediction-online")
+PENDING_CELO = dict(
+    pair="CELO-cUSD", score=0.3, tool="prediction-online", block=101, period=0
+)
+
 
-    # TODO: provide test cases
-    @pytest.mark.parametrize("test_case", [])
+def get_decision_making_test_case(  # pylint: disable=too-many-arguments
+    name: str,
+    initial_data: Dict[str, Hashable],
+    deliveries: Dict[str, Any],
+    results: Dict[str, str],
+    outstanding: Dict[str, Any],
+    swap_candidates: List[str],
+    cache: Dict[str, Any],
+    event: Event,
+) -> RoundTestCase:
+    """Get a test case of the decision, every agent sending the same deliveries."""
+    payload = json.dumps(deliveries, sort_keys=True)
+    return RoundTestCase(
+        name=name,
+        initial_data=dict(
+            strategy_scores=MECH_SCORES,
+            market_data_block=100,
+            mech_cache=json.dumps({CACHED_CEUR: dict(period=0, result=p_yes(0.1))}),
+            **initial_data,
+        ),
+        payloads={
+            participant: DecisionMakingPayload(participant, payload)
+            for participant in get_participants()
+        },
+        final_data=dict(
+            mech_results=json.dumps(results, sort_keys=True),
+            mech_outstanding=json.dumps(outstanding, sort_keys=True),
+            swap_candidates=json.dumps(swap_candidates),
+            mech_cache=json.dumps(cache, sort_keys=True),
+        ),
+        event=event,
+        synchronized_data_attr_checks=[
+            lambda synchronized_data: synchronized_data.mech_results,
+            lambda synchronized_data: synchronized_data.mech_outstanding,
+            lambda synchronized_data: synchronized_data.swap_candidates,
+            lambda synchronized_data: synchronized_data.mech_cache,
+        ],
+        kwargs=dict(most_voted_payload=payload),
+    )
+
+
+class TestDecisionMakingRound(
+    BaseCeloSwapperRoundTest, BaseCollectSameUntilThresholdRoundTest
+):
+    """Tests for DecisionMakingRound."""
+
+    round_class = DecisionMakingRound
+
+    @pytest.mark.parametrize(
+        "test_case",
+        [
+            get_decision_making_test_case(
+                "Answered with the batch",
+                dict(
+                    mech_requests=MECH_REQUESTS,
+                    mech_request_pairs=MECH_REQUEST_PAIRS,
+                    mech_responses=json.dumps(
+                        [dict(nonce="a", requestId="7", result=p_yes(0.8))]
+                    ),
+                    mech_cached_results=json.dumps({"cEUR-cUSD": p_yes(0.1)}),
+                ),
+                {},
+                {"CELO-cUSD": p_yes(0.8), "cEUR-cUSD": p_yes(0.1)},
+                {},
+                ["cEUR-cUSD", "CELO-cUSD"],
+                {
+                    CACHED_CEUR: dict(period=0, result=p_yes(0.1)),
+                    DELIVERED_CELO: dict(period=0, result=p_yes(0.8)),
+                },
+                Event.SWAP,
+            ),
+            get_decision_making_test_case(
+                "Not delivered yet",
+                dict(
+                    mech_requests=MECH_REQUESTS,
+                    mech_request_pairs=MECH_REQUEST_PAIRS,
+                    mech_responses=json.dumps(
+                        [dict(nonce="a", requestId="7", result=None)]
+                    ),
+                ),
+                {},
+                {},
+                {"7": PENDING_CELO},
+                [],
+                {CACHED_CEUR: dict(period=0, result=p_yes(0.1))},
+                Event.DONE,
+            ),
+            get_decision_making_test_case(
+                "Not confirmed",
+                dict(mech_outstanding=json.dumps({"7": PENDING_CELO})),
+                {"7": p_yes(0.5)},
+                {"CELO-cUSD": p_yes(0.5)},
+                {},
+                [],
+                {
+                    CACHED_CEUR: dict(period=0, result=p_yes(0.1)),
+                    DELIVERED_CELO: dict(period=0, result=p_yes(0.5)),
+                },
+                Event.DONE,
+            ),
+            get_decision_making_test_case(
+                "Delivered for an unknown request",
+                dict(mech_outstanding=json.dumps({"7": PENDING_CELO})),
+                {"8": p_yes(0.9)},
+                {},
+                {"7": PENDING_CELO},
+                [],
+                {CACHED_CEUR: dict(period=0, result=p_yes(0.1))},
+                Event.DONE,
+            ),
+        ],
+    )
     def test_run(self, test_case: RoundTestCase) -> None:
         """Run tests."""
 
         self.run_test(test_case)
 
+    @pytest.mark.parametrize(
+        "periods, deliveries, results, swap_candidates, cache, event",
+        [
+            # the result of a request sent in period N is used in period N+1
+            (
+                1,
+                {"7": p_yes(0.9)},
+                {"CELO-cUSD": p_yes(0.9)},
+                ["CELO-cUSD"],
+                {
+                    CACHED_CEUR: dict(period=0, result=p_yes(0.1)),
+                    DELIVERED_CELO: dict(period=1, result=p_yes(0.9)),
+                },
+                Event.SWAP,
+            ),
+            # the requests as old as the mech cache are dropped, like its entries
+            (3, {}, {}, [], {}, Event.DONE),
+        ],
+    )
+    def test_late_delivery(  # pylint: disable=too-many-arguments
+        self,
+        periods: int,
+        deliveries: Dict[str, Any],
+        results: Dict[str, str],
+        swap_candidates: List[str],
+        cache: Dict[str, Any],
+        event: Event,
+    ) -> None:
+        """Test that a result delivered after the period of its request is used."""
+
+        for _ in range(periods):
+            self.synchronized_data.db.create()
+        self.run_test(
+            get_decision_making_test_case(
+                "Delivered in a later period",
+                dict(mech_outstanding=json.dumps({"7": PENDING_CELO})),
+                deliveries,
+                results,
+                {},
+                swap_candidates,
+                cache,
+                event,
+            )
+        )
 
-class TestStrategyEvaluationRound(BaseCeloSwapperRoundTest):
+
+def get_strategy_evaluation_payloads(
+    score: float, duration: Optional[float] = None
+) -> Mapping[str, BaseTxPayload]:
+    """Get the strategy evaluation payloads, all agents scoring a pair around `score`."""
+    return {
+        participant: StrategyEvaluationPayload(
+            participant,
+            json.dumps({"CELO-cUSD": score + i * 1e-6}),
+            None if duration is None else duration + i,
+        )
+        for i, participant in enumerate(sorted(get_participants()))
+    }
+
+
+class TestStrategyEvaluationRound(
+    BaseCeloSwapperRoundTest, BaseCollectDifferentUntilThresholdRoundTest
+):
     """Tests for StrategyEvaluationRound."""
 
     round_class = StrategyEvaluationRound
 
-    # TODO: provide test cases
-    @pytest.mark.parametrize("test_case", [])
+    @pytest.mark.parametrize(
+        "test_case",
+        [
+            RoundTestCase(
+                name=name,
+                initial_data=dict(strategy_latency=json.dumps(latency)),
+                payloads=get_strategy_evaluation_payloads(score, duration),
+                final_data=dict(
+                    strategy_scores=json.dumps({"CELO-cUSD": score + 1.5e-6}),
+                    swap_candidates=json.dumps(swaps),
+                    strategy_latency=json.dumps(recorded),
+                    strongest_pairs=json.dumps(["CELO-cUSD"]),
+                ),
+                event=event,
+                synchronized_data_attr_checks=[
+                    lambda synchronized_data: synchronized_data.strategy_scores,
+                    lambda synchronized_data: synchronized_data.swap_candidates,
+                    lambda synchronized_data: synchronized_data.strategy_latency,
+                    lambda synchronized_data: synchronized_data.strongest_pairs,
+                ],
+            )
+            for name, score, duration, latency, recorded, swaps, event in (
+                (
+                    "Strong signal",
+                    -0.7,
+                    1.0,
+                    dict(durations=[2.0], degraded_runs=0),
+                    # the median of the durations sent by the agents is recorded
+                    dict(durations=[2.0, 2.5], degraded_runs=0),
+                    ["CELO-cUSD"],
+                    Event.SWAP,
+                ),
+                (
+                    "Weak signal, degraded",
+                    0.3,
+                    None,
+                    dict(durations=[20.0], degraded_runs=0),
+                    dict(durations=[20.0], degraded_runs=1),
+                    [],
+                    Event.MECH,
+                ),
+                (
+                    "No signal",
+                    0.01,
+                    None,
+                    {},
+                    dict(durations=[], degraded_runs=0),
+                    [],
+                    Event.DONE,
+                ),
+            )
+        ],
+    )
     def test_run(self, test_case: RoundTestCase) -> None:
         """Run tests."""
 
         self.run_test(test_case)
 
 
-class TestSwapPreparationRound(BaseCeloSwapperRoundTest):
+SWAP_ORDERS = json.dumps(
+    [dict(pair="CELO-cUSD", zero_for_one=True, amount_in=1000, min_amount_out=1982)],
+    sort_keys=True,
+)
+
+
+class TestSwapPreparationRound(
+    BaseCeloSwapperRoundTest, BaseCollectSameUntilThresholdRoundTest
+):
     """Tests for SwapPreparationRound."""
 
     round_class = SwapPreparationRound
 
-    # TODO: provide test cases
-    @pytest.mark.parametrize("test_case", [])
+    @pytest.mark.parametrize(
+        "test_case",
+        [
+            RoundTestCase(
+                name=name,
+                initial_data={},
+                payloads={
+                    participant: SwapPreparationPayload(participant, orders)
+                    for participant in get_participants()
+                },
+                final_data=final_data,
+                event=Event.DONE,
+                synchronized_data_attr_checks=[
+                    lambda synchronized_data: synchronized_data.swap_orders,
+                ],
+                kwargs=dict(most_voted_payload=orders),
+            )
+            for name, orders, final_data in (
+                ("Swap", SWAP_ORDERS, dict(swap_orders=SWAP_ORDERS)),
+                ("No quote", None, {}),
+            )
+        ],
+    )
     def test_run(self, test_case: RoundTestCase) -> None:
         """Run tests."""
 
         self.run_test(test_case)
-
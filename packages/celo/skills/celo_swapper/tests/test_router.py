@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Test the router.py module of the CeloSwapper."""
+
+from typing import Dict, List
+
+import numpy as np
+import pytest
+
+from packages.celo.skills.celo_swapper.router import (
+    RouteIndex,
+    allocate,
+    pair_tokens,
+    quote_route,
+    route_curve,
+)
+
+
+CELO_CUSD = dict(name="CELO-cUSD", pool="0xAa", pool_type="v2")
+CEUR_CUSD = dict(name="cEUR-cUSD", pool="0xBb", pool_type="v2")
+CELO_CEUR = dict(name="CELO-cEUR", pool="0xCc", pool_type="v2")
+CREAL_CEUR = dict(name="cREAL-cEUR", pool="0xDd", pool_type="v2")
+STATES = {
+    "CELO-cUSD": dict(reserves=[10**6, 2 * 10**6, 1]),
+    "cEUR-cUSD": dict(reserves=[10**6, 10**6, 1]),
+    "CELO-cEUR": dict(reserves=[10**6, 10**6, 1]),
+    "cREAL-cEUR": dict(reserves=[10**6, 10**6, 1]),
+}
+TWIN = dict(
+    name="cEUR-cUSD-2", pool="0xFf", pool_type="v2", token0="cEUR", token1="cUSD"
+)
+TWIN_STATES = {
+    "cEUR-cUSD": dict(reserves=[10**6, 10**6, 1]),
+    "cEUR-cUSD-2": dict(reserves=[10**6, 2 * 10**6, 1]),
+}
+
+
+def test_pair_tokens() -> None:
+    """Test getting the tokens of a pair from its tokens or its name."""
+    assert pair_tokens(CELO_CUSD) == ("CELO", "cUSD")
+    assert pair_tokens(dict(CELO_CUSD, token0="0x01", token1="0x02")) == (
+        "0x01",
+        "0x02",
+    )
+
+
+def test_update() -> None:
+    """Test that updates only touch the pairs that changed."""
+    index = RouteIndex()
+    assert index.update([CELO_CUSD, CEUR_CUSD]) == 2
+    assert sorted(index.adjacency) == ["CELO", "cEUR", "cUSD"]
+    assert [hop.pair for hop in index.adjacency["cUSD"]] == ["CELO-cUSD", "cEUR-cUSD"]
+    assert index.update([CELO_CUSD, CEUR_CUSD]) == 0
+
+    moved = dict(CEUR_CUSD, pool="0xEe")
+    assert index.update([CELO_CUSD, moved, CELO_CEUR]) == 2
+    assert [hop.pool for hop in index.adjacency["cEUR"]] == ["0xCc", "0xEe"]
+
+    assert index.update([CELO_CEUR]) == 2
+    assert sorted(index.adjacency) == ["CELO", "cEUR"]
+    assert index.update([]) == 1
+    assert index.adjacency == {}
+
+
+@pytest.mark.parametrize(
+    "max_hops, states, expected_pairs, expected_amounts",
+    [
+        (1, STATES, ["CELO-cUSD"], [1000, 498]),
+        (2, STATES, ["cEUR-cUSD", "CELO-cEUR"], [1000, 996, 992]),
+        (3, STATES, ["cEUR-cUSD", "CELO-cEUR"], [1000, 996, 992]),
+        # the pools without a state are routed around
+        (
+            2,
+            {name: STATES[name] for name in ("CELO-cUSD", "CELO-cEUR")},
+            ["CELO-cUSD"],
+            [1000, 498],
+        ),
+        (2, {"CELO-cUSD": dict(reserves=None, slot0=None)}, None, None),
+    ],
+)
+def test_best_route(
+    max_hops: int,
+    states: Dict,
+    expected_pairs: List[str],
+    expected_amounts: List[int],
+) -> None:
+    """Test finding the route that swaps the most out."""
+    index = RouteIndex()
+    index.update([CELO_CUSD, CEUR_CUSD, CELO_CEUR, CREAL_CEUR])
+    route = index.best_route("cUSD", "CELO", 1000, states, max_hops, 30)
+    if expected_pairs is None:
+        assert route is None
+        return
+    assert route is not None
+    assert [hop.pair for hop in route.hops] == expected_pairs
+    assert list(route.amounts) == expected_amounts
+    assert route.amount_in == 1000
+    assert route.amount_out == expected_amounts[-1]
+    assert [hop["amount_out"] for hop in route.to_json()] == expected_amounts[1:]
+    # no route goes through a token twice
+    tokens = [route.hops[0].token_in] + [hop.token_out for hop in route.hops]
+    assert len(set(tokens)) == len(tokens)
+
+
+def test_best_route_ties() -> None:
+    """Test that equally good routes are broken by their number of hops, then names."""
+    index = RouteIndex()
+    twin = dict(CELO_CUSD, name="CELO-cUSD-2", token0="CELO", token1="cUSD")
+    index.update([twin, CELO_CUSD])
+    states = {"CELO-cUSD": STATES["CELO-cUSD"], "CELO-cUSD-2": STATES["CELO-cUSD"]}
+    route = index.best_route("CELO", "cUSD", 1000, states, 2, 30)
+    assert route is not None
+    assert [hop.pair for hop in route.hops] == ["CELO-cUSD"]
+    assert index.best_route("CELO", "cREAL", 1000, states, 3, 30) is None
+
+
+def test_route_curve() -> None:
+    """Test that the curve of a route follows its exact quotes."""
+    index = RouteIndex()
+    index.update([CELO_CUSD, CEUR_CUSD, CELO_CEUR])
+    route = index.best_route("cUSD", "CELO", 1000, STATES, 2, 30)
+    assert route is not None
+    amounts = [0, 1000, 10**4, 10**5]
+    curve = route_curve(route.hops, np.array(amounts, dtype=float), STATES, 30)
+    exact = [0] + [
+        quote_route(route.hops, amount, STATES, 30).amount_out  # type: ignore
+        for amount in amounts[1:]
+    ]
+    assert np.allclose(curve, exact, atol=2)
+    assert route_curve(route.hops, np.array(amounts), {}, 30) is None
+    assert quote_route(route.hops, 1000, {}, 30) is None
+
+
+def test_allocate() -> None:
+    """Test that every step goes to the largest marginal output."""
+    curves = np.array([[0.0, 10.0, 15.0, 18.0], [0.0, 8.0, 16.0, 24.0]])
+    assert allocate(curves).tolist() == [1, 2]
+    # ties go to the first route
+    assert allocate(np.array([[0.0, 1.0], [0.0, 1.0]])).tolist() == [1, 0]
+
+
+@pytest.mark.parametrize(
+    "amount_in, max_routes, expected",
+    [
+        # a large order is split across both pools
+        (
+            5 * 10**5,
+            3,
+            [("cEUR-cUSD-2", 475000, 642756), ("cEUR-cUSD", 25000, 24318)],
+        ),
+        # a small one is not worth splitting
+        (10**5, 3, [("cEUR-cUSD-2", 10**5, 181322)]),
+        (5 * 10**5, 1, [("cEUR-cUSD-2", 5 * 10**5, 665331)]),
+    ],
+)
+def test_split_order(amount_in: int, max_routes: int, expected: List) -> None:
+    """Test splitting orders across routes that share no pool."""
+    index = RouteIndex()
+    index.update([CEUR_CUSD, TWIN])
+    legs = index.split_order(
+        "cEUR", "cUSD", amount_in, TWIN_STATES, 2, 30, max_routes, 20
+    )
+    assert [
+        (leg.hops[0].pair, leg.amount_in, leg.amount_out) for leg in legs
+    ] == expected
+    assert sum(leg.amount_in for leg in legs) == amount_in
+    best = index.best_route("cEUR", "cUSD", amount_in, TWIN_STATES, 2, 30)
+    assert best is not None
+    assert sum(leg.amount_out for leg in legs) >= best.amount_out
+    assert (
+        index.split_order("cEUR", "cREAL", amount_in, TWIN_STATES, 2, 30, 3, 20) == []
+    )
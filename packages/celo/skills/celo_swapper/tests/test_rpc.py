@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Test the rpc.py module of the CeloSwapper."""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from packages.celo.skills.celo_swapper.events import V2_SYNC_TOPIC
+from packages.celo.skills.celo_swapper.rpc import (
+    FixtureSource,
+    RpcError,
+    RpcSource,
+    split_range,
+)
+from packages.celo.skills.celo_swapper.tests.logs import build_log
+
+
+POOL = "0x0000000000000000000000000000000000000001"
+SYNC_LOG = build_log(V2_SYNC_TOPIC, 1, 2, address=POOL, block=5)
+
+
+def test_split_range() -> None:
+    """Test splitting a block range into chunks."""
+    assert split_range(10, 24, 5) == [(10, 14), (15, 19), (20, 24)]
+    assert split_range(10, 21, 5) == [(10, 14), (15, 19), (20, 21)]
+    assert split_range(10, 9, 5) == []
+
+
+def test_fixture_source(tmp_path: Path) -> None:
+    """Test serving logs from a fixture."""
+    path = tmp_path / "fixture.json"
+    path.write_text(
+        json.dumps(dict(logs=[SYNC_LOG], timestamps={"0": 0, "1000": 5000}))
+    )
+    source = FixtureSource(path)
+    assert source.get_block_number() == 1000
+    assert source.get_block_timestamp(10) == 50
+    assert len(source.get_logs(POOL, [V2_SYNC_TOPIC], 0, 5)) == 1
+    assert not source.get_logs(POOL, [V2_SYNC_TOPIC], 6, 10)
+
+
+def test_rpc_source() -> None:
+    """Test that JSON-RPC calls return their result and raise their errors."""
+    source = RpcSource("http://localhost:8545")
+    response = MagicMock()
+    response.json.side_effect = [dict(result="0x10"), dict(error="limit exceeded")]
+    with patch.object(source.session, "post", return_value=response) as post:
+        assert source.get_block_number() == 16
+        with pytest.raises(RpcError, match="eth_getLogs failed"):
+            source.get_logs(POOL, [V2_SYNC_TOPIC], 0, 5)
+    assert post.call_args[1]["json"]["params"] == [
+        dict(address=POOL, topics=[[V2_SYNC_TOPIC]], fromBlock="0x0", toBlock="0x5")
+    ]
+
+
+def test_rpc_source_sessions() -> None:
+    """Test that every thread calls the endpoint through its own session."""
+    source = RpcSource("http://localhost:8545")
+    assert source.session is source.session
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        sessions = list(executor.map(lambda _: source.session, range(2)))
+    assert all(session is not source.session for session in sessions)
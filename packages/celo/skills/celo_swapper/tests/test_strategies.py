@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Test the strategies of the CeloSwapper."""
+
+import pytest
+
+import importlib
+import pickle  # nosec
+import sys
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from packages.celo.skills.celo_swapper import strategies
+from packages.celo.skills.celo_swapper.strategies import (
+    FeatureMatrix,
+    available_strategies,
+    load_strategy,
+    rank_candidates,
+    register,
+    run_strategies,
+)
+from packages.celo.skills.celo_swapper.strategies.momentum import momentum_scores
+
+
+def test_feature_matrix() -> None:
+    """Test that the matrix has a row per priced pair and a column per feature."""
+    matrix = FeatureMatrix.build(
+        {"up": 1.01, "cold": 1.0},
+        {
+            "up": dict(sma=1.0, ema=2.0),
+            "cold": dict(sma=None),
+            "unpriced": dict(rsi=3.0),
+        },
+    )
+    assert matrix.pairs == ("cold", "up")
+    assert matrix.features == ("price", "ema", "sma")
+    assert np.array_equal(
+        matrix.values, [[1.0, np.nan, np.nan], [1.01, 2.0, 1.0]], equal_nan=True
+    )
+    assert matrix.column("sma")[1] == 1.0
+    assert np.isnan(matrix.column("rsi")).all()
+
+
+def test_momentum_scores() -> None:
+    """Test that the scores follow the move of the price away from its average."""
+    nan = np.nan
+    scores = momentum_scores(
+        pairs=np.array(["up", "down", "new", "flat", "cold", "unpriced"], dtype=object),
+        prices=np.array([1.01, 0.8, 1.0, 2.0, 1.0, nan]),
+        averages=np.array([1.0, 1.0, nan, 2.0, 0.0, 1.0]),
+        sensitivity=10.0,
+    )
+    assert scores["up"] == pytest.approx(0.1)
+    assert scores["down"] == -1.0
+    assert scores["flat"] == 0.0
+    assert "new" not in scores
+    assert "cold" not in scores
+    assert "unpriced" not in scores
+
+
+def test_momentum() -> None:
+    """Test that the momentum strategy scores against the simple moving average."""
+    matrix = FeatureMatrix.build(
+        {"up": 1.01, "cold": 1.0},
+        {"up": dict(sma=1.0, ema=2.0), "cold": dict(sma=None)},
+    )
+    scores = load_strategy("momentum")(matrix, MagicMock(strategy_sensitivity=10.0))
+    assert scores == {"up": pytest.approx(0.1)}
+    empty = FeatureMatrix.build({}, {})
+    assert load_strategy("momentum")(empty, MagicMock(strategy_sensitivity=1.0)) == {}
+
+
+def test_run_strategies() -> None:
+    """Test that the strategies run on picklable inputs, in the order of their names."""
+    # the skill tests load the modules of the skill again, so the class is looked up
+    matrix_class = importlib.import_module(FeatureMatrix.__module__).FeatureMatrix
+    args = (
+        ["momentum", "momentum"],
+        matrix_class.build({"up": 1.01}, {"up": dict(sma=1.0)}),
+        SimpleNamespace(strategy_sensitivity=10.0),
+    )
+    scores = run_strategies(*pickle.loads(pickle.dumps(args)))  # nosec
+    assert scores == [{"up": pytest.approx(0.1)}] * 2
+
+
+def test_rank_candidates() -> None:
+    """Test that the strongest signals come first, ties broken by name."""
+    scores = {"c": 0.6, "a": -0.6, "b": -0.9, "d": 0.1, "e": 0.5}
+    assert rank_candidates(scores, 0.5, 10) == ["b", "a", "c", "e"]
+    assert rank_candidates(scores, 0.5, 2) == ["b", "a"]
+    assert rank_candidates(scores, 1.0, 2) == []
+
+
+def test_registry_is_lazy() -> None:
+    """Test that a strategy module is only imported once the strategy is loaded."""
+    module = f"{strategies.__name__}.momentum"
+    sys.modules.pop(module, None)
+    strategies._loaded.pop("momentum", None)  # pylint: disable=protected-access
+    assert "momentum" in available_strategies()
+    assert module not in sys.modules
+    strategy = load_strategy("momentum")
+    assert module in sys.modules
+    assert load_strategy("momentum") is strategy
+
+
+def test_registry_errors() -> None:
+    """Test that unknown and conflicting strategies are rejected."""
+    with pytest.raises(ValueError, match="Unknown strategy"):
+        load_strategy("unknown")
+    with pytest.raises(ValueError, match="already registered"):
+        register("momentum", "some.module:strategy")
+    register("momentum", f"{strategies.__name__}.momentum:momentum")